@@ -0,0 +1,9 @@
+"""
+Бенчмарки производительности.
+
+Не входят в обычный прогон тестов, запускаются по имени модуля:
+```
+manage.py test benchmarks.bench_tag_filter
+```
+Размер набора данных задается переменной окружения `BENCH_RECIPES`.
+"""
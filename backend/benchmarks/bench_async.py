@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import path
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.generics import ListAPIView
+
+from benchmarks.utils import populate
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe
+from recipes.serializers import RecipeSerializerRetrieve
+
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 200))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 20))
+# Задержка каждого запроса к БД, имитирующая сеть до PostgreSQL.
+DB_LATENCY = float(os.environ.get('BENCH_DB_LATENCY', 0.005))
+URL = '/api/recipes/?limit=6'
+
+
+class SyncRecipeList(ListAPIView):
+    """Синхронный список рецептов DRF с тем же запросом и сериализатором."""
+
+    serializer_class = RecipeSerializerRetrieve
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecipeFilter
+
+    def get_queryset(self) -> QuerySet:
+        return RecipeSerializerRetrieve.setup_queryset(
+            Recipe.objects.defer('search_vector'),
+            self.request,
+        )
+
+
+urlpatterns = (path('api/recipes/', SyncRecipeList.as_view()),)
+
+
+def slow_execute(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_latency(sender, connection, **kwargs) -> None:
+    if slow_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_execute)
+
+
+async def asgi_get(application, path: str, query: str) -> int:
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = 0
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+        return {'type': 'http.disconnect'}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+class AsyncViewsBenchmark(TransactionTestCase):
+    """
+    Пропускная способность чтения рецептов: синхронные процессы
+    против одного асинхронного процесса.
+
+    Синхронный воркер (gunicorn sync) обрабатывает один запрос за раз,
+    поэтому при одинаковой памяти (1 процесс) ожидание БД не
+    перекрывается. ASGI-процесс держит `BENCH_CONCURRENCY` запросов
+    одновременно, каждый ждет БД в своем потоке.
+    """
+
+    def setUp(self) -> None:
+        populate(recipes=500)
+        connection_created.connect(add_latency)
+        add_latency(None, connection)
+        self.addCleanup(connection.execute_wrappers.remove, slow_execute)
+        self.addCleanup(connection_created.disconnect, add_latency)
+
+    def run_sync(self, workers: int) -> float:
+        path, query = URL.split('?')
+
+        def get(_) -> int:
+            return Client().get(path, dict([query.split('=')])).status_code
+
+        start = time.perf_counter()
+        with override_settings(ROOT_URLCONF=__name__):
+            with ThreadPoolExecutor(workers) as executor:
+                statuses = list(executor.map(get, range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(set(statuses), {200})
+        return elapsed
+
+    def run_async(self) -> float:
+        application = get_asgi_application()
+        path, query = URL.split('?')
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def get() -> int:
+            async with semaphore:
+                return await asgi_get(application, path, query)
+
+        async def main() -> list[int]:
+            return await asyncio.gather(*(get() for _ in range(REQUESTS)))
+
+        start = time.perf_counter()
+        statuses = asyncio.run(main())
+        elapsed = time.perf_counter() - start
+        self.assertEqual(set(statuses), {200})
+        return elapsed
+
+    def test_throughput(self) -> None:
+        print(
+            f'\n{REQUESTS} x GET {URL}, '
+            f'DB latency {DB_LATENCY * 1000:.0f} ms per query',
+        )
+        for workers in (1, 4):
+            elapsed = self.run_sync(workers)
+            print(
+                f'Sync, {workers} worker(s): {REQUESTS / elapsed:.0f} req/s',
+            )
+        elapsed = self.run_async()
+        print(
+            f'ASGI, 1 process, {CONCURRENCY} concurrent: '
+            f'{REQUESTS / elapsed:.0f} req/s',
+        )
@@ -0,0 +1,48 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from benchmarks.utils import populate, timed
+from recipes.models import Recipe
+from users.models import User
+
+REPEAT = 50
+
+
+class ConditionalGetBenchmark(TestCase):
+    """Полный ответ против 304 на запрос с If-None-Match."""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate()
+
+    def measure(self, label: str, url: str, **params) -> None:
+        etag = self.client.get(url, params)['ETag']
+        with timed(f'{label}, 200', REPEAT):
+            for _ in range(REPEAT):
+                self.client.get(url, params)
+        with timed(f'{label}, 304', REPEAT):
+            for _ in range(REPEAT):
+                response = self.client.get(
+                    url,
+                    params,
+                    HTTP_IF_NONE_MATCH=etag,
+                )
+        self.assertEqual(response.status_code, 304)
+
+    def test_conditional_get(self) -> None:
+        # Анонимные страницы списка отдаются из кэша страниц.
+        token = Token.objects.create(user=User.objects.first())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        print()
+        recipe = Recipe.objects.first()
+        self.measure(
+            'Detail',
+            reverse('recipes:recipes-detail', args=(recipe.pk,)),
+        )
+        url = reverse('recipes:recipes-list')
+        self.measure('List, limit=6', url)
+        self.measure('List, limit=50', url, limit=50)
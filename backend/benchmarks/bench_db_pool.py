@@ -0,0 +1,101 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.test import SimpleTestCase
+
+from foodgram_backend.db.pool import ConnectionPool
+
+# Без BENCH_DB_HOST соединение имитируется задержками: установка
+# соединения с аутентификацией и короткий запрос.
+CONNECT_LATENCY = float(os.environ.get('BENCH_CONNECT_LATENCY', 0.005))
+QUERY_LATENCY = float(os.environ.get('BENCH_QUERY_LATENCY', 0.0005))
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 2000))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 16))
+POOL_SIZE = int(os.environ.get('BENCH_POOL_SIZE', 8))
+
+
+class StubConnection:
+    def __init__(self) -> None:
+        time.sleep(CONNECT_LATENCY)
+        self.closed = 0
+
+    def query(self) -> None:
+        time.sleep(QUERY_LATENCY)
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+class PostgresConnection:
+    def __init__(self) -> None:
+        import psycopg2
+
+        self.connection = psycopg2.connect(
+            host=os.environ['BENCH_DB_HOST'],
+            port=os.environ.get('BENCH_DB_PORT', 5432),
+            dbname=os.environ.get('BENCH_DB_NAME', 'postgres'),
+            user=os.environ.get('BENCH_DB_USER', 'postgres'),
+            password=os.environ.get('BENCH_DB_PASSWORD', ''),
+        )
+        self.connection.autocommit = True
+
+    @property
+    def closed(self) -> int:
+        return self.connection.closed
+
+    def query(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class ConnectionPoolBenchmark(SimpleTestCase):
+    """
+    Пропускная способность запросов с одним обращением к БД:
+    новое соединение на каждый запрос (`CONN_MAX_AGE=0`) против пула.
+    """
+
+    connection_class = (
+        PostgresConnection
+        if os.environ.get('BENCH_DB_HOST')
+        else StubConnection
+    )
+
+    def run_requests(self, handle: Callable[[], None]) -> float:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENCY) as executor:
+            for future in [
+                executor.submit(handle) for _ in range(REQUESTS)
+            ]:
+                future.result()
+        return REQUESTS / (time.perf_counter() - start)
+
+    def test_connection_pool(self) -> None:
+        def per_request() -> None:
+            connection = self.connection_class()
+            try:
+                connection.query()
+            finally:
+                connection.close()
+
+        pool = ConnectionPool(max_size=POOL_SIZE)
+
+        def pooled() -> None:
+            connection = pool.acquire(self.connection_class)
+            try:
+                connection.query()
+            finally:
+                pool.release(connection)
+
+        print(
+            f'\n{self.connection_class.__name__}: {REQUESTS} requests, '
+            f'{CONCURRENCY} threads, pool of {POOL_SIZE}',
+        )
+        print(f'Connect per request: {self.run_requests(per_request):.0f} rps')
+        print(f'Pooled: {self.run_requests(pooled):.0f} rps')
+        pool.close()
+        print(f'Pool stats: {pool.stats()}')
@@ -0,0 +1,62 @@
+from django.db.models import QuerySet
+from django.http import QueryDict
+from django.test import TestCase
+
+from benchmarks.utils import BENCH_RECIPES, populate, timed
+from recipes.filters import RecipeFilter
+from recipes.index import ingredient_index
+from recipes.models import Ingredient, Recipe
+
+REPEAT = 20
+
+
+class IngredientFilterBenchmark(TestCase):
+    """
+    Фильтр "содержит все / не содержит ни одного" по ингредиентам.
+
+    Сравнивается инвертированный индекс в памяти и цепочка JOIN.
+    Для проверки масштабирования: `BENCH_RECIPES=100000`.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate(ingredients=100, ingredients_per_recipe=10)
+        ids = list(Ingredient.objects.values_list('id', flat=True))
+        cls.include, cls.exclude = ids[:2], ids[2:4]
+
+    def filtered(self) -> QuerySet:
+        data = QueryDict(mutable=True)
+        data.setlist('ingredients', self.include)
+        data.setlist('exclude_ingredients', self.exclude)
+        return RecipeFilter(data).qs
+
+    def test_ingredient_filter(self) -> None:
+        print(f'\nRecipes: {BENCH_RECIPES}')
+        ingredient_index.invalidate()
+        with timed('Index build'):
+            ingredient_index.recipes_with_all(self.include)
+        size = sum(
+            posting.buffer_info()[1] * posting.itemsize
+            for posting in ingredient_index._postings.values()
+        )
+        print(f'Index size: {size / 1024:.0f} KiB')
+        with timed('Index lookup', REPEAT):
+            for _ in range(REPEAT):
+                matched = ingredient_index.recipes_with_all(
+                    self.include,
+                ) - ingredient_index.recipes_with_any(self.exclude)
+        chained = Recipe.objects.all()
+        for pk in self.include:
+            chained = chained.filter(ingredients=pk)
+        chained = chained.exclude(ingredients__in=self.exclude)
+        with timed('Chained JOIN, count + page', REPEAT):
+            for _ in range(REPEAT):
+                legacy_count = chained.count()
+                legacy_page = list(chained.values_list('id', flat=True)[:6])
+        with timed('RecipeFilter, count + page', REPEAT):
+            for _ in range(REPEAT):
+                count = self.filtered().count()
+                page = list(self.filtered().values_list('id', flat=True)[:6])
+        self.assertEqual(count, len(matched))
+        self.assertEqual(count, legacy_count)
+        self.assertEqual(page, legacy_page)
@@ -0,0 +1,55 @@
+import io
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.utils import populate, timed
+from foodgram_backend.parsers import FastJSONParser, LimitedJSONParser
+from foodgram_backend.renderers import FastJSONRenderer
+
+REPEAT = 50
+PAGE_SIZE = 100
+
+
+class JSONRendererBenchmark(TestCase):
+    """
+    Сериализация в JSON больших ответов API: полный справочник
+    ингредиентов и страница рецептов с вложенными ингредиентами.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate(recipes=PAGE_SIZE, ingredients=2000)
+
+    def payloads(self) -> dict:
+        return {
+            'Ingredients': self.client.get(
+                reverse('recipes:ingredients-list'),
+            ).json(),
+            f'Recipes, limit={PAGE_SIZE}': self.client.get(
+                reverse('recipes:recipes-list'),
+                {'limit': PAGE_SIZE},
+            ).json(),
+        }
+
+    def test_render(self) -> None:
+        renderers = {
+            'JSONRenderer': JSONRenderer(),
+            'FastJSONRenderer': FastJSONRenderer(),
+        }
+        for payload, data in self.payloads().items():
+            content = JSONRenderer().render(data)
+            print(f'\n{payload}: {len(content) / 1024:.0f} KiB')
+            for label, renderer in renderers.items():
+                with timed(f'{label} render', REPEAT):
+                    for _ in range(REPEAT):
+                        rendered = renderer.render(data)
+                self.assertEqual(rendered, content)
+            for label, parser in (
+                ('LimitedJSONParser', LimitedJSONParser()),
+                ('FastJSONParser', FastJSONParser()),
+            ):
+                with timed(f'{label} parse', REPEAT):
+                    for _ in range(REPEAT):
+                        parser.parse(io.BytesIO(content))
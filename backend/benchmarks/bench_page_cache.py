@@ -0,0 +1,32 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from benchmarks.utils import populate, timed
+from recipes.models import Tag
+from recipes.views import page_cache
+
+REPEAT = 50
+
+
+class PageCacheBenchmark(TestCase):
+    """Анонимные страницы списка рецептов: промах и попадание в кэш."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate()
+        cls.slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+
+    def test_page_cache(self) -> None:
+        url = reverse('recipes:recipes-list')
+        print()
+        for label, params in (
+            ('First page', {}),
+            ('Tags, limit=50', {'tags': self.slugs, 'limit': 50}),
+        ):
+            with timed(f'{label}, miss', REPEAT):
+                for _ in range(REPEAT):
+                    page_cache.clear()
+                    self.client.get(url, params)
+            with timed(f'{label}, hit', REPEAT):
+                for _ in range(REPEAT):
+                    self.client.get(url, params)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from benchmarks.utils import BENCH_RECIPES, populate, timed
+from recipes.index import ingredient_index
+from recipes.models import Ingredient
+
+REPEAT = 20
+
+
+class PantryBenchmark(TestCase):
+    """
+    Подбор рецептов по набору продуктов (`/api/recipes/pantry/`).
+
+    Для проверки масштабирования: `BENCH_RECIPES=100000`.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate(ingredients=100, ingredients_per_recipe=8)
+        cls.pantry = list(
+            Ingredient.objects.values_list('id', flat=True)[:20],
+        )
+
+    def test_pantry(self) -> None:
+        print(f'\nRecipes: {BENCH_RECIPES}')
+        ingredient_index.invalidate()
+        with timed('Index build'):
+            ingredient_index.rank_by_coverage(self.pantry, 2)
+        with timed('Ranking', REPEAT):
+            for _ in range(REPEAT):
+                ranked = ingredient_index.rank_by_coverage(self.pantry, 2)
+        print(f'Matched: {len(ranked)}')
+        url = reverse('recipes:recipes-pantry')
+        with timed('Endpoint', REPEAT):
+            for _ in range(REPEAT):
+                response = self.client.get(
+                    url,
+                    {'ingredients': self.pantry, 'max_missing': 2},
+                )
+        self.assertEqual(response.json()['count'], len(ranked))
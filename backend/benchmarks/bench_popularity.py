@@ -0,0 +1,49 @@
+import random
+
+from django.test import TestCase
+from django.urls import reverse
+
+from benchmarks.utils import BENCH_RECIPES, populate, timed
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.popularity import refresh_scores
+from users.models import User
+
+REPEAT = 20
+
+
+class PopularityBenchmark(TestCase):
+    """
+    Пересчет популярности и список `?ordering=popular|trending`.
+
+    Для проверки масштабирования: `BENCH_RECIPES=100000`.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate()
+        rnd = random.Random(0)
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in rnd.sample(
+                        recipe_ids,
+                        len(recipe_ids) // 10,
+                    )
+                ),
+                batch_size=5000,
+            )
+
+    def test_popularity(self) -> None:
+        print(f'\nRecipes: {BENCH_RECIPES}')
+        with timed('Refresh scores'):
+            refresh_scores()
+        url = reverse('recipes:recipes-list')
+        for ordering in ('popular', 'trending'):
+            with timed(f'List ?ordering={ordering}', REPEAT):
+                for _ in range(REPEAT):
+                    response = self.client.get(url, {'ordering': ordering})
+            self.assertEqual(response.json()['count'], BENCH_RECIPES)
@@ -0,0 +1,36 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from benchmarks.utils import BENCH_RECIPES, populate, timed
+from recipes.models import Recipe, RecipeNeighbor
+from recipes.similarity import refresh_neighbors
+
+REPEAT = 20
+
+
+class SimilarRecipesBenchmark(TestCase):
+    """
+    Пакетный расчет похожих рецептов и чтение `/api/recipes/{id}/similar/`.
+
+    Для проверки масштабирования: `BENCH_RECIPES=100000`.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate()
+
+    def test_similar(self) -> None:
+        print(f'\nRecipes: {BENCH_RECIPES}')
+        with timed('Full refresh'):
+            refresh_neighbors()
+        print(f'Neighbors stored: {RecipeNeighbor.objects.count()}')
+        recipes = Recipe.objects.order_by('?')[:100]
+        Recipe.objects.filter(pk__in=recipes).update(similar_stale=True)
+        with timed('Stale refresh (100 edited)'):
+            processed = refresh_neighbors(stale_only=True)
+        print(f'Recipes processed: {processed}')
+        url = reverse('recipes:recipes-similar', args=(recipes[0].pk,))
+        with timed('Endpoint', REPEAT):
+            for _ in range(REPEAT):
+                response = self.client.get(url)
+        self.assertEqual(len(response.json()), 10)
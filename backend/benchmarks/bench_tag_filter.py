@@ -0,0 +1,46 @@
+from django.db import connection
+from django.db.models import QuerySet
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.utils import populate, timed
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe
+
+REPEAT = 20
+SLUGS = ('tag_0', 'tag_1', 'tag_2', 'tag_3')
+
+
+class TagFilterBenchmark(TestCase):
+    """Фильтр по нескольким тегам: JOIN + DISTINCT против Exists()."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        populate(tags_per_recipe=8)
+
+    def filtered(self) -> QuerySet:
+        data = QueryDict(mutable=True)
+        data.setlist('tags', SLUGS)
+        return RecipeFilter(data).qs
+
+    def test_tag_filter(self) -> None:
+        legacy = Recipe.objects.filter(tags__slug__in=SLUGS).distinct()
+        with timed('JOIN + DISTINCT, count', REPEAT):
+            for _ in range(REPEAT):
+                legacy_count = legacy.count()
+        with timed('JOIN + DISTINCT, first page', REPEAT):
+            for _ in range(REPEAT):
+                legacy_page = list(legacy.values_list('id', flat=True)[:6])
+        with timed('Exists(), count', REPEAT):
+            for _ in range(REPEAT):
+                count = self.filtered().count()
+        with timed('Exists(), first page', REPEAT):
+            for _ in range(REPEAT):
+                page = list(self.filtered().values_list('id', flat=True)[:6])
+        with CaptureQueriesContext(connection) as context:
+            list(self.filtered()[:6])
+        print(f'Exists(), queries per page: {len(context)}')
+        self.assertEqual(count, legacy_count)
+        self.assertEqual(page, legacy_page)
+        self.assertNotIn('DISTINCT', str(self.filtered().query))
@@ -0,0 +1,86 @@
+import base64
+import io
+import json
+import os
+import tracemalloc
+import uuid
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APIRequestFactory
+
+from foodgram_backend.fields import Base64ImageField
+from foodgram_backend.parsers import LimitedJSONParser
+
+IMAGE_SIDE = int(os.environ.get('BENCH_IMAGE_SIDE', 1800))
+
+
+class EagerBase64ImageField(serializers.ImageField):
+    """Прежний способ: декодирование всей строки в память."""
+
+    def to_internal_value(self, data):
+        header, content = data.split(';base64,')
+        data = ContentFile(
+            base64.b64decode(content),
+            name=f'{uuid.uuid4()}.{header.split("/")[-1]}',
+        )
+        return super().to_internal_value(data)
+
+
+@override_settings(IMAGE_MAX_SIZE=64 * 1024 * 1024)
+class UploadMemoryBenchmark(SimpleTestCase):
+    """
+    Пиковая память разбора JSON с изображением в base64 (tracemalloc).
+
+    Изображение из шума почти не сжимается: `BENCH_IMAGE_SIDE=1800`
+    дает PNG около 10 МБ.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        buffer = io.BytesIO()
+        Image.frombytes(
+            'RGB',
+            (IMAGE_SIDE, IMAGE_SIDE),
+            os.urandom(IMAGE_SIDE * IMAGE_SIDE * 3),
+        ).save(buffer, 'PNG', compress_level=1)
+        cls.image_size = buffer.tell()
+        cls.body = json.dumps(
+            {
+                'name': 'recipe',
+                'image': 'data:image/png;base64,'
+                + base64.b64encode(buffer.getvalue()).decode(),
+            },
+        ).encode()
+
+    def measure(self, parse, field: serializers.Field) -> float:
+        request = APIRequestFactory().post(
+            '/',
+            self.body,
+            content_type='application/json',
+        )
+        tracemalloc.start()
+        data = parse(request, parser_context={'request': request})
+        file = field.to_internal_value(data.pop('image'))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        file.close()
+        return peak / 1024 / 1024
+
+    def test_upload_memory(self) -> None:
+        print(
+            f'\nImage: {self.image_size / 1024 / 1024:.1f} MB, '
+            f'body: {len(self.body) / 1024 / 1024:.1f} MB',
+        )
+        cases = (
+            ('Eager', JSONParser().parse, EagerBase64ImageField()),
+            ('Streaming', LimitedJSONParser().parse, Base64ImageField()),
+        )
+        with override_settings(JSON_MAX_BODY_SIZE=len(self.body)):
+            for label, parse, field in cases:
+                peak = self.measure(parse, field)
+                print(f'{label} peak: {peak:.1f} MB')
@@ -0,0 +1,87 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+BENCH_RECIPES = int(os.environ.get('BENCH_RECIPES', 5000))
+
+
+def populate(
+    recipes: int = BENCH_RECIPES,
+    authors: int = 50,
+    tags: int = 20,
+    tags_per_recipe: int = 5,
+    ingredients: int = 500,
+    ingredients_per_recipe: int = 8,
+    seed: int = 0,
+) -> None:
+    """Заполняет базу синтетическими рецептами пакетными вставками."""
+    rnd = random.Random(seed)
+    author_ids = [
+        user.pk
+        for user in User.objects.bulk_create(
+            User(username=f'author_{i}', email=f'author_{i}@fake.com')
+            for i in range(authors)
+        )
+    ]
+    tag_ids = [
+        tag.pk
+        for tag in Tag.objects.bulk_create(
+            Tag(name=f'tag {i}', color=f'#{i:06X}', slug=f'tag_{i}')
+            for i in range(tags)
+        )
+    ]
+    ingredient_ids = [
+        ingredient.pk
+        for ingredient in Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient {i}', measurement_unit='г')
+            for i in range(ingredients)
+        )
+    ]
+    recipe_objs = Recipe.objects.bulk_create(
+        (
+            Recipe(
+                name=f'recipe {i}',
+                author_id=rnd.choice(author_ids),
+                text='text',
+                cooking_time=rnd.randint(1, 120),
+            )
+            for i in range(recipes)
+        ),
+        batch_size=1000,
+    )
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe in recipe_objs
+            for tag_id in rnd.sample(tag_ids, tags_per_recipe)
+        ),
+        batch_size=5000,
+    )
+    IngredientAmount.objects.bulk_create(
+        (
+            IngredientAmount(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredient_id,
+                amount=rnd.randint(1, 500),
+            )
+            for recipe in recipe_objs
+            for ingredient_id in rnd.sample(
+                ingredient_ids,
+                ingredients_per_recipe,
+            )
+        ),
+        batch_size=5000,
+    )
+
+
+@contextmanager
+def timed(label: str, repeat: int = 1) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f'{label}: {elapsed:.2f} ms')
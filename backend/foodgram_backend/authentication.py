@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.request import Request
+
+from foodgram_backend.routers import afollow_user_pin, follow_user_pin
+
+TOKEN_CACHE_KEY = 'auth-token:{}'
+
+
+def invalidate_tokens(*keys: str) -> None:
+    """Удаляет пользователей указанных токенов из кэша аутентификации."""
+    cache.delete_many([TOKEN_CACHE_KEY.format(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшированием пары токен -> пользователь.
+
+    Запись живет `AUTH_TOKEN_CACHE_TIMEOUT` секунд и удаляется сигналами
+    при удалении токена (в том числе при выходе), изменении или
+    деактивации пользователя. Размер кэша ограничен настройками `CACHES`.
+    Пользователь, недавно писавший в основную БД, читает из нее же
+    (`ReplicaMiddleware`).
+    """
+
+    def authenticate_credentials(self, key: str) -> tuple:
+        cache_key = TOKEN_CACHE_KEY.format(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                credentials,
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+        follow_user_pin(credentials[0])
+        return credentials
+
+    async def aauthenticate(self, request: Request) -> tuple | None:
+        """Асинхронный `authenticate` для асинхронных представлений."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        cache_key = TOKEN_CACHE_KEY.format(key)
+        credentials = await cache.aget(cache_key)
+        if credentials is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(
+                    key=key,
+                )
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(
+                    _('User inactive or deleted.'),
+                )
+            credentials = (token.user, token)
+            await cache.aset(
+                cache_key,
+                credentials,
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+        await afollow_user_pin(credentials[0])
+        return credentials
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class ResponseCache:
+    """
+    Процессный LRU-кэш готовых ответов с ограничением времени жизни.
+
+    Хранит не больше `max_entries` значений, вытесняя давно не
+    запрошенные. Одновременные промахи по одному ключу в цикле событий
+    процесса не пересчитывают значение: первый запрос вычисляет его,
+    остальные ждут результата.
+    """
+
+    def __init__(self, max_entries: int, timeout: float) -> None:
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = (
+            OrderedDict()
+        )
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        # Под WSGI асинхронные представления выполняются в разных потоках.
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.timeout or not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def aget_or_set(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Значение из кэша или результат `compute`, который сохраняется,
+        если `cacheable` его разрешает.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            value = await asyncio.shield(pending)
+            if value is not None:
+                self.hits += 1
+                return value
+        self.misses += 1
+        future = loop.create_future()
+        if self._pending.setdefault(key, future) is not future:
+            # Значение уже вычисляется в другом потоке.
+            future = None
+        stored = None
+        try:
+            value = await compute()
+            if cacheable(value):
+                self.set(key, value)
+                stored = value
+            return value
+        finally:
+            if future is not None:
+                self._pending.pop(key, None)
+                future.set_result(stored)
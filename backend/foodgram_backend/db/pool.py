@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+Connection = Any
+
+
+class PoolTimeout(TimeoutError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД внутри процесса.
+
+    Соединение берется `acquire` и возвращается `release`. Свободные
+    соединения выдаются в порядке LIFO, чтобы лишние успели устареть
+    и закрыться. Новое соединение открывается, только если свободных нет
+    и открыто меньше `max_size`, иначе запрос ждет освобождения не дольше
+    `timeout` секунд. Соединения старше `max_lifetime` секунд и не
+    прошедшие проверку `check` закрываются.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: float = 3600.0,
+    ) -> None:
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._idle: deque[Connection] = deque()
+        self._opened_at: dict[int, float] = {}
+        self._condition = threading.Condition()
+        self._waiting = 0
+        self._opening = 0
+        self._counters = dict.fromkeys(
+            ('connects', 'reuses', 'discards', 'timeouts'),
+            0,
+        )
+        self._wait_time = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._opened_at) + self._opening
+
+    def acquire(
+        self,
+        connect: Callable[[], Connection],
+        check: Callable[[Connection], bool] = lambda connection: True,
+    ) -> Connection:
+        while True:
+            connection = self._take()
+            if connection is None:
+                return self._open(connect)
+            opened_at = self._opened_at[id(connection)]
+            if (
+                time.monotonic() - opened_at < self.max_lifetime
+                and check(connection)
+            ):
+                with self._condition:
+                    self._counters['reuses'] += 1
+                return connection
+            self._discard(connection)
+
+    def release(self, connection: Connection, reusable: bool = True) -> None:
+        with self._condition:
+            if reusable and id(connection) in self._opened_at:
+                self._idle.append(connection)
+                self._condition.notify()
+                return
+        self._discard(connection)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._condition:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self.size - len(self._idle),
+                'waiting': self._waiting,
+                **self._counters,
+                'wait_time': round(self._wait_time, 3),
+            }
+
+    def close(self) -> None:
+        """Закрывает свободные соединения."""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self._discard(connection)
+
+    def _take(self) -> Connection | None:
+        """Свободное соединение или None, если можно открыть новое."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'Нет свободных соединений за {self.timeout} с',
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+                self._wait_time += time.monotonic() - start
+            if self._idle:
+                return self._idle.pop()
+            # Место резервируется до открытия соединения вне блокировки.
+            self._opening += 1
+            return None
+
+    def _open(self, connect: Callable[[], Connection]) -> Connection:
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._opened_at[id(connection)] = time.monotonic()
+            self._counters['connects'] += 1
+        return connection
+
+    def _discard(self, connection: Connection) -> None:
+        with self._condition:
+            self._opened_at.pop(id(connection), None)
+            self._counters['discards'] += 1
+            self._condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, settings_dict: dict) -> ConnectionPool:
+    """Пул соединений БД `alias`, создается при первом обращении."""
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[alias] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10.0),
+                max_lifetime=options.get('MAX_LIFETIME', 3600.0),
+            )
+        return _pools[alias]
+
+
+def pool_stats() -> dict[str, dict]:
+    """Показатели пулов соединений процесса по псевдонимам БД."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,76 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions
+
+from foodgram_backend.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений процесса.
+
+    Закрытие соединения Django (в конце запроса при `CONN_MAX_AGE=0`)
+    возвращает его в пул, новое соединение берется из пула. Настройки -
+    ключ `POOL` настроек БД: `MAX_SIZE`, `TIMEOUT` (ожидание свободного
+    соединения, с), `MAX_LIFETIME` (с). При `CONN_HEALTH_CHECKS`
+    соединение проверяется запросом `SELECT 1` перед выдачей из пула.
+    """
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params: dict):
+        # Для соединения из пула уровень изоляции не задается родителем.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get(
+                'isolation_level',
+                IsolationLevel.READ_COMMITTED,
+            ),
+        )
+        try:
+            return self.pool.acquire(
+                partial(super().get_new_connection, conn_params),
+                self.check_connection,
+            )
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def check_connection(self, connection) -> bool:
+        if connection.closed:
+            return False
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self) -> None:
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            self.pool.release(
+                self.connection,
+                self.reset_connection(self.connection),
+            )
+
+    def reset_connection(self, connection) -> bool:
+        """Завершает транзакцию; False, если соединение не годится."""
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_INERROR,
+        ):
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                return False
+            return True
+        return status == extensions.TRANSACTION_STATUS_IDLE
@@ -0,0 +1,113 @@
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+# Фрагменты base64 без пробельных символов выравниваются до кратной 4
+# длины и декодируются независимо друг от друга.
+DECODE_CHUNK_SIZE = 256 * 1024
+IMAGE_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+DATA_URI_HEADER_SIZE = 64
+
+
+class Base64ImageField(serializers.ImageField):
+    """
+    Изображение в виде data URI (`data:image/png;base64,...`).
+
+    Размер проверяется по длине строки до декодирования, base64
+    декодируется фрагментами во временный файл, а Pillow проверяет файл
+    по заголовку, не декодируя пиксели. Так в памяти не создаются копии
+    изображения. Принимаются и обычные файлы из multipart-запросов,
+    адреса (http...) уже сохраненных изображений пропускаются.
+    """
+
+    default_error_messages = {
+        'invalid_data_uri': 'Ожидается изображение в формате data URI.',
+        'invalid_type': 'Неподдерживаемый тип изображения: {content_type}.',
+        'invalid_base64': 'Некорректные данные base64.',
+        'too_large': 'Размер изображения больше {max_size} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data) -> UploadedFile:
+        if isinstance(data, str) and data.startswith('http'):
+            raise SkipField()
+        decoded = isinstance(data, str)
+        if decoded:
+            data = self.decode(data)
+        try:
+            file = super().to_internal_value(data)
+            self.check_limits(file)
+        except serializers.ValidationError:
+            if decoded:
+                data.close()
+            raise
+        return file
+
+    def decode(self, data: str) -> TemporaryUploadedFile:
+        header_end = data.find(';base64,', 0, DATA_URI_HEADER_SIZE)
+        if not data.startswith('data:') or header_end == -1:
+            self.fail('invalid_data_uri')
+        content_type = data[len('data:'):header_end]
+        if content_type not in IMAGE_TYPES:
+            self.fail('invalid_type', content_type=content_type[:32])
+        start = header_end + len(';base64,')
+        if (len(data) - start) // 4 * 3 > settings.IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_MAX_SIZE)
+        upload = TemporaryUploadedFile(
+            f'{uuid.uuid4().hex}.{IMAGE_TYPES[content_type]}',
+            content_type,
+            0,
+            None,
+        )
+        try:
+            self.write_decoded(upload, data, start)
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_base64')
+        except BaseException:
+            upload.close()
+            raise
+        return upload
+
+    def write_decoded(
+        self,
+        upload: TemporaryUploadedFile,
+        data: str,
+        start: int,
+    ) -> None:
+        """
+        Декодирует base64 из `data[start:]` в файл загрузки.
+
+        Пробельные символы (переносы строк MIME) пропускаются, остаток
+        фрагмента, не кратный 4, переносится в следующий фрагмент.
+        """
+        pending = ''
+        for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+            chunk = data[offset:offset + DECODE_CHUNK_SIZE]
+            chunk = pending + ''.join(chunk.split())
+            size = len(chunk) - len(chunk) % 4
+            pending = chunk[size:]
+            upload.size += upload.file.write(
+                binascii.a2b_base64(chunk[:size], strict_mode=True),
+            )
+        if pending:
+            raise binascii.Error('Incomplete base64 data')
+        upload.file.flush()
+        upload.seek(0)
+
+    def check_limits(self, file: UploadedFile) -> None:
+        if file.size > settings.IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_MAX_SIZE)
+        width, height = file.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
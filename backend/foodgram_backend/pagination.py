@@ -1,5 +1,41 @@
+from django.core.paginator import InvalidPage
+from django.db.models.query import QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
 
 
 class LimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+    async def apaginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        count: int | None = None,
+    ) -> list | None:
+        """
+        Асинхронный `paginate_queryset` для асинхронных представлений.
+
+        Уже известное число объектов `count` избавляет от запроса COUNT.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        if count is None:
+            count = await queryset.acount()
+        paginator.count = count
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number,
+                    message=str(exc),
+                ),
+            )
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RequestTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'request_too_large'
+
+
+class LimitedJSONParser(JSONParser):
+    """
+    JSONParser с ограничением размера тела запроса.
+
+    Запрос с заголовком Content-Length больше `JSON_MAX_BODY_SIZE`
+    отклоняется до чтения тела, без заголовка читается не больше лимита.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        limit = settings.JSON_MAX_BODY_SIZE
+        request = parser_context.get('request')
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (AttributeError, ValueError):
+            length = 0
+        if length > limit:
+            raise RequestTooLarge()
+        body = stream.read(limit + 1) if stream is not None else b''
+        if len(body) > limit:
+            raise RequestTooLarge()
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            text = body.decode(encoding)
+            # Тело больше не нужно: освобождаем его до разбора.
+            del body
+            return self.loads(text)
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+
+    def loads(self, text: str):
+        parse_constant = json.strict_constant if self.strict else None
+        return json.loads(text, parse_constant=parse_constant)
+
+
+class FastJSONParser(LimitedJSONParser):
+    """
+    LimitedJSONParser на orjson, если библиотека установлена.
+
+    Как и JSONParser в строгом режиме, orjson не принимает NaN
+    и Infinity.
+    """
+
+    def loads(self, text: str):
+        if orjson is None or not self.strict:
+            return super().loads(text)
+        return orjson.loads(text)
@@ -0,0 +1,186 @@
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponseBase
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_COOKIE = 'db_primary'
+PRIMARY_USER_KEY = 'db-primary:user:{}'
+# Данные аутентификации читаются из основной БД: только что выданный
+# токен может еще не дойти до реплики, и клиент получил бы 401.
+PRIMARY_MODELS = ('authtoken.token', 'sessions.session')
+
+
+@dataclass
+class Routing:
+    """Состояние маршрутизации запросов к БД в рамках HTTP-запроса."""
+
+    use_replicas: bool
+    wrote: bool = False
+
+
+_routing: ContextVar[Routing | None] = ContextVar('db_routing', default=None)
+
+
+def pinned_routing(user: Model) -> Routing | None:
+    routing = _routing.get()
+    if (
+        routing is None
+        or not routing.use_replicas
+        or not settings.DATABASE_REPLICAS
+        or not user.is_authenticated
+    ):
+        return None
+    return routing
+
+
+def follow_user_pin(user: Model) -> None:
+    """
+    Переключает чтение запроса на основную БД, если пользователь
+    недавно писал в нее (с любого устройства и без cookie).
+
+    Вызывается при аутентификации, когда пользователь становится известен.
+    """
+    routing = pinned_routing(user)
+    if routing is not None and cache.get(PRIMARY_USER_KEY.format(user.pk)):
+        routing.use_replicas = False
+
+
+async def afollow_user_pin(user: Model) -> None:
+    routing = pinned_routing(user)
+    if routing is not None and await cache.aget(
+        PRIMARY_USER_KEY.format(user.pk),
+    ):
+        routing.use_replicas = False
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор чтения с реплик `DATABASE_REPLICAS`.
+
+    Запись всегда выполняется в основную БД. Реплики используются только
+    для чтения в безопасных (GET, HEAD, OPTIONS) HTTP-запросах, которые
+    размечает `ReplicaMiddleware`; остальной код (команды, задачи, запросы
+    на изменение) и чтение токенов и сессий (`PRIMARY_MODELS`) используют
+    основную БД.
+    """
+
+    def db_for_read(self, model: type[Model], **hints) -> str | None:
+        routing = _routing.get()
+        if routing is None:
+            return None
+        if (
+            model._meta.label_lower not in PRIMARY_MODELS
+            and routing.use_replicas
+            and not routing.wrote
+            and settings.DATABASE_REPLICAS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: type[Model], **hints) -> str:
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints) -> bool | None:
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Разрешает чтение с реплик в безопасных запросах.
+
+    После записи в основную БД клиент получает cookie, и следующие
+    `DATABASE_REPLICA_PIN_SECONDS` секунд его запросы читают из основной
+    БД: реплика может отставать, а клиент должен видеть свои изменения.
+    Для аутентифицированного пользователя отметка сохраняется и в кэше
+    (`follow_user_pin`): клиенты API часто не хранят cookie.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self.should_pin(routing):
+            user_id = self.user_id(request)
+            if user_id is not None:
+                cache.set(
+                    PRIMARY_USER_KEY.format(user_id),
+                    True,
+                    settings.DATABASE_REPLICA_PIN_SECONDS,
+                )
+        return self.pin_primary(routing, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        routing = self.routing(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self.should_pin(routing):
+            user_id = self.user_id(request)
+            if user_id is not None:
+                await cache.aset(
+                    PRIMARY_USER_KEY.format(user_id),
+                    True,
+                    settings.DATABASE_REPLICA_PIN_SECONDS,
+                )
+        return self.pin_primary(routing, response)
+
+    def routing(self, request: HttpRequest) -> Routing:
+        return Routing(
+            use_replicas=request.method in SAFE_METHODS
+            and PRIMARY_COOKIE not in request.COOKIES,
+        )
+
+    def should_pin(self, routing: Routing) -> bool:
+        return routing.wrote and bool(settings.DATABASE_REPLICAS)
+
+    def user_id(self, request: HttpRequest) -> int | None:
+        # Пользователя, аутентифицированного токеном, DRF сохраняет
+        # и в HttpRequest.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
+
+    def pin_primary(
+        self,
+        routing: Routing,
+        response: HttpResponseBase,
+    ) -> HttpResponseBase:
+        if self.should_pin(routing):
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
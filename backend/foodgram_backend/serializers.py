@@ -0,0 +1,62 @@
+from typing import Callable
+
+from rest_framework import serializers
+from rest_framework.request import Request
+
+
+def query_list(request: Request | None, name: str) -> set[str] | None:
+    """Значения параметра вида `?fields=id,name` или None без параметра."""
+    if request is None or not request.query_params.get(name):
+        return None
+    return {
+        item.strip()
+        for item in request.query_params[name].split(',')
+        if item.strip()
+    }
+
+
+class DynamicFieldsMixin:
+    """
+    Выбор полей ответа параметрами запроса.
+
+    `?fields=id,name` оставляет только перечисленные поля, `?expand=tags`
+    разворачивает только перечисленные вложенные объекты, остальные
+    из `collapsed_fields` отдаются в сокращенном виде (как правило, id).
+    Без параметров отдаются все поля. Параметры применяются только
+    к сериализатору верхнего уровня, `setup_queryset` наследников
+    загружает из БД только то, что нужно выбранным полям.
+    """
+
+    collapsed_fields: dict[str, Callable[[], serializers.Field]] = {}
+
+    @classmethod
+    def wants(cls, request: Request | None, name: str) -> bool:
+        fields = query_list(request, 'fields')
+        return fields is None or name in fields
+
+    @classmethod
+    def expands(cls, request: Request | None, name: str) -> bool:
+        expand = query_list(request, 'expand')
+        return expand is None or name in expand
+
+    @property
+    def is_root(self) -> bool:
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self) -> dict:
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if not self.is_root or request is None:
+            return fields
+        for name in list(fields):
+            if not self.wants(request, name):
+                del fields[name]
+            elif name in self.collapsed_fields and not self.expands(
+                request,
+                name,
+            ):
+                fields[name] = self.collapsed_fields[name]()
+        return fields
@@ -43,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram_backend.routers.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -67,21 +68,72 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
 DATA_DIR = BASE_DIR / 'data'
 
+# Постоянные соединения (DB_CONN_MAX_AGE, с) подходят синхронным воркерам.
+# Под ASGI соединения между запросами не переиспользуются, там нужен пул
+# процесса: DB_ENGINE=foodgram_backend.db.postgresql_pool, DB_CONN_MAX_AGE=0.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('POSTGRES_DB', default='django'),
         'USER': config('POSTGRES_USER', default='django'),
         'PASSWORD': config('POSTGRES_PASSWORD', default='django'),
         'HOST': config('DB_HOST', default=''),
         'PORT': config('DB_PORT', default=5432, cast=int),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': config(
+            'DB_CONN_HEALTH_CHECKS',
+            default=True,
+            cast=bool,
+        ),
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            'MAX_LIFETIME': config(
+                'DB_POOL_MAX_LIFETIME',
+                default=3600.0,
+                cast=float,
+            ),
+        },
     },
-    'testing': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': DATA_DIR / 'db.sqlite3',
+}
+
+# Реплики только для чтения: DB_REPLICA_HOSTS=replica_1, replica_2.
+# Клиент, изменивший данные, читает из основной БД следующие
+# DATABASE_REPLICA_PIN_SECONDS секунд, пока реплики догоняют основную БД.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    config('DB_REPLICA_HOSTS', default='', cast=Csv()),
+    start=1,
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=10, cast=int)
+
+DATABASE_ROUTERS = ['foodgram_backend.routers.ReplicaRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': config('CACHE_LOCATION', default='foodgram'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
     },
 }
 
+# Локальный кэш у каждого воркера свой: при нескольких воркерах задайте
+# общий CACHE_BACKEND, иначе выход из системы виден остальным воркерам
+# только по истечении таймаута.
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,16 +169,54 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загруженные файлы называются по хэшу содержимого (см. `cleanmedia`).
+STORAGES = {
+    'default': {
+        'BACKEND': 'foodgram_backend.storages.ContentHashStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Наибольшие размер тела JSON-запроса (вместе с изображениями в base64),
+# размер и число пикселей загружаемого изображения.
+JSON_MAX_BODY_SIZE = config(
+    'JSON_MAX_BODY_SIZE',
+    default=16 * 1024 * 1024,
+    cast=int,
+)
+IMAGE_MAX_SIZE = config('IMAGE_MAX_SIZE', default=10 * 1024 * 1024, cast=int)
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=40_000_000, cast=int)
+
+# Потоки, в которых создаются уменьшенные копии изображений рецептов;
+# 0 - копии создаются в самом запросе после сохранения рецепта.
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+
+# Кэш страниц списка рецептов для анонимных пользователей в памяти
+# процесса: время жизни (с, 0 - кэш отключен) и число страниц.
+RECIPE_PAGE_CACHE_TIMEOUT = config('RECIPE_PAGE_CACHE_TIMEOUT', default=30, cast=int)
+RECIPE_PAGE_CACHE_MAX_ENTRIES = config('RECIPE_PAGE_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'foodgram_backend.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'foodgram_backend.pagination.LimitPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodgram_backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'foodgram_backend.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from typing import Iterator
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Файловое хранилище с именами файлов по SHA-256 содержимого.
+
+    Файл `recipes/photo.jpg` сохраняется как `recipes/ab/ab…ef.jpg`:
+    повторная загрузка того же содержимого не создает копию, а файлы
+    можно отдавать с бессрочными заголовками кэширования. Один файл может
+    использоваться несколькими объектами, поэтому файлы не удаляются
+    вместе с объектами: неиспользуемые удаляет команда `cleanmedia`.
+    """
+
+    def hashed_name(self, name: str, content: File) -> str:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = digest.hexdigest()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name: str, content: File) -> str:
+        try:
+            return self._save_hashed(name, content)
+        finally:
+            if hasattr(content, 'temporary_file_path'):
+                # Временный файл загрузки перемещен или не понадобился:
+                # закрываем его объект, чтобы файл не остался на диске
+                # до сборки мусора.
+                content.close()
+
+    def _save_hashed(self, name: str, content: File) -> str:
+        name = self.hashed_name(name, content)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Свежая дата изменения защищает файл от удаления `cleanmedia`,
+            # пока ссылка на него еще не сохранена в БД.
+            os.utime(full_path)
+            return name
+        # Запись во временный файл и переименование: недописанный файл
+        # не окажется под именем, которое считается проверенным по хэшу.
+        directory, filename = posixpath.split(name)
+        temporary = super()._save(
+            posixpath.join(directory, f'.{uuid.uuid4().hex}-{filename}'),
+            content,
+        )
+        os.replace(self.path(temporary), full_path)
+        return name
+
+    def hashed_files(self, directory: str = '') -> Iterator[str]:
+        """Имена всех файлов хранилища, названных по содержимому."""
+        try:
+            directories, files = self.listdir(directory)
+        except FileNotFoundError:
+            return
+        for filename in files:
+            name = posixpath.join(directory, filename)
+            if HASHED_NAME.search(name):
+                yield name
+        for subdirectory in directories:
+            yield from self.hashed_files(
+                posixpath.join(directory, subdirectory),
+            )
@@ -0,0 +1,18 @@
+"""
+Настройки тестов: SQLite вместо PostgreSQL и вторая БД в роли реплики.
+
+python manage.py test --settings=foodgram_backend.test_settings
+"""
+from foodgram_backend.settings import *  # noqa: F401, F403
+from foodgram_backend.settings import DATA_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATA_DIR / 'db.sqlite3',
+    },
+    'testing_replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATA_DIR / 'db_replica.sqlite3',
+    },
+}
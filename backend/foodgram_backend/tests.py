@@ -0,0 +1,130 @@
+import threading
+from unittest import mock
+
+from django.db.backends.postgresql import base as postgresql_base
+from django.urls import reverse
+from mixer.backend.django import mixer
+from psycopg2.extensions import TRANSACTION_STATUS_INTRANS
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from foodgram_backend.db.pool import ConnectionPool, PoolTimeout
+from foodgram_backend.db.postgresql_pool.base import DatabaseWrapper
+from users.models import User
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.closed = 0
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+class ConnectionPoolTests(APITestCase):
+    def test_connection_reused(self) -> None:
+        pool = ConnectionPool(max_size=2)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        stats = pool.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['reuses'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_timeout_when_exhausted(self) -> None:
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self) -> None:
+        pool = ConnectionPool(max_size=1, timeout=5)
+        connection = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, (connection,))
+        timer.start()
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        timer.join()
+
+    def test_expired_and_broken_connections_discarded(self) -> None:
+        pool = ConnectionPool(max_lifetime=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+        pool = ConnectionPool()
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        fresh = pool.acquire(FakeConnection, check=lambda conn: False)
+        self.assertIsNot(fresh, connection)
+        pool.release(fresh, reusable=False)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_failed_connect_frees_slot(self) -> None:
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        def connect():
+            raise OSError
+
+        with self.assertRaises(OSError):
+            pool.acquire(connect)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+
+class DatabasePoolViewTests(APITestCase):
+    def setUp(self) -> None:
+        self.url = reverse('db-pool')
+        pool_stats_patch = mock.patch(
+            'foodgram_backend.views.pool_stats',
+            return_value={'default': {'size': 1}},
+        )
+        pool_stats_patch.start()
+        self.addCleanup(pool_stats_patch.stop)
+
+    def test_admin_only(self) -> None:
+        user = mixer.blend(User)
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        user.is_staff = True
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'default': {'size': 1}})
+
+
+class PooledDatabaseWrapperTests(APITestCase):
+    def setUp(self) -> None:
+        self.wrapper = DatabaseWrapper(
+            {
+                'ENGINE': 'foodgram_backend.db.postgresql_pool',
+                'NAME': 'test',
+                'OPTIONS': {},
+                'CONN_HEALTH_CHECKS': False,
+                'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.01},
+            },
+            alias=self.id(),
+        )
+        self.addCleanup(self.wrapper.pool.close)
+        connect_patch = mock.patch.object(
+            postgresql_base.DatabaseWrapper,
+            'get_new_connection',
+            side_effect=lambda conn_params: mock.Mock(closed=0),
+        )
+        self.connect = connect_patch.start()
+        self.addCleanup(connect_patch.stop)
+
+    def test_closed_connection_returned_to_pool(self) -> None:
+        connection = self.wrapper.get_new_connection({})
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        self.wrapper.connection = connection
+        self.wrapper._close()
+        connection.rollback.assert_called_once()
+        connection.close.assert_not_called()
+        self.assertIs(self.wrapper.get_new_connection({}), connection)
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_pool_timeout_is_operational_error(self) -> None:
+        self.wrapper.get_new_connection({})
+        with self.assertRaises(self.wrapper.Database.OperationalError):
+            self.wrapper.get_new_connection({})
@@ -2,8 +2,11 @@ from django.apps import apps
 from django.contrib import admin
 from django.urls import include, path
 
+from foodgram_backend.views import DatabasePoolView
+
 urlpatterns = (
     path('admin/', admin.site.urls),
+    path('api/db-pool/', DatabasePoolView.as_view(), name='db-pool'),
     path(
         'api/',
         include('users.urls', namespace=apps.get_app_config('users').name),
@@ -0,0 +1,105 @@
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpRequest, HttpResponseBase
+from django.views import View
+from rest_framework import exceptions, permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView, exception_handler
+
+from foodgram_backend.authentication import CachedTokenAuthentication
+from foodgram_backend.db.pool import pool_stats
+
+
+class AsyncAPIView(View):
+    """
+    Асинхронное представление для чтения данных API.
+
+    DRF не поддерживает асинхронные обработчики, поэтому GET и HEAD
+    обрабатывает асинхронный метод `get`: аутентификация по токену
+    и запросы к БД выполняются без блокировки цикла событий, ответ
+    формируется сериализаторами DRF. Остальные методы передаются
+    синхронному представлению DRF `sync_view` с тем же адресом.
+    """
+
+    sync_view: Callable | None = None
+    authentication = CachedTokenAuthentication()
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+    @classmethod
+    def as_view(cls, **initkwargs) -> Callable:
+        view = super().as_view(**initkwargs)
+        # csrf_exempt в Django 4.2 не поддерживает асинхронные функции.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(
+        self,
+        request: HttpRequest,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        if request.method not in ('GET', 'HEAD'):
+            if self.sync_view is None:
+                return self.finalize(
+                    self.handle_exception(
+                        exceptions.MethodNotAllowed(request.method),
+                    ),
+                )
+            return await sync_to_async(self.sync_view)(
+                request,
+                *args,
+                **kwargs,
+            )
+        self.request = Request(request)
+        try:
+            self.request.user = await self.authenticate(request)
+            response = await self.get(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize(response)
+
+    async def authenticate(self, request: HttpRequest):
+        credentials = await self.authentication.aauthenticate(request)
+        return AnonymousUser() if credentials is None else credentials[0]
+
+    def handle_exception(self, exc: Exception) -> Response:
+        if isinstance(exc, ObjectDoesNotExist):
+            exc = Http404()
+        if isinstance(
+            exc,
+            (exceptions.NotAuthenticated, exceptions.AuthenticationFailed),
+        ):
+            exc.auth_header = self.authentication.authenticate_header(
+                self.request,
+            )
+        response = exception_handler(
+            exc,
+            {'view': self, 'request': self.request},
+        )
+        if response is None:
+            raise exc
+        return response
+
+    def finalize(self, response: HttpResponseBase) -> HttpResponseBase:
+        if isinstance(response, Response):
+            response.accepted_renderer = self.renderer
+            response.accepted_media_type = self.renderer.media_type
+            response.renderer_context = {
+                'view': self,
+                'request': self.request,
+                'response': response,
+            }
+        return response
+
+
+class DatabasePoolView(APIView):
+    """Показатели пулов соединений с БД процесса, обработавшего запрос."""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request: Request) -> Response:
+        return Response(pool_stats())
@@ -0,0 +1,170 @@
+import hashlib
+from datetime import datetime
+
+from django.db.models import Count, Exists, OuterRef, QuerySet, Window
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import Change, Favorite, ShoppingCart
+from users.models import Subsription, User
+
+RECIPE_FIELDS = ('pk', 'modified')
+USER_FLAGS = ('etag_favorited', 'etag_in_shopping_cart', 'etag_subscribed')
+
+
+async def arecipes_generation() -> int:
+    """
+    Поколение рецептов - номер последней опубликованной записи журнала
+    об изменении рецептов (изменения тегов, ингредиентов и авторов
+    записываются в рецепты). Запись о рецепте заменяет прежние, поэтому
+    номер растет при любом изменении, включая удаление.
+    """
+    return (
+        await Change.objects.filter(
+            kind=Change.Kind.RECIPE,
+            seq__isnull=False,
+        )
+        .order_by('-seq')
+        .values_list('seq', flat=True)
+        .afirst()
+    ) or 0
+
+
+def with_user_flags(queryset: QuerySet, user: User) -> QuerySet:
+    """Флаги рецептов, зависящие от пользователя, для отпечатка ответа."""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        etag_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk')),
+        ),
+        etag_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk')),
+        ),
+        etag_subscribed=Exists(
+            Subsription.objects.filter(
+                subscriber=user,
+                author=OuterRef('author'),
+            ),
+        ),
+    )
+
+
+def validator_fields(user: User) -> tuple[str, ...]:
+    if user.is_anonymous:
+        return RECIPE_FIELDS
+    return RECIPE_FIELDS + USER_FLAGS
+
+
+def make_etag(request: HttpRequest, rows: list) -> str:
+    """
+    ETag ответа по адресу, пользователю и строкам валидатора.
+
+    Валидаторы читаются из БД: `Recipe.modified` меняется и при изменении
+    тегов, ингредиентов и авторов рецепта (`touch_recipes`).
+    """
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(
+        repr((request.get_full_path(), request.user.pk, rows)).encode(),
+    )
+    return quote_etag(digest.hexdigest())
+
+
+async def recipe_validators(
+    request: HttpRequest,
+    queryset: QuerySet,
+    pk: int,
+) -> tuple[str, datetime | None] | None:
+    """
+    ETag и Last-Modified рецепта одним запросом без связанных объектов.
+
+    Last-Modified отдается только анонимным пользователям: флаги
+    избранного, корзины и подписки не меняют `Recipe.modified`.
+    """
+    rows = [
+        row
+        async for row in with_user_flags(
+            queryset.prefetch_related(None).filter(pk=pk),
+            request.user,
+        ).values_list(*validator_fields(request.user))
+    ]
+    if not rows:
+        return None
+    last_modified = rows[0][1] if request.user.is_anonymous else None
+    return make_etag(request, rows), last_modified
+
+
+async def page_validators(
+    request: HttpRequest,
+    queryset: QuerySet,
+    offset: int,
+    limit: int,
+) -> tuple[str, int] | None:
+    """
+    ETag страницы рецептов и общее число рецептов одним запросом.
+
+    Отпечаток страницы - id, время изменения и флаги ее рецептов
+    и общее число рецептов, которое заменяет запрос COUNT пагинации.
+    """
+    rows = [
+        row
+        async for row in with_user_flags(
+            queryset.prefetch_related(None),
+            request.user,
+        )
+        .annotate(etag_total=Window(Count('pk')))
+        .values_list(*validator_fields(request.user), 'etag_total')[
+            offset:offset + limit
+        ]
+    ]
+    if not rows:
+        return None
+    return make_etag(request, rows), rows[0][-1]
+
+
+async def batch_etag(
+    request: HttpRequest,
+    queryset: QuerySet,
+    ids: list[int],
+) -> str:
+    """ETag ответа `?ids=`: рецепты в порядке `ids` задает адрес."""
+    rows = [
+        row
+        async for row in with_user_flags(
+            queryset.prefetch_related(None).filter(pk__in=ids).order_by('pk'),
+            request.user,
+        ).values_list(*validator_fields(request.user))
+    ]
+    return make_etag(request, rows)
+
+
+def not_modified(
+    request: HttpRequest,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> HttpResponse | None:
+    """Ответ 304 (или 412), если клиенту не нужен ответ целиком."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp()),
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(
+    response: HttpResponseBase,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> HttpResponseBase:
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(
+            last_modified.timestamp(),
+        )
+    # Флаги в ответе зависят от токена пользователя.
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,179 @@
+import csv
+import json
+import zlib
+from typing import AsyncIterator, Callable, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from recipes.importers import INGREDIENT_SEPARATOR, LIST_SEPARATOR
+from recipes.models import Favorite, IngredientAmount, Recipe, ShoppingCart
+from users.models import Subsription
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def recipe_rows(chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Рецепты с ингредиентами и тегами в формате JSON-импорта.
+
+    Рецепты читаются итератором (server-side cursor в PostgreSQL),
+    связанные объекты подгружаются для каждой пачки отдельно.
+    """
+    queryset = (
+        Recipe.objects.defer('search_vector')
+        .select_related('author')
+        .prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientAmount.objects.select_related('ingredient'),
+            ),
+        )
+        .order_by('pk')
+    )
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': recipe.pk,
+            'name': recipe.name,
+            'author': recipe.author.username,
+            'cooking_time': recipe.cooking_time,
+            'text': recipe.text,
+            'image': recipe.image.name,
+            'pub_date': recipe.pub_date.isoformat(),
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': amount.ingredient.name,
+                    'measurement_unit': amount.ingredient.measurement_unit,
+                    'amount': amount.amount,
+                }
+                for amount in recipe.ingredient_amounts.all()
+            ],
+        }
+
+
+def relation_rows(model, *fields: str) -> Callable[[int], Iterator[dict]]:
+    def rows(chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+        queryset = model.objects.order_by('pk').values(*fields)
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+    return rows
+
+
+EXPORTERS = {
+    'recipes': recipe_rows,
+    'favorites': relation_rows(
+        Favorite,
+        'id',
+        'user_id',
+        'user__username',
+        'recipe_id',
+    ),
+    'shopping_cart': relation_rows(
+        ShoppingCart,
+        'id',
+        'user_id',
+        'user__username',
+        'recipe_id',
+    ),
+    'subscriptions': relation_rows(
+        Subsription,
+        'id',
+        'subscriber_id',
+        'subscriber__username',
+        'author_id',
+        'author__username',
+    ),
+}
+
+
+def flatten(row: dict) -> dict:
+    """Приводит вложенные списки рецепта к формату `recipes.csv`."""
+    if 'tags' in row:
+        row['tags'] = LIST_SEPARATOR.join(row['tags'])
+    if 'ingredients' in row:
+        row['ingredients'] = LIST_SEPARATOR.join(
+            INGREDIENT_SEPARATOR.join(
+                (item['name'], item['measurement_unit'], str(item['amount'])),
+            )
+            for item in row['ingredients']
+        )
+    return row
+
+
+class Echo:
+    """Псевдо-буфер для `csv.writer`, возвращающий записанную строку."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def render(rows: Iterable[dict], fmt: str) -> Iterator[bytes]:
+    if fmt == 'ndjson':
+        for row in rows:
+            yield (json.dumps(row, ensure_ascii=False) + '\n').encode()
+    elif fmt == 'csv':
+        writer = csv.writer(Echo())
+        header = None
+        for row in map(flatten, rows):
+            if header is None:
+                header = tuple(row)
+                yield writer.writerow(header).encode()
+            yield writer.writerow(row.values()).encode()
+    else:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+
+
+def buffered(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Склеивает мелкие строки в блоки около `BUFFER_SIZE` байт."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Сжимает поток на лету, не накапливая его в памяти."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+def export(
+    name: str,
+    fmt: str = 'ndjson',
+    compress: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Потоковая выгрузка таблицы `name` в формате `fmt`."""
+    if name not in EXPORTERS:
+        raise ValueError(f'Неизвестная таблица: {name}')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+    stream = buffered(render(EXPORTERS[name](chunk_size), fmt))
+    return gzip_stream(stream) if compress else stream
+
+
+async def aiterate(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Асинхронный поток поверх синхронного для ответа под ASGI.
+
+    Каждый блок читается в потоке синхронного кода (там же, где открыт
+    курсор БД), поэтому ответ отдается по мере чтения, а не собирается
+    в памяти целиком, как синхронный поток под ASGI.
+    """
+    read = sync_to_async(next)
+    try:
+        while (chunk := await read(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
@@ -1,9 +1,99 @@
+import threading
+import time
+from typing import Iterable
+
+from django import forms
+from django.db.models import Exists, OuterRef
 from django.db.models.query import QuerySet
-from django_filters import ModelMultipleChoiceFilter
+from django_filters.fields import MultipleChoiceField
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
+
+from recipes.index import ingredient_index
+from recipes.models import IngredientAmount, Recipe, Tag
+from recipes.search import search_recipes
+
+
+class TagSlugCache:
+    """
+    Процессный кэш соответствия слаг -> id тегов.
+
+    Сбрасывается сигналами при изменении тегов, а также перечитывается
+    по таймауту и при запросе неизвестного слага, созданного другим
+    процессом. Неизвестные слаги перечитывают теги не чаще раза
+    в `miss_timeout` секунд.
+    """
+
+    timeout = 300
+    miss_timeout = 5
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._expires = 0.0
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def stale(self, slugs: Iterable[str]) -> bool:
+        now = time.monotonic()
+        if now >= self._expires:
+            return True
+        return (
+            now >= self._loaded + self.miss_timeout
+            and not self._ids.keys() >= set(slugs)
+        )
 
-from recipes.models import Recipe, Tag
-from users.models import User
+    def get(self, slugs: Iterable[str] = ()) -> dict[str, int]:
+        slugs = set(slugs)
+        if self.stale(slugs):
+            with self._lock:
+                # Теги мог перечитать другой поток, пока мы ждали.
+                if self.stale(slugs):
+                    self._ids = dict(Tag.objects.values_list('slug', 'id'))
+                    self._loaded = time.monotonic()
+                    self._expires = self._loaded + self.timeout
+        return self._ids
+
+    def clear(self) -> None:
+        self._expires = 0.0
+
+
+tag_slugs = TagSlugCache()
+
+
+class SlugsField(MultipleChoiceField):
+    """Список слагов; их существование проверяет сам фильтр."""
+
+    def valid_value(self, value: str) -> bool:
+        return True
+
+
+class SlugsFilter(filters.MultipleChoiceFilter):
+    field_class = SlugsField
+
+
+def split_ids(values: Iterable[str]) -> list[int]:
+    """
+    Id из повторяющихся параметров и/или списков через запятую:
+    `?ingredients=1&ingredients=2` и `?ingredients=1,2`, как `?ids=`.
+    """
+    return [
+        int(pk)
+        for value in values
+        for pk in value.split(',')
+        if pk.strip()
+    ]
+
+
+class IdsField(SlugsField):
+    def clean(self, value) -> list[int]:
+        try:
+            return split_ids(super().clean(value))
+        except ValueError:
+            raise forms.ValidationError('Ожидается список id')
+
+
+class IdsFilter(filters.MultipleChoiceFilter):
+    field_class = IdsField
 
 
 class RecipeFilter(FilterSet):
@@ -15,15 +105,85 @@ class RecipeFilter(FilterSet):
         author: фильтрация по автору рецепта
         is_favorited: фильтрация по наличию в избранном [bool]
         is_in_shopping_cart: фильтрация по наличию в списке покупок [bool]
+        ingredients: рецепты со всеми перечисленными ингредиентами [id]
+        exclude_ingredients: рецепты без перечисленных ингредиентов [id]
+        search: полнотекстовый поиск с сортировкой по релевантности
+        highlight: выделение найденных фрагментов описания [bool]
+        ordering: сортировка по популярности [popular, trending]
+
+    Списки id передаются повтором параметра или через запятую.
     """
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
-    )
-    author = filters.ModelChoiceFilter(queryset=User.objects.all())
+    tags = SlugsFilter(method='filter_tags')
+    author = filters.NumberFilter()
     is_favorited = filters.BooleanFilter(method='filter_favorited')
     is_in_shopping_cart = filters.BooleanFilter(method='filter_shopping_cart')
+    ingredients = IdsFilter(method='filter_ingredients')
+    exclude_ingredients = IdsFilter(method='filter_exclude_ingredients')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Популярные за последнее время'),
+        ),
+        method='filter_ordering',
+    )
+
+    # Больший список id передается в БД как подзапросы по индексу
+    # (recipe, ingredient) вместо IN (...) с тысячами параметров.
+    max_ids_in_query = 5000
+
+    def filter_tags(self, queryset, name, value) -> QuerySet:
+        if not value:
+            return queryset
+        ids = tag_slugs.get(value)
+        unknown = [slug for slug in value if slug not in ids]
+        if unknown:
+            raise ValidationError({name: f'Теги не найдены: {unknown}'})
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag_id__in=[ids[slug] for slug in value],
+                ),
+            ),
+        )
+
+    def ingredient_exists(self, ingredient_ids: list[int]) -> Exists:
+        return Exists(
+            IngredientAmount.objects.filter(
+                recipe=OuterRef('pk'),
+                ingredient_id__in=ingredient_ids,
+            ),
+        )
+
+    def filter_ingredients(self, queryset, name, value) -> QuerySet:
+        if not value:
+            return queryset
+        recipe_ids = ingredient_index.recipes_with_all(value)
+        if len(recipe_ids) <= self.max_ids_in_query:
+            return queryset.filter(pk__in=recipe_ids)
+        for ingredient_id in set(value):
+            queryset = queryset.filter(self.ingredient_exists([ingredient_id]))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value) -> QuerySet:
+        if not value:
+            return queryset
+        recipe_ids = ingredient_index.recipes_with_any(value)
+        if len(recipe_ids) <= self.max_ids_in_query:
+            return queryset.exclude(pk__in=recipe_ids)
+        return queryset.exclude(self.ingredient_exists(value))
+
+    def filter_search(self, queryset, name, value) -> QuerySet:
+        highlight = self.data.get('highlight') in ('1', 'true')
+        return search_recipes(queryset, value.strip(), highlight)
+
+    def filter_ordering(self, queryset, name, value) -> QuerySet:
+        field = {'popular': 'popularity', 'trending': 'trending'}[value]
+        return queryset.filter(score__isnull=False).order_by(
+            f'-score__{field}',
+            '-score__recipe_id',
+        )
 
     def filter_favorited(self, queryset, name, value) -> QuerySet:
         user_id = getattr(self.request.user, 'id', None)
@@ -0,0 +1,281 @@
+import base64
+import io
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.importers import chunked
+from recipes.models import Change, Recipe
+from recipes.sync import record_changes
+
+logger = logging.getLogger(__name__)
+
+# Размеры, в которые вписываются копии; меньшие изображения не увеличиваются.
+VARIANTS = {
+    'thumb': (160, 160),
+    'card': (640, 640),
+    'detail': (1280, 1280),
+}
+VARIANTS_DIR = 'recipes/variants'
+WEBP_QUALITY = 80
+# Заглушка (LQIP) - копия в несколько пикселей, которую клиент растягивает
+# с размытием, пока загружается изображение.
+PLACEHOLDER_SIZE = (16, 16)
+PLACEHOLDER_QUALITY = 30
+CHUNK_SIZE = 100
+DEFAULT_IMAGE = Recipe._meta.get_field('image').default
+GC_GRACE = timedelta(hours=1)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def prepare(image: Image.Image) -> Image.Image:
+    """
+    Изображение с примененной ориентацией из EXIF в режиме RGB(A).
+
+    Метаданные (EXIF, ICC, XMP) в копии изображения не попадают.
+    """
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        transparent = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+    return image
+
+
+def render_variants(image: Image.Image) -> dict[str, bytes]:
+    """Уменьшенные копии изображения в WebP."""
+    image = prepare(image)
+    rendered = {}
+    for name, size in VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        rendered[name] = buffer.getvalue()
+    return rendered
+
+
+def render_placeholder(image: Image.Image) -> str:
+    """Заглушка изображения в виде data URI WebP (сотни байт)."""
+    # JPEG сразу декодируется в уменьшенном масштабе.
+    image.draft('RGB', (PLACEHOLDER_SIZE[0] * 8, PLACEHOLDER_SIZE[1] * 8))
+    image = prepare(image)
+    image.thumbnail(PLACEHOLDER_SIZE, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(
+        buffer.getvalue(),
+    ).decode()
+
+
+def generate_variants(recipe_id: int) -> dict[str, str]:
+    """
+    Создает копии и заглушку изображения и сохраняет их в рецепте.
+
+    Если изображение успели заменить, результат отбрасывается: копии для
+    нового изображения создаст следующая задача.
+    """
+    recipe = Recipe.objects.only('image').filter(pk=recipe_id).first()
+    if recipe is None or recipe.image.name in ('', DEFAULT_IMAGE):
+        return {}
+    source = recipe.image.name
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        rendered = render_variants(image)
+    with Image.open(io.BytesIO(rendered['thumb'])) as thumb:
+        placeholder = render_placeholder(thumb)
+    variants = {
+        name: default_storage.save(
+            f'{VARIANTS_DIR}/{name}.webp',
+            ContentFile(content),
+        )
+        for name, content in rendered.items()
+    }
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_variants=variants,
+        image_placeholder=placeholder,
+        modified=timezone.now(),
+    )
+    if not updated:
+        return {}
+    record_changes(Change.Kind.RECIPE, (recipe_id,))
+    return variants
+
+
+def reset_variants(recipe: Recipe) -> None:
+    """
+    Сбрасывает копии и заглушку перед заменой изображения рецепта.
+
+    Файлы копий могут использоваться другими рецептами с тем же
+    изображением, неиспользуемые удаляет `collect_media`.
+    """
+    recipe.image_variants = {}
+    recipe.image_placeholder = ''
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def process(recipe_id: int) -> None:
+    try:
+        generate_variants(recipe_id)
+    except Exception:
+        logger.exception('Ошибка обработки изображения рецепта %s', recipe_id)
+
+
+def process_in_worker(recipe_id: int) -> None:
+    try:
+        process(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe_id: int) -> None:
+    """
+    Создает копии изображения после фиксации транзакции.
+
+    Pillow освобождает GIL при декодировании и сжатии, поэтому копии
+    создаются в пуле из `IMAGE_WORKERS` потоков, не задерживая ответ.
+    """
+    if not settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: process(recipe_id))
+        return
+    transaction.on_commit(
+        lambda: executor().submit(process_in_worker, recipe_id),
+    )
+
+
+def image_urls(recipe: Recipe) -> dict[str, str]:
+    """Адреса копий изображения; пока копий нет - адрес оригинала."""
+    original = recipe.image.url
+    variants = recipe.image_variants or {}
+    urls = {
+        name: default_storage.url(variants[name])
+        if name in variants
+        else original
+        for name in VARIANTS
+    }
+    urls['original'] = original
+    return urls
+
+
+def _placeholders_chunk(
+    rows: list[tuple[int, str, str]],
+) -> list[tuple[int, str, str]]:
+    results = []
+    for recipe_id, source, thumb in rows:
+        try:
+            with default_storage.open(thumb or source, 'rb') as file:
+                with Image.open(file) as image:
+                    placeholder = render_placeholder(image)
+        except (OSError, ValueError):
+            logger.exception(
+                'Ошибка обработки изображения рецепта %s',
+                recipe_id,
+            )
+            continue
+        results.append((recipe_id, source, placeholder))
+    return results
+
+
+def store_placeholders(results: list[tuple[int, str, str]]) -> None:
+    """Сохраняет заглушки рецептов, изображения которых не изменились."""
+    updated = []
+    with transaction.atomic():
+        for recipe_id, source, placeholder in results:
+            if Recipe.objects.filter(pk=recipe_id, image=source).update(
+                image_placeholder=placeholder,
+                modified=timezone.now(),
+            ):
+                updated.append(recipe_id)
+        record_changes(Change.Kind.RECIPE, updated)
+
+
+def refresh_placeholders(
+    missing_only: bool = True,
+    workers: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Создает заглушки изображений рецептов и возвращает число рецептов.
+
+    Заглушка строится по уменьшенной копии, если она есть, иначе по
+    оригиналу. При `workers` > 0 пакеты по `chunk_size` рецептов
+    обрабатываются в отдельных процессах.
+    """
+    recipes = Recipe.objects.exclude(image__in=('', DEFAULT_IMAGE))
+    if missing_only:
+        recipes = recipes.filter(image_placeholder='')
+    rows = [
+        (recipe_id, image, variants.get('thumb', ''))
+        for recipe_id, image, variants in recipes.values_list(
+            'pk',
+            'image',
+            'image_variants',
+        ).iterator(chunk_size=10000)
+    ]
+    chunks = chunked(rows, chunk_size)
+    if not workers:
+        for chunk in chunks:
+            store_placeholders(_placeholders_chunk(chunk))
+        return len(rows)
+    connections.close_all()
+    with ProcessPoolExecutor(workers) as executor:
+        for results in executor.map(_placeholders_chunk, chunks):
+            store_placeholders(results)
+    return len(rows)
+
+
+def media_references() -> Counter[str]:
+    """Число ссылок из рецептов на каждый файл изображений и копий."""
+    references: Counter[str] = Counter()
+    rows = Recipe.objects.values_list('image', 'image_variants').iterator(
+        chunk_size=10000,
+    )
+    for image, variants in rows:
+        if image:
+            references[image] += 1
+        references.update(variants.values())
+    return references
+
+
+def collect_media(
+    grace: timedelta = GC_GRACE,
+    dry_run: bool = False,
+) -> tuple[list[str], Counter[str]]:
+    """
+    Удаляет файлы хранилища, на которые не ссылается ни один рецепт.
+
+    Файлы моложе `grace` не удаляются: ссылка на только что сохраненный
+    файл может быть еще не зафиксирована в БД. Возвращает удаленные файлы
+    и число ссылок на используемые.
+    """
+    references = media_references()
+    deadline = timezone.now() - grace
+    removed = []
+    for name in default_storage.hashed_files():
+        if references[name]:
+            continue
+        if default_storage.get_modified_time(name) > deadline:
+            continue
+        if not dry_run:
+            default_storage.delete(name)
+        removed.append(name)
+    return removed, references
@@ -0,0 +1,243 @@
+import csv
+import json
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from django.db import transaction
+
+from recipes.index import ingredient_index
+from recipes.models import (
+    Change,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    RecipeScore,
+    Tag,
+)
+from recipes.search import update_search_vectors
+from recipes.sync import record_changes
+from users.models import User
+
+CHUNK_SIZE = 1000
+LIST_SEPARATOR = ';'
+INGREDIENT_SEPARATOR = ':'
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+
+
+def split_list(value: str | None) -> list[str]:
+    return [
+        item.strip()
+        for item in (value or '').split(LIST_SEPARATOR)
+        if item.strip()
+    ]
+
+
+def parse_csv_row(row: dict) -> dict:
+    """
+    Приводит строку `recipes.csv` к формату JSON-импорта.
+
+    Теги перечисляются через `;`, ингредиенты - через `;` в формате
+    `название:единицы измерения:количество`.
+    """
+    ingredients = []
+    for item in split_list(row.get('ingredients')):
+        try:
+            name, unit, amount = item.rsplit(INGREDIENT_SEPARATOR, 2)
+        except ValueError:
+            raise RecipeImportError(f'Некорректный ингредиент: {item}')
+        ingredients.append(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+        )
+    return {
+        'name': row.get('name'),
+        'author': row.get('author'),
+        'cooking_time': row.get('cooking_time'),
+        'text': row.get('text'),
+        'tags': split_list(row.get('tags')),
+        'ingredients': ingredients,
+    }
+
+
+class CSVRow(dict):
+    """Строка CSV, которая разбирается при импорте рецепта."""
+
+
+class NDJSONLine(str):
+    """Строка NDJSON, которая разбирается при импорте рецепта."""
+
+
+def parse_row(row: dict | CSVRow | NDJSONLine) -> dict:
+    if isinstance(row, CSVRow):
+        return parse_csv_row(row)
+    if isinstance(row, NDJSONLine):
+        return json.loads(row)
+    return row
+
+
+def read_rows(file: IO[str], fmt: str) -> Iterator[dict]:
+    """
+    Читает рецепты из файла в формате `csv`, `json` или `ndjson`.
+
+    Строки CSV и NDJSON разбираются в `RecipeImporter`, чтобы ошибка
+    в одной строке попала в отчет, а не прервала импорт.
+    """
+    if fmt == 'csv':
+        yield from map(CSVRow, csv.DictReader(file))
+    elif fmt == 'json':
+        yield from json.load(file)
+    elif fmt == 'ndjson':
+        yield from (NDJSONLine(line) for line in file if line.strip())
+    else:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class RecipeImportError(ValueError):
+    pass
+
+
+class RecipeImporter:
+    """
+    Массовый импорт рецептов.
+
+    Ингредиенты, теги и авторы разрешаются через словари в памяти,
+    загружаемые один раз на весь импорт. Рецепты, ингредиенты и теги
+    создаются пакетными вставками, каждая пачка - в отдельной транзакции.
+    Рецепты, уже существующие у автора, пропускаются.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        default_author: User | None = None,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.default_author = default_author
+        self.created = 0
+        self.skipped = 0
+        self.errors: list[str] = []
+        self.ingredients = {
+            (name.lower(), unit.lower()): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id',
+                'name',
+                'measurement_unit',
+            )
+        }
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.authors = dict(User.objects.values_list('username', 'id'))
+        self.existing = set(Recipe.objects.values_list('author_id', 'name'))
+
+    def resolve_author(self, username: str | None) -> int:
+        if not username and self.default_author:
+            return self.default_author.pk
+        try:
+            return self.authors[username]
+        except KeyError:
+            raise RecipeImportError(f'Автор не найден: {username}')
+
+    def resolve_tags(self, slugs: list[str]) -> list[int]:
+        try:
+            return list(dict.fromkeys(self.tags[slug] for slug in slugs))
+        except KeyError as err:
+            raise RecipeImportError(f'Тег не найден: {err.args[0]}')
+
+    def resolve_ingredients(self, items: list[dict]) -> dict[int, int]:
+        amounts: dict[int, int] = {}
+        for item in items:
+            key = (
+                str(item.get('name', '')).strip().lower(),
+                str(item.get('measurement_unit', '')).strip().lower(),
+            )
+            if key not in self.ingredients:
+                raise RecipeImportError(f'Ингредиент не найден: {key[0]}')
+            amount = int(item.get('amount', 1))
+            if amount < 1:
+                raise RecipeImportError(
+                    f'Кол-во ингредиента {key[0]} меньше 1',
+                )
+            amounts[self.ingredients[key]] = amount
+        return amounts
+
+    def prepare(self, row: dict) -> tuple[Recipe, list[int], dict[int, int]]:
+        row = parse_row(row)
+        name = str(row.get('name') or '').strip()
+        if not name:
+            raise RecipeImportError('Отсутствует название рецепта')
+        cooking_time = int(row.get('cooking_time') or 0)
+        if cooking_time < 1:
+            raise RecipeImportError('Минимальное время приготовления: 1 мин')
+        recipe = Recipe(
+            name=name,
+            author_id=self.resolve_author(row.get('author')),
+            text=row.get('text') or '',
+            cooking_time=cooking_time,
+        )
+        tags = self.resolve_tags(row.get('tags') or [])
+        ingredients = self.resolve_ingredients(row.get('ingredients') or [])
+        if not ingredients:
+            raise RecipeImportError('Ингредиенты отсутствуют')
+        return recipe, tags, ingredients
+
+    def import_chunk(self, rows: list[tuple[int, dict]]) -> None:
+        prepared = []
+        for line, row in rows:
+            try:
+                recipe, tags, ingredients = self.prepare(row)
+            except (AttributeError, TypeError, ValueError) as err:
+                self.errors.append(f'{line}: {err}')
+                continue
+            key = (recipe.author_id, recipe.name)
+            if key in self.existing:
+                self.skipped += 1
+                continue
+            self.existing.add(key)
+            prepared.append((recipe, tags, ingredients))
+        if not prepared:
+            return
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                [recipe for recipe, _, _ in prepared],
+            )
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for recipe, (_, _, ingredients) in zip(recipes, prepared)
+                for ingredient_id, amount in ingredients.items()
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, (_, tags, _) in zip(recipes, prepared)
+                for tag_id in tags
+            )
+            RecipeScore.objects.bulk_create(
+                RecipeScore(recipe_id=recipe.pk) for recipe in recipes
+            )
+            ids = [recipe.pk for recipe in recipes]
+            update_search_vectors(Recipe.objects.filter(pk__in=ids))
+            record_changes(Change.Kind.RECIPE, ids)
+        self.created += len(recipes)
+
+    def run(self, rows: Iterable[dict]) -> 'RecipeImporter':
+        try:
+            for chunk in chunked(enumerate(rows, 1), self.chunk_size):
+                self.import_chunk(chunk)
+        finally:
+            if self.created:
+                ingredient_index.invalidate()
+        return self
+
+    def report(self) -> dict:
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': self.errors,
+        }
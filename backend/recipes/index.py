@@ -0,0 +1,195 @@
+import bisect
+import threading
+from array import array
+from collections import Counter
+from typing import Iterable
+
+from django.db import transaction
+
+from recipes.models import Change, IngredientAmount
+
+
+class IngredientIndex:
+    """
+    Инвертированный индекс ингредиент -> отсортированный массив id рецептов.
+
+    Вместе с числом ингредиентов каждого рецепта образует матрицу
+    инцидентности рецепт x ингредиент, по которой считается покрытие
+    рецептов набором продуктов.
+
+    Индекс строится в памяти процесса при первом обращении и догоняет
+    журнал изменений `Change`: рецепты, изменившиеся после построения
+    (в том числе в других процессах), перечитываются при следующем
+    обращении. Изменения ингредиентов рецепта в этом процессе учитываются
+    после фиксации транзакции (`refresh`). Изменения в обход журнала
+    и сигналов видны после `invalidate()`.
+
+    Массивы индекса меняются на месте, поэтому и обновление, и чтение
+    выполняются под блокировкой.
+    """
+
+    # При большем числе изменившихся рецептов индекс строится заново.
+    max_reload = 500
+
+    def __init__(self) -> None:
+        self._postings: dict[int, array] = {}
+        self._sizes: Counter[int] = Counter()
+        self._ingredients: dict[int, tuple[int, ...]] = {}
+        # Номер последней учтенной записи журнала.
+        self._checkpoint: int | None = None
+        self._stale: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _changes(self, since: int) -> list[tuple[int, int]]:
+        return list(
+            Change.objects.filter(kind=Change.Kind.RECIPE, seq__gt=since)
+            .order_by('seq')
+            .values_list('seq', 'recipe_id'),
+        )
+
+    def _build(self) -> None:
+        # Номер журнала читается до строк индекса: изменения,
+        # опубликованные позже, будут перечитаны.
+        checkpoint = (
+            Change.objects.filter(
+                kind=Change.Kind.RECIPE,
+                seq__isnull=False,
+            )
+            .order_by('-seq')
+            .values_list('seq', flat=True)
+            .first()
+        ) or 0
+        postings: dict[int, list[int]] = {}
+        ingredients: dict[int, list[int]] = {}
+        rows = (
+            IngredientAmount.objects.order_by('recipe_id')
+            .values_list('ingredient_id', 'recipe_id')
+            .iterator(chunk_size=10000)
+        )
+        for ingredient_id, recipe_id in rows:
+            postings.setdefault(ingredient_id, []).append(recipe_id)
+            ingredients.setdefault(recipe_id, []).append(ingredient_id)
+        self._postings = {
+            ingredient_id: array('q', recipe_ids)
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        self._ingredients = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in ingredients.items()
+        }
+        self._sizes = Counter(
+            {
+                recipe_id: len(ingredient_ids)
+                for recipe_id, ingredient_ids in self._ingredients.items()
+            },
+        )
+        self._checkpoint = checkpoint
+        self._stale = set()
+
+    def _catch_up(self) -> None:
+        """Перечитывает рецепты из новых записей журнала."""
+        changes = self._changes(self._checkpoint)
+        recipe_ids = {recipe_id for _, recipe_id in changes}
+        stale, self._stale = self._stale, set()
+        recipe_ids |= stale
+        if len(recipe_ids) > self.max_reload:
+            return self._build()
+        if recipe_ids:
+            self._reload(recipe_ids)
+        if changes:
+            self._checkpoint = changes[-1][0]
+
+    def _reload(self, recipe_ids: set[int]) -> None:
+        ingredients: dict[int, list[int]] = {pk: [] for pk in recipe_ids}
+        for ingredient_id, recipe_id in IngredientAmount.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).values_list('ingredient_id', 'recipe_id'):
+            ingredients[recipe_id].append(ingredient_id)
+        for recipe_id, ingredient_ids in ingredients.items():
+            for ingredient_id in self._ingredients.pop(recipe_id, ()):
+                posting = self._postings[ingredient_id]
+                del posting[bisect.bisect_left(posting, recipe_id)]
+            self._sizes.pop(recipe_id, None)
+            if not ingredient_ids:
+                continue
+            for ingredient_id in ingredient_ids:
+                posting = self._postings.setdefault(ingredient_id, array('q'))
+                position = bisect.bisect_left(posting, recipe_id)
+                posting.insert(position, recipe_id)
+            self._ingredients[recipe_id] = tuple(ingredient_ids)
+            self._sizes[recipe_id] = len(ingredient_ids)
+
+    def _ensure(self) -> None:
+        # Вызывается под блокировкой.
+        if self._checkpoint is None:
+            self._build()
+        else:
+            self._catch_up()
+
+    def invalidate(self) -> None:
+        """Перестроить индекс этого процесса при следующем обращении."""
+        self._checkpoint = None
+
+    def refresh(self, *recipe_ids: int) -> None:
+        """Перечитать рецепты после фиксации текущей транзакции."""
+        transaction.on_commit(lambda: self._stale.update(recipe_ids))
+
+    def _posting(self, ingredient_id: int) -> array:
+        return self._postings.get(ingredient_id, array('q'))
+
+    def recipes_with_all(self, ingredient_ids: Iterable[int]) -> set[int]:
+        """Рецепты, содержащие все перечисленные ингредиенты."""
+        with self._lock:
+            self._ensure()
+            postings = sorted(
+                (self._posting(pk) for pk in set(ingredient_ids)),
+                key=len,
+            )
+            if not postings:
+                return set()
+            result = set(postings[0])
+            for posting in postings[1:]:
+                if not result:
+                    break
+                result.intersection_update(posting)
+            return result
+
+    def recipes_with_any(self, ingredient_ids: Iterable[int]) -> set[int]:
+        """Рецепты, содержащие хотя бы один из ингредиентов."""
+        with self._lock:
+            self._ensure()
+            result: set[int] = set()
+            for pk in set(ingredient_ids):
+                result.update(self._posting(pk))
+            return result
+
+    def rank_by_coverage(
+        self,
+        ingredient_ids: Iterable[int],
+        max_missing: int,
+    ) -> list[tuple[int, int]]:
+        """
+        Рецепты, которые можно приготовить из набора ингредиентов.
+
+        Возвращает пары (id рецепта, число недостающих ингредиентов):
+        сначала рецепты без недостающих, затем с одним и т.д., внутри
+        группы - более новые рецепты первыми.
+        """
+        with self._lock:
+            self._ensure()
+            present: Counter[int] = Counter()
+            for pk in set(ingredient_ids):
+                present.update(self._posting(pk))
+            buckets: list[list[int]] = [[] for _ in range(max_missing + 1)]
+            for recipe_id, count in present.items():
+                missing = self._sizes[recipe_id] - count
+                if missing <= max_missing:
+                    buckets[missing].append(recipe_id)
+        return [
+            (recipe_id, missing)
+            for missing, bucket in enumerate(buckets)
+            for recipe_id in sorted(bucket, reverse=True)
+        ]
+
+
+ingredient_index = IngredientIndex()
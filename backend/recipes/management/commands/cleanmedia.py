@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram_backend.storages import ContentHashStorage
+from recipes.images import GC_GRACE, collect_media
+
+
+class Command(BaseCommand):
+    """
+    Removes content-addressed media files no recipe refers to.
+
+    Использование:
+    ```
+    manage.py cleanmedia [--grace 3600]
+    manage.py cleanmedia --dry-run
+    ```
+    """
+
+    help = 'Removes unreferenced media files'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=int(GC_GRACE.total_seconds()),
+            help='Keep files modified within this many seconds.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list files that would be removed.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        if not isinstance(default_storage, ContentHashStorage):
+            raise CommandError('Default storage is not content-addressed.')
+        removed, references = collect_media(
+            timedelta(seconds=options['grace']),
+            options['dry_run'],
+        )
+        if options['verbosity'] > 1:
+            for name in removed:
+                self.stdout.write(name)
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(
+            f'Files removed: {len(removed)}, '
+            f'referenced: {len(references)}, shared: {shared}.',
+        )
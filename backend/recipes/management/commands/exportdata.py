@@ -0,0 +1,67 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.exporters import CHUNK_SIZE, EXPORT_FORMATS, EXPORTERS, export
+
+
+class Command(BaseCommand):
+    """
+    Streams a table to NDJSON or CSV with constant memory usage.
+
+    Использование:
+    ```
+    manage.py exportdata recipes > recipes.ndjson
+    manage.py exportdata favorites -f csv -z -o favorites.csv.gz
+    ```
+    """
+
+    help = 'Streams recipes and relations to NDJSON or CSV'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('table', choices=tuple(EXPORTERS))
+        parser.add_argument(
+            '-f',
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='ndjson',
+            help='Output format.',
+        )
+        parser.add_argument(
+            '-o',
+            '--output',
+            help='Output file. Standard output by default.',
+        )
+        parser.add_argument(
+            '-z',
+            '--gzip',
+            action='store_true',
+            help='Compress output with gzip.',
+        )
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Rows fetched from the database at once.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        try:
+            stream = export(
+                options['table'],
+                options['format'],
+                options['gzip'],
+                options['chunk_size'],
+            )
+        except ValueError as err:
+            raise CommandError(err)
+        if not options['output']:
+            for chunk in stream:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(options['output'], 'wb') as f:
+            for chunk in stream:
+                f.write(chunk)
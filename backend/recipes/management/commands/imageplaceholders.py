@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import CHUNK_SIZE, refresh_placeholders
+
+
+class Command(BaseCommand):
+    """
+    Computes low-quality placeholders (LQIP) of recipe images.
+
+    Использование:
+    ```
+    manage.py imageplaceholders [-w, --workers 4] [-c, --chunk-size 100]
+    manage.py imageplaceholders --all
+    ```
+    """
+
+    help = 'Computes low-quality placeholders of recipe images'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute placeholders of all images, not only missing.',
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker processes. Computed in-process with 0.',
+        )
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Recipes per worker task and transaction.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        start = time.monotonic()
+        processed = refresh_placeholders(
+            not options['all'],
+            options['workers'],
+            options['chunk_size'],
+        )
+        self.stdout.write(
+            f'Recipes processed: {processed} '
+            f'in {time.monotonic() - start:.1f} s.',
+        )
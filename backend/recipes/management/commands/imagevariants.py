@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import DEFAULT_IMAGE, process, process_in_worker
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Generates resized WebP copies of recipe images.
+
+    Использование:
+    ```
+    manage.py imagevariants [-w, --workers 4]
+    manage.py imagevariants --all [-w 0]
+    ```
+    """
+
+    help = 'Generates resized copies of recipe images'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate copies of all images, not only missing ones.',
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker threads. Processed in-thread with 0.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        recipes = Recipe.objects.exclude(image__in=('', DEFAULT_IMAGE))
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        recipe_ids = list(recipes.values_list('pk', flat=True))
+        if not options['workers']:
+            for recipe_id in recipe_ids:
+                process(recipe_id)
+        else:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                for _ in executor.map(process_in_worker, recipe_ids):
+                    pass
+        self.stdout.write(f'Recipes processed: {len(recipe_ids)}.')
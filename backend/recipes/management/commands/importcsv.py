@@ -4,6 +4,7 @@ from decouple import config
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from recipes.importers import RecipeImporter, read_rows
 from recipes.models import Ingredient, Tag, User
 
 ADMIN_PASSWORD = config('ADMIN_PASSWORD', default='admin')
@@ -56,3 +57,12 @@ class Command(BaseCommand):
                         )
                         obj.set_password(password)
                         obj.save()
+        with open(
+            settings.DATA_DIR / 'recipes.csv',
+            encoding='utf-8',
+        ) as f:
+            importer = RecipeImporter().run(read_rows(f, 'csv'))
+        if not options['silent']:
+            print(f'Recipes `{importer.created}` have been created.')
+        for error in importer.errors:
+            print(f'Recipe import error at line {error}')
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importers import (
+    CHUNK_SIZE,
+    IMPORT_FORMATS,
+    RecipeImporter,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    """
+    Imports recipes from CSV, JSON or NDJSON file.
+
+    Authors, tags and ingredients must exist before import.
+
+    Использование:
+    ```
+    manage.py importrecipes data/recipes.csv [-c, --chunk-size 1000]
+    manage.py importrecipes dump.ndjson [-f, --format ndjson]
+    ```
+    """
+
+    help = 'Imports recipes from CSV, JSON or NDJSON file'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', type=Path, help='Path to the file.')
+        parser.add_argument(
+            '-f',
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='File format. Guessed from the extension by default.',
+        )
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Recipes per transaction.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        path: Path = options['path']
+        fmt = options['format'] or path.suffix.lstrip('.')
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f'Unknown format: {fmt}')
+        with open(path, encoding='utf-8') as f:
+            importer = RecipeImporter(chunk_size=options['chunk_size'])
+            importer.run(read_rows(f, fmt))
+        for error in importer.errors:
+            self.stderr.write(f'Line {error}')
+        self.stdout.write(
+            f'Recipes created: {importer.created}, '
+            f'skipped: {importer.skipped}, errors: {len(importer.errors)}.',
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import CHUNK_SIZE, refresh_scores
+
+
+class Command(BaseCommand):
+    """
+    Recalculates recipe popularity from favorites and shopping carts.
+
+    Run periodically (e.g. hourly) to apply the trending time decay.
+
+    Использование:
+    ```
+    manage.py refreshscores [-c, --chunk-size 1000]
+    ```
+    """
+
+    help = 'Recalculates popular and trending recipe scores'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Recipes updated per transaction.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        start = time.monotonic()
+        updated = refresh_scores(options['chunk_size'])
+        self.stdout.write(
+            f'Recipes updated: {updated} '
+            f'in {time.monotonic() - start:.1f} s.',
+        )
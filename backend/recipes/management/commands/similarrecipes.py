@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import CHUNK_SIZE, TOP_K, refresh_neighbors
+
+
+class Command(BaseCommand):
+    """
+    Precomputes similar recipes by ingredient and tag TF-IDF vectors.
+
+    Использование:
+    ```
+    manage.py similarrecipes [-w, --workers 4] [-k 10]
+    manage.py similarrecipes --stale
+    ```
+    """
+
+    help = 'Precomputes similar recipes'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Refresh only edited recipes and their neighbors.',
+        )
+        parser.add_argument(
+            '-k',
+            type=int,
+            default=TOP_K,
+            help='Similar recipes stored per recipe.',
+        )
+        parser.add_argument(
+            '-w',
+            '--workers',
+            type=int,
+            default=0,
+            help='Worker processes. Computed in-process by default.',
+        )
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Recipes per worker task and transaction.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        del args
+        start = time.monotonic()
+        processed = refresh_neighbors(
+            options['stale'],
+            options['k'],
+            options['workers'],
+            options['chunk_size'],
+        )
+        self.stdout.write(
+            f'Recipes processed: {processed} '
+            f'in {time.monotonic() - start:.1f} s.',
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:00
+
+from django.db import migrations
+
+# Поиск в админке по префиксу (`^name`) в PostgreSQL выполняется как
+# `UPPER(name) LIKE 'X%'`, для которого нужен индекс с text_pattern_ops.
+INDEXES = (
+    ('recipes_ingredient_name_prefix', 'recipes_ingredient', 'name'),
+    ('recipes_recipe_name_prefix', 'recipes_recipe', 'name'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)',
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0003_alter_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.4 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0004_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(
+                fields=['user', 'recipe'],
+                name='recipes_favorite_user_recipe',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-pub_date'],
+                name='recipes_recipe_pub_date',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-pub_date'],
+                name='recipes_recipe_author_date',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(
+                fields=['user', 'recipe'],
+                name='recipes_cart_user_recipe',
+            ),
+        ),
+    ]
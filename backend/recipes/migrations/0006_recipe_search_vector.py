@@ -0,0 +1,43 @@
+# Generated by Django 4.2.4 on 2026-10-19 07:42
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "UPDATE recipes_recipe SET search_vector = "
+        "setweight(to_tsvector('russian', COALESCE(name, '')), 'A') || "
+        "setweight(to_tsvector('russian', COALESCE(text, '')), 'B')",
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_gin '
+        'ON recipes_recipe USING gin (search_vector)',
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_recipe_search_gin')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0005_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True,
+                editable=False,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
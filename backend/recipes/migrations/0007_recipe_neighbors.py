@@ -0,0 +1,77 @@
+# Generated by Django 4.2.4 on 2026-10-19 07:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeNeighbor',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('score', models.FloatField(verbose_name='сходство')),
+            ],
+            options={
+                'verbose_name': 'похожий рецепт',
+                'verbose_name_plural': 'похожие рецепты',
+                'ordering': ('recipe', '-score'),
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='similar_stale',
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                verbose_name='похожие рецепты устарели',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                condition=models.Q(('similar_stale', True)),
+                fields=['id'],
+                name='recipes_recipe_similar_stale',
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipeneighbor',
+            name='neighbor',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='recipes.recipe',
+                verbose_name='похожий рецепт',
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipeneighbor',
+            name='recipe',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='neighbors',
+                to='recipes.recipe',
+                verbose_name='рецепт',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipeneighbor',
+            index=models.Index(
+                fields=['recipe', '-score'],
+                name='recipes_neighbor_recipe_score',
+            ),
+        ),
+    ]
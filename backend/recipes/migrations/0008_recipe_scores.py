@@ -0,0 +1,115 @@
+# Generated by Django 4.2.4 on 2026-10-19 07:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def create_scores(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    recipes = Recipe.objects.annotate(
+        favorites=Count('favorite_recipe', distinct=True),
+        carts=Count('cart_recipe', distinct=True),
+    ).values_list('pk', 'favorites', 'carts')
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(
+                recipe_id=pk,
+                favorites=favorites,
+                carts=carts,
+                popularity=favorites + carts,
+            )
+            for pk, favorites, carts in recipes.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0007_recipe_neighbors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name='дата добавления',
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name='дата добавления',
+            ),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                (
+                    'recipe',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='score',
+                        serialize=False,
+                        to='recipes.recipe',
+                        verbose_name='рецепт',
+                    ),
+                ),
+                (
+                    'favorites',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='в избранном',
+                    ),
+                ),
+                (
+                    'carts',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='в корзинах',
+                    ),
+                ),
+                (
+                    'popularity',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='популярность',
+                    ),
+                ),
+                (
+                    'trending',
+                    models.FloatField(
+                        default=0,
+                        verbose_name='популярность за последнее время',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'популярность рецепта',
+                'verbose_name_plural': 'популярность рецептов',
+                'indexes': [
+                    models.Index(
+                        fields=['-popularity', '-recipe'],
+                        name='recipes_score_popularity',
+                    ),
+                    models.Index(
+                        fields=['-trending', '-recipe'],
+                        name='recipes_score_trending',
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(create_scores, migrations.RunPython.noop),
+    ]
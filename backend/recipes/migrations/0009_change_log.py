@@ -0,0 +1,107 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:01
+
+from django.db import migrations, models
+
+
+def fill_change_log(apps, schema_editor):
+    Change = apps.get_model('recipes', 'Change')
+    recipes = apps.get_model('recipes', 'Recipe').objects.values_list(
+        'pk',
+        flat=True,
+    )
+    Change.objects.bulk_create(
+        (
+            Change(kind='recipe', recipe_id=pk)
+            for pk in recipes.order_by('pk').iterator()
+        ),
+        batch_size=1000,
+    )
+    for kind, name in (
+        ('favorite', 'Favorite'),
+        ('shopping_cart', 'ShoppingCart'),
+    ):
+        rows = apps.get_model('recipes', name).objects.values_list(
+            'recipe_id',
+            'user_id',
+        )
+        Change.objects.bulk_create(
+            (
+                Change(kind=kind, recipe_id=recipe_id, user_id=user_id)
+                for recipe_id, user_id in rows.order_by('pk').iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0008_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='modified',
+            field=models.DateTimeField(
+                auto_now=True,
+                verbose_name='дата изменения',
+            ),
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('recipe', 'рецепт'),
+                            ('favorite', 'избранное'),
+                            ('shopping_cart', 'корзина'),
+                        ],
+                        max_length=16,
+                        verbose_name='тип',
+                    ),
+                ),
+                (
+                    'recipe_id',
+                    models.PositiveIntegerField(verbose_name='id рецепта'),
+                ),
+                (
+                    'user_id',
+                    models.PositiveIntegerField(
+                        blank=True,
+                        null=True,
+                        verbose_name='id пользователя',
+                    ),
+                ),
+                (
+                    'deleted',
+                    models.BooleanField(default=False, verbose_name='удален'),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        verbose_name='дата изменения',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'изменение',
+                'verbose_name_plural': 'журнал изменений',
+                'ordering': ('id',),
+                'indexes': [
+                    models.Index(
+                        fields=['user_id', 'id'],
+                        name='recipes_change_user_id',
+                    ),
+                    models.Index(
+                        fields=['kind', 'recipe_id', 'user_id'],
+                        name='recipes_change_object',
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_change_log, migrations.RunPython.noop),
+    ]
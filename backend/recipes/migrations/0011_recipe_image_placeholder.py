@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0010_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_placeholder',
+            field=models.TextField(
+                blank=True,
+                default='',
+                editable=False,
+                verbose_name='заглушка изображения',
+            ),
+        ),
+    ]
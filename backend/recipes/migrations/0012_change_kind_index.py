@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0011_recipe_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(
+                fields=['kind', 'id'],
+                name='recipes_change_kind_id',
+            ),
+        ),
+    ]
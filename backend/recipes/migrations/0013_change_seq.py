@@ -0,0 +1,82 @@
+# Generated by Django 4.2.4 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+def publish_existing(apps, schema_editor):
+    # Записи журнала уже зафиксированы: номер совпадает с id, поэтому
+    # выданные клиентам токены остаются верными.
+    db = schema_editor.connection.alias
+    changes = apps.get_model('recipes', 'Change').objects.using(db)
+    changes.update(seq=models.F('id'))
+    apps.get_model('recipes', 'ChangeSequence').objects.using(db).create(
+        pk=1,
+        value=changes.aggregate(last=models.Max('id'))['last'] or 0,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0012_change_kind_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'value',
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name='последний номер',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'номер журнала изменений',
+                'verbose_name_plural': 'номер журнала изменений',
+            },
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='seq',
+            field=models.BigIntegerField(
+                editable=False,
+                null=True,
+                unique=True,
+                verbose_name='номер публикации',
+            ),
+        ),
+        migrations.RunPython(publish_existing, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='recipes_change_user_id',
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='recipes_change_kind_id',
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(
+                fields=['user_id', 'seq'],
+                name='recipes_change_user_seq',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(
+                fields=['kind', 'seq'],
+                name='recipes_change_kind_seq',
+            ),
+        ),
+    ]
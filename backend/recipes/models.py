@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 from django.db.models.functions import Length
@@ -116,12 +117,25 @@ class Recipe(models.Model):
     )
     text = models.TextField('описание')
     pub_date = models.DateTimeField('дата публикации', auto_now_add=True)
+    modified = models.DateTimeField('дата изменения', auto_now=True)
     image = models.ImageField(
         'изображение блюда',
         upload_to='recipes/',
         blank=True,
         default='recipes/default.png',
     )
+    image_variants = models.JSONField(
+        'уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        'заглушка изображения',
+        blank=True,
+        default='',
+        editable=False,
+    )
     cooking_time = models.IntegerField(
         validators=(
             MinValueValidator(1, 'Минимальное время приготовления: 1 мин'),
@@ -133,11 +147,32 @@ class Recipe(models.Model):
         related_name='recipes',
     )
     tags = models.ManyToManyField(Tag, related_name='recipes')
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    similar_stale = models.BooleanField(
+        'похожие рецепты устарели',
+        default=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('id',),
+                condition=models.Q(similar_stale=True),
+                name='recipes_recipe_similar_stale',
+            ),
+            models.Index(
+                fields=('-pub_date',),
+                name='recipes_recipe_pub_date',
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipes_recipe_author_date',
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('name', 'author'),
@@ -207,10 +242,17 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name='favorite_recipe',
     )
+    created = models.DateTimeField('дата добавления', auto_now_add=True)
 
     class Meta:
         verbose_name = 'избранное'
         verbose_name_plural = 'избранное'
+        indexes = (
+            models.Index(
+                fields=('user', 'recipe'),
+                name='recipes_favorite_user_recipe',
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('recipe', 'user'),
@@ -237,10 +279,17 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='cart_recipe',
     )
+    created = models.DateTimeField('дата добавления', auto_now_add=True)
 
     class Meta:
         verbose_name = 'корзина'
         verbose_name_plural = 'корзины'
+        indexes = (
+            models.Index(
+                fields=('user', 'recipe'),
+                name='recipes_cart_user_recipe',
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('recipe', 'user'),
@@ -250,3 +299,149 @@ class ShoppingCart(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user}: {self.recipe}'
+
+
+class RecipeNeighbor(models.Model):
+    """Модель ORM для предрассчитанных похожих рецептов."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='рецепт',
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        verbose_name='похожий рецепт',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('сходство')
+
+    class Meta:
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'похожие рецепты'
+        ordering = ('recipe', '-score')
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='recipes_neighbor_recipe_score',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.recipe}: {self.neighbor}'
+
+
+class RecipeScore(models.Model):
+    """
+    Модель ORM для популярности рецептов.
+
+    Счетчики обновляются при добавлении в избранное и корзину и
+    пересчитываются командой `refreshscores`.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='рецепт',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    favorites = models.PositiveIntegerField('в избранном', default=0)
+    carts = models.PositiveIntegerField('в корзинах', default=0)
+    popularity = models.PositiveIntegerField('популярность', default=0)
+    trending = models.FloatField('популярность за последнее время', default=0)
+
+    class Meta:
+        verbose_name = 'популярность рецепта'
+        verbose_name_plural = 'популярность рецептов'
+        indexes = (
+            models.Index(
+                fields=('-popularity', '-recipe'),
+                name='recipes_score_popularity',
+            ),
+            models.Index(
+                fields=('-trending', '-recipe'),
+                name='recipes_score_trending',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.recipe}: {self.popularity}'
+
+
+class Change(models.Model):
+    """
+    Модель ORM для журнала изменений, по которому синхронизируются клиенты.
+
+    Для каждого объекта хранится только последнее изменение, удаления
+    остаются в журнале как записи с `deleted`. Клиенты читают журнал
+    по `seq`: номер присваивается после фиксации транзакции
+    (`recipes.sync.publish_changes`), поэтому растет в порядке фиксации.
+    """
+
+    class Kind(models.TextChoices):
+        RECIPE = 'recipe', 'рецепт'
+        FAVORITE = 'favorite', 'избранное'
+        SHOPPING_CART = 'shopping_cart', 'корзина'
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField('тип', max_length=16, choices=Kind.choices)
+    recipe_id = models.PositiveIntegerField('id рецепта')
+    # Не внешний ключ: записи об удалении связей пишутся и при каскадном
+    # удалении самого пользователя.
+    user_id = models.PositiveIntegerField(
+        'id пользователя',
+        null=True,
+        blank=True,
+    )
+    deleted = models.BooleanField('удален', default=False)
+    created = models.DateTimeField('дата изменения', auto_now_add=True)
+    seq = models.BigIntegerField(
+        'номер публикации',
+        null=True,
+        unique=True,
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = 'изменение'
+        verbose_name_plural = 'журнал изменений'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('user_id', 'seq'),
+                name='recipes_change_user_seq',
+            ),
+            models.Index(
+                fields=('kind', 'recipe_id', 'user_id'),
+                name='recipes_change_object',
+            ),
+            # Последние изменения рецептов (`IngredientIndex`).
+            models.Index(
+                fields=('kind', 'seq'),
+                name='recipes_change_kind_seq',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.id}: {self.kind} {self.recipe_id}'
+
+
+class ChangeSequence(models.Model):
+    """
+    Модель ORM для последнего номера публикации журнала изменений.
+
+    Единственная строка. Номер не уменьшается при удалении записей
+    журнала, а блокировка строки упорядочивает публикации.
+    """
+
+    value = models.BigIntegerField('последний номер', default=0)
+
+    class Meta:
+        verbose_name = 'номер журнала изменений'
+        verbose_name_plural = 'номер журнала изменений'
+
+    def __str__(self) -> str:
+        return str(self.value)
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from recipes.importers import chunked
+from recipes.models import Favorite, Recipe, RecipeScore, ShoppingCart
+
+HALF_LIFE_DAYS = 7
+TRENDING_WINDOW_DAYS = 60
+CHUNK_SIZE = 1000
+
+SCORE_FIELDS = {Favorite: 'favorites', ShoppingCart: 'carts'}
+
+
+def decay(created: datetime, now: datetime | None = None) -> float:
+    """Вес добавления, уменьшающийся вдвое каждые `HALF_LIFE_DAYS` дней."""
+    age = (now or timezone.now()) - created
+    return 0.5 ** (max(age / timedelta(days=1), 0) / HALF_LIFE_DAYS)
+
+
+def update_score(
+    model: type[Favorite | ShoppingCart],
+    recipe_id: int,
+    created: datetime,
+    delta: int,
+) -> None:
+    """Изменяет счетчики рецепта при добавлении (+1) или удалении (-1)."""
+    field = SCORE_FIELDS[model]
+    trending = delta * decay(created)
+    values = {
+        field: Greatest(F(field) + delta, Value(0)),
+        'popularity': Greatest(F('popularity') + delta, Value(0)),
+        'trending': Greatest(F('trending') + trending, Value(0.0)),
+    }
+    scores = RecipeScore.objects.filter(recipe_id=recipe_id)
+    if not scores.update(**values) and delta > 0:
+        RecipeScore.objects.get_or_create(recipe_id=recipe_id)
+        scores.update(**values)
+
+
+def aggregate_scores(now: datetime) -> dict[int, list]:
+    """Счетчики и затухающая популярность всех рецептов по данным БД."""
+    scores: dict[int, list] = defaultdict(lambda: [0, 0, 0.0])
+    since = now - timedelta(days=TRENDING_WINDOW_DAYS)
+    for position, model in enumerate(SCORE_FIELDS):
+        totals = (
+            model.objects.values('recipe_id')
+            .annotate(count=Count('pk'))
+            .values_list('recipe_id', 'count')
+            .order_by()
+        )
+        for recipe_id, count in totals:
+            scores[recipe_id][position] = count
+        recent = (
+            model.objects.filter(created__gte=since)
+            .values('recipe_id', hour=TruncHour('created'))
+            .annotate(count=Count('pk'))
+            .values_list('recipe_id', 'hour', 'count')
+            .order_by()
+        )
+        for recipe_id, hour, count in recent:
+            middle = hour + timedelta(minutes=30)
+            scores[recipe_id][2] += count * decay(middle, now)
+    return scores
+
+
+def refresh_scores(chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Пересчитывает популярность всех рецептов агрегирующими запросами.
+
+    Возвращает число обновленных рецептов.
+    """
+    scores = aggregate_scores(timezone.now())
+    recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+    for chunk in chunked(recipe_ids, chunk_size):
+        with transaction.atomic():
+            RecipeScore.objects.bulk_create(
+                (
+                    RecipeScore(
+                        recipe_id=pk,
+                        favorites=scores[pk][0],
+                        carts=scores[pk][1],
+                        popularity=scores[pk][0] + scores[pk][1],
+                        trending=scores[pk][2],
+                    )
+                    if pk in scores
+                    else RecipeScore(recipe_id=pk)
+                    for pk in chunk
+                ),
+                update_conflicts=True,
+                unique_fields=('recipe',),
+                update_fields=('favorites', 'carts', 'popularity', 'trending'),
+            )
+    return len(recipe_ids)
@@ -0,0 +1,125 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import (
+    Case,
+    CharField,
+    F,
+    FloatField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Replace
+from django.db.models.query import QuerySet
+from django.utils.html import escape
+
+SEARCH_CONFIG = 'russian'
+# Границы совпадений в `search_headline` до экранирования текста.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+def is_postgresql(queryset: QuerySet) -> bool:
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def recipe_vector() -> SearchVector:
+    return SearchVector(
+        'name',
+        weight='A',
+        config=SEARCH_CONFIG,
+    ) + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+
+
+def update_search_vectors(queryset: QuerySet) -> None:
+    """Пересчитывает `search_vector` рецептов (только PostgreSQL)."""
+    if is_postgresql(queryset):
+        queryset.update(search_vector=recipe_vector())
+
+
+def search_recipes(
+    queryset: QuerySet,
+    text: str,
+    highlight: bool = False,
+) -> QuerySet:
+    """
+    Полнотекстовый поиск рецептов с сортировкой по релевантности.
+
+    В PostgreSQL используется сохраненный `search_vector` с GIN-индексом,
+    в остальных СУБД - поиск подстроки, где совпадения в названии выше.
+    При `highlight` добавляется аннотация `search_headline` с отмеченными
+    фрагментами описания, HTML из нее строит `render_headline`.
+    """
+    if is_postgresql(queryset):
+        query = SearchQuery(
+            text,
+            config=SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+        )
+        if highlight:
+            queryset = queryset.annotate(
+                search_headline=SearchHeadline(
+                    Replace(
+                        Replace('text', Value(HIGHLIGHT_START)),
+                        Value(HIGHLIGHT_STOP),
+                    ),
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START,
+                    stop_sel=HIGHLIGHT_STOP,
+                ),
+            )
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=text) | Q(text__icontains=text),
+        ).annotate(
+            search_rank=Case(
+                When(name__icontains=text, then=Value(1.0)),
+                default=Value(0.5),
+                output_field=FloatField(),
+            ),
+        )
+        if highlight:
+            queryset = queryset.annotate(
+                search_headline=F('text'),
+                search_terms=Value(text, output_field=CharField()),
+            )
+    return queryset.order_by('-search_rank', '-pub_date')
+
+
+def mark_matches(text: str, terms: str) -> str:
+    """Отмечает вхождения `terms` без учета регистра, как `icontains`."""
+    text = text.replace(HIGHLIGHT_START, '').replace(HIGHLIGHT_STOP, '')
+    return re.sub(
+        re.escape(terms),
+        lambda match: f'{HIGHLIGHT_START}{match[0]}{HIGHLIGHT_STOP}',
+        text,
+        flags=re.IGNORECASE,
+    )
+
+
+def render_headline(headline: str, terms: str | None = None) -> str:
+    """
+    HTML фрагмента описания: текст экранируется, а отмеченные
+    совпадения выделяются тегом `<b>`.
+
+    `terms` передается для поиска без PostgreSQL, где совпадения
+    отмечаются здесь, а не в СУБД.
+    """
+    if terms:
+        headline = mark_matches(headline, terms)
+    return (
+        escape(headline)
+        .replace(HIGHLIGHT_START, '<b>')
+        .replace(HIGHLIGHT_STOP, '</b>')
+    )
@@ -1,11 +1,26 @@
 from collections import OrderedDict
 
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from django.db.models.query import QuerySet
 from django.shortcuts import get_object_or_404
-from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.request import Request
 from rest_framework.validators import ValidationError
 
-from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from foodgram_backend.fields import Base64ImageField
+from foodgram_backend.serializers import DynamicFieldsMixin
+from recipes.images import image_urls, reset_variants, schedule_variants
+from recipes.index import ingredient_index
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.search import render_headline
 from users.models import User
 from users.serializers import UsersSerializer
 
@@ -32,6 +47,16 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class IngredientAmountShortSerializer(serializers.ModelSerializer):
+    """Сериализатор для id и колличества ингредиентов в рецепте."""
+
+    id = serializers.ReadOnlyField(source='ingredient_id')
+
+    class Meta:
+        model = IngredientAmount
+        fields = ('id', 'amount')
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для тегов."""
 
@@ -40,14 +65,33 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Адреса уменьшенных копий изображения рецепта для `srcset`."""
+
+    def __init__(self, **kwargs) -> None:
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe: Recipe) -> dict[str, str]:
+        return image_urls(recipe)
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для сокращенного отображения рецептов."""
 
     image = serializers.ReadOnlyField(source='image.url')
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id',
+            'name',
+            'image',
+            'images',
+            'image_placeholder',
+            'cooking_time',
+        )
         read_only_fields = ('__all__',)
 
 
@@ -83,12 +127,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         return user.favorite_user.filter(recipe=recipe).exists()
 
     def get_is_in_shopping_cart(self, recipe: Recipe) -> bool:
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         return user.cart_owner.filter(recipe=recipe).exists()
 
 
@@ -131,6 +179,7 @@ class RecipeSerializerModify(RecipeSerializer):
                 for ingredient in ingredients
             ],
         )
+        ingredient_index.refresh(recipe.pk)
 
     def validate_ingredients(self, ingredients: list[dict]) -> list[dict]:
         if not ingredients:
@@ -186,6 +235,9 @@ class RecipeSerializerModify(RecipeSerializer):
                 raise ValidationError({'error': 'Такой рецепт у вас уже есть'})
         return attrs
 
+    # Запись журнала о рецепте и его ингредиенты фиксируются вместе:
+    # другие процессы перечитывают рецепт по журналу (`IngredientIndex`).
+    @transaction.atomic
     def create(self, validated_data: dict) -> Recipe:
         tags: list[Tag] = validated_data.pop('tags')
         ingredients: list[dict] = validated_data.pop('ingredients')
@@ -193,12 +245,19 @@ class RecipeSerializerModify(RecipeSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredient_amount(ingredients, recipe)
+        if 'image' in validated_data:
+            schedule_variants(recipe.pk)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe: Recipe, validated_data: dict) -> Recipe:
         tags: list[Tag] = validated_data.pop('tags', None)
         ingredients: list[dict] = validated_data.pop('ingredients', None)
+        if 'image' in validated_data:
+            reset_variants(recipe)
         recipe = super().update(recipe, validated_data)
+        if 'image' in validated_data:
+            schedule_variants(recipe.pk)
         if tags:
             recipe.tags.clear()
             recipe.tags.set(tags)
@@ -215,14 +274,89 @@ class RecipeSerializerModify(RecipeSerializer):
         ).data
 
 
-class RecipeSerializerRetrieve(RecipeSerializer):
+class RecipeSerializerRetrieve(DynamicFieldsMixin, RecipeSerializer):
     """Сериализатор для отображения рецептов."""
 
     image = serializers.ReadOnlyField(source='image.url')
+    images = ImageVariantsField()
+
+    collapsed_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True,
+            read_only=True,
+        ),
+        'ingredients': lambda: IngredientAmountShortSerializer(
+            many=True,
+            read_only=True,
+            source='ingredient_amounts',
+        ),
+    }
 
     class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'images',
+            'image_placeholder',
+        )
         read_only_fields = ('__all__',)
 
+    @classmethod
+    def setup_queryset(cls, queryset: QuerySet, request: Request) -> QuerySet:
+        """Загрузка связанных объектов и флагов для выбранных полей."""
+        for name, field in (
+            ('text', 'text'),
+            ('images', 'image_variants'),
+            ('image_placeholder', 'image_placeholder'),
+        ):
+            if not cls.wants(request, name):
+                queryset = queryset.defer(field)
+        if cls.wants(request, 'author') and cls.expands(request, 'author'):
+            authors = UsersSerializer.annotate_subscribed(
+                User.objects.all(),
+                request.user,
+            )
+            queryset = queryset.prefetch_related(
+                Prefetch('author', queryset=authors),
+            )
+        if cls.wants(request, 'tags'):
+            queryset = queryset.prefetch_related('tags')
+        if cls.wants(request, 'ingredients'):
+            amounts = IngredientAmount.objects.all()
+            if cls.expands(request, 'ingredients'):
+                amounts = amounts.select_related('ingredient')
+            queryset = queryset.prefetch_related(
+                Prefetch('ingredient_amounts', queryset=amounts),
+            )
+        if request.user.is_anonymous:
+            return queryset
+        for name, model in (
+            ('is_favorited', Favorite),
+            ('is_in_shopping_cart', ShoppingCart),
+        ):
+            if cls.wants(request, name):
+                queryset = queryset.annotate(
+                    **{
+                        name: Exists(
+                            model.objects.filter(
+                                user=request.user,
+                                recipe=OuterRef('pk'),
+                            ),
+                        ),
+                    },
+                )
+        return queryset
+
+    def to_representation(self, instance: Recipe) -> OrderedDict:
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_headline'):
+            data['search_headline'] = render_headline(
+                instance.search_headline,
+                getattr(instance, 'search_terms', None),
+            )
+        if hasattr(instance, 'missing_ingredients'):
+            data['missing_ingredients'] = instance.missing_ingredients
+        return data
+
 
 class UserSubscribeSerializer(UsersSerializer):
     """Сериализатор для подписок пользователя."""
@@ -236,5 +370,30 @@ class UserSubscribeSerializer(UsersSerializer):
             'recipes_count',
         )
 
+    @classmethod
+    def setup_queryset(cls, queryset: QuerySet, request: Request) -> QuerySet:
+        queryset = super().setup_queryset(queryset, request)
+        if cls.wants(request, 'recipes'):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'recipes',
+                    queryset=Recipe.objects.only(
+                        'author',
+                        'name',
+                        'image',
+                        'image_variants',
+                        'image_placeholder',
+                        'cooking_time',
+                    ),
+                ),
+            )
+        if cls.wants(request, 'recipes_count'):
+            queryset = queryset.annotate(
+                recipes_count=Count('recipes', distinct=True),
+            )
+        return queryset
+
     def get_recipes_count(self, author: User) -> int:
+        if hasattr(author, 'recipes_count'):
+            return author.recipes_count
         return author.recipes.count()
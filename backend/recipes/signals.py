@@ -0,0 +1,172 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.filters import tag_slugs
+from recipes.index import ingredient_index
+from recipes.models import (
+    Change,
+    Favorite,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    RecipeScore,
+    ShoppingCart,
+    Tag,
+)
+from recipes.popularity import update_score
+from recipes.search import update_search_vectors
+from recipes.sync import record_changes, touch_recipes
+from users.models import User
+
+CHANGE_KINDS = {
+    Favorite: Change.Kind.FAVORITE,
+    ShoppingCart: Change.Kind.SHOPPING_CART,
+}
+# Поля пользователя в ответах рецептов (автор).
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def mark_similar_stale(*recipe_ids: int) -> None:
+    """
+    Помечает рецепты для пересчета похожих (`similarrecipes --stale`).
+
+    Время изменения обновляется и у уже помеченных рецептов: по нему
+    пересчет отличает правки, сделанные после загрузки векторов.
+    """
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        similar_stale=True,
+        modified=timezone.now(),
+    )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs) -> None:
+    tag_slugs.clear()
+
+
+# Связи с удаляемыми тегами и ингредиентами удаляются без сигналов
+# m2m_changed, поэтому рецепты отмечаются до удаления.
+@receiver((post_save, pre_delete), sender=Tag)
+def tag_touched(sender, instance: Tag, **kwargs) -> None:
+    touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def ingredient_touched(sender, instance: Ingredient, **kwargs) -> None:
+    touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance: User, update_fields, **kwargs) -> None:
+    """
+    Сравнивает поля автора с сохраненными: смена пароля, активности
+    или last_login не меняет ответы рецептов.
+    """
+    instance._author_changed = False
+    if instance._state.adding:
+        return
+    fields = set(AUTHOR_FIELDS)
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._author_changed = stored is not None and any(
+        stored[field] != getattr(instance, field) for field in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance: User, **kwargs) -> None:
+    if getattr(instance, '_author_changed', False):
+        touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(
+    sender,
+    instance: Recipe,
+    created: bool,
+    update_fields,
+    **kwargs,
+) -> None:
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+    record_changes(Change.Kind.RECIPE, (instance.pk,))
+    if update_fields and not {'name', 'text'} & set(update_fields):
+        return
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance: Recipe, **kwargs) -> None:
+    record_changes(Change.Kind.RECIPE, (instance.pk,), deleted=True)
+
+
+@receiver(post_save, sender=IngredientAmount)
+def ingredient_amount_saved(
+    sender,
+    instance: IngredientAmount,
+    created: bool,
+    **kwargs,
+) -> None:
+    ingredient_index.refresh(instance.recipe_id)
+    mark_similar_stale(instance.recipe_id)
+
+
+@receiver(post_delete, sender=IngredientAmount)
+def ingredient_amount_deleted(
+    sender,
+    instance: IngredientAmount,
+    **kwargs,
+) -> None:
+    ingredient_index.refresh(instance.recipe_id)
+    mark_similar_stale(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(
+    sender,
+    instance,
+    action: str,
+    reverse: bool,
+    pk_set: set | None,
+    **kwargs,
+) -> None:
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mark_similar_stale(instance.pk)
+    elif pk_set:
+        mark_similar_stale(*pk_set)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_relation_saved(sender, instance, created: bool, **kwargs) -> None:
+    if created:
+        update_score(sender, instance.recipe_id, instance.created, 1)
+        record_changes(
+            CHANGE_KINDS[sender],
+            (instance.recipe_id,),
+            instance.user_id,
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_relation_deleted(sender, instance, **kwargs) -> None:
+    update_score(sender, instance.recipe_id, instance.created, -1)
+    record_changes(
+        CHANGE_KINDS[sender],
+        (instance.recipe_id,),
+        instance.user_id,
+        deleted=True,
+    )
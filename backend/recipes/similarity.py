@@ -0,0 +1,242 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from recipes.importers import chunked
+from recipes.models import IngredientAmount, Recipe, RecipeNeighbor
+
+TOP_K = 10
+CHUNK_SIZE = 500
+MAX_DF = 0.1
+MIN_CANDIDATE_POSTING = 1000
+RERANK_FACTOR = 5
+
+Vector = tuple[tuple[int, float], ...]
+Neighbors = list[tuple[int, float]]
+
+_vectors: dict[int, Vector] = {}
+_postings: dict[int, dict[int, float]] = {}
+_max_posting = 0
+
+
+def load_vectors() -> dict[int, Vector]:
+    """
+    TF-IDF векторы рецептов по ингредиентам и тегам.
+
+    Признак ингредиента - его id, тега - id со знаком минус. Векторы
+    нормированы, поэтому косинусное сходство равно скалярному произведению.
+    """
+    features: dict[int, list[int]] = defaultdict(list)
+    rows = IngredientAmount.objects.values_list(
+        'recipe_id',
+        'ingredient_id',
+    ).iterator(chunk_size=10000)
+    for recipe_id, ingredient_id in rows:
+        features[recipe_id].append(ingredient_id)
+    rows = Recipe.tags.through.objects.values_list(
+        'recipe_id',
+        'tag_id',
+    ).iterator(chunk_size=10000)
+    for recipe_id, tag_id in rows:
+        features[recipe_id].append(-tag_id)
+    total = len(features)
+    frequency: Counter[int] = Counter()
+    for recipe_features in features.values():
+        frequency.update(recipe_features)
+    idf = {
+        feature: math.log((1 + total) / (1 + count)) + 1
+        for feature, count in frequency.items()
+    }
+    vectors = {}
+    for recipe_id, recipe_features in features.items():
+        norm = math.sqrt(sum(idf[feature] ** 2 for feature in recipe_features))
+        vectors[recipe_id] = tuple(
+            (feature, idf[feature] / norm) for feature in recipe_features
+        )
+    return vectors
+
+
+def invert(vectors: dict[int, Vector]) -> dict[int, dict[int, float]]:
+    postings: dict[int, dict[int, float]] = defaultdict(dict)
+    for recipe_id, vector in vectors.items():
+        for feature, weight in vector:
+            postings[feature][recipe_id] = weight
+    return dict(postings)
+
+
+def _init_worker(
+    vectors: dict[int, Vector],
+    postings: dict[int, dict[int, float]],
+    max_posting: int,
+) -> None:
+    global _vectors, _postings, _max_posting
+    _vectors, _postings, _max_posting = vectors, postings, max_posting
+
+
+def nearest(recipe_id: int, k: int = TOP_K) -> Neighbors:
+    """
+    Ближайшие по косинусному сходству рецепты.
+
+    Кандидаты отбираются по редким признакам (встречающимся не более чем
+    в `MAX_DF` рецептов, но не менее `MIN_CANDIDATE_POSTING`), частые
+    признаки (обычно теги) учитываются только при переранжировании лучших
+    кандидатов.
+    """
+    vector = sorted(
+        _vectors.get(recipe_id, ()),
+        key=lambda item: len(_postings[item[0]]),
+    )
+    scores: dict[int, float] = defaultdict(float)
+    frequent = []
+    for position, (feature, weight) in enumerate(vector):
+        posting = _postings[feature]
+        if position and len(posting) > _max_posting:
+            frequent.append((weight, posting))
+            continue
+        for other, other_weight in posting.items():
+            scores[other] += weight * other_weight
+    scores.pop(recipe_id, None)
+    if not frequent:
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+    candidates = heapq.nlargest(
+        k * RERANK_FACTOR,
+        scores.items(),
+        key=itemgetter(1),
+    )
+    reranked = [
+        (
+            other,
+            score
+            + sum(
+                weight * posting.get(other, 0.0)
+                for weight, posting in frequent
+            ),
+        )
+        for other, score in candidates
+    ]
+    return heapq.nlargest(k, reranked, key=itemgetter(1))
+
+
+def _nearest_chunk(
+    recipe_ids: list[int],
+    k: int,
+) -> list[tuple[int, Neighbors]]:
+    return [(recipe_id, nearest(recipe_id, k)) for recipe_id in recipe_ids]
+
+
+def compute_neighbors(
+    recipe_ids: Iterable[int] | None = None,
+    k: int = TOP_K,
+    workers: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[list[tuple[int, Neighbors]]]:
+    """
+    Рассчитывает похожие рецепты пакетами по `chunk_size`.
+
+    При `workers` > 0 пакеты обрабатываются в отдельных процессах,
+    которые получают векторы один раз при запуске.
+    """
+    vectors = load_vectors()
+    postings = invert(vectors)
+    max_posting = max(MIN_CANDIDATE_POSTING, int(len(vectors) * MAX_DF))
+    if recipe_ids is None:
+        recipe_ids = vectors
+    chunks = chunked(sorted(recipe_ids), chunk_size)
+    if not workers:
+        _init_worker(vectors, postings, max_posting)
+        for chunk in chunks:
+            yield _nearest_chunk(chunk, k)
+        return
+    connections.close_all()
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_init_worker,
+        initargs=(vectors, postings, max_posting),
+    ) as executor:
+        futures = [
+            executor.submit(_nearest_chunk, chunk, k) for chunk in chunks
+        ]
+        for future in futures:
+            yield future.result()
+
+
+def store_neighbors(
+    results: list[tuple[int, Neighbors]],
+    loaded_at: datetime,
+) -> None:
+    """
+    Заменяет сохраненные похожие рецепты для рецептов пакета.
+
+    Отметка `similar_stale` снимается только с рецептов, не измененных
+    после загрузки векторов в `loaded_at`.
+    """
+    recipe_ids = [recipe_id for recipe_id, _ in results]
+    neighbor_ids = {
+        other for _, neighbors in results for other, _ in neighbors
+    }
+    with transaction.atomic():
+        existing = set(
+            Recipe.objects.filter(pk__in=neighbor_ids).values_list(
+                'pk',
+                flat=True,
+            ),
+        )
+        RecipeNeighbor.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeNeighbor.objects.bulk_create(
+            RecipeNeighbor(recipe_id=recipe_id, neighbor_id=other, score=score)
+            for recipe_id, neighbors in results
+            for other, score in neighbors
+            if other in existing
+        )
+        Recipe.objects.filter(
+            pk__in=recipe_ids,
+            modified__lte=loaded_at,
+        ).update(similar_stale=False)
+
+
+def refresh_neighbors(
+    stale_only: bool = False,
+    k: int = TOP_K,
+    workers: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Пересчитывает похожие рецепты и возвращает число обработанных рецептов.
+
+    При `stale_only` пересчитываются только измененные рецепты и те,
+    в списках которых они уже есть. Новые рецепты попадают в списки
+    остальных при следующем полном пересчете.
+    """
+    # Правки после этого момента могут не попасть в векторы: рецепты,
+    # измененные позже (и новые), остаются помеченными.
+    loaded_at = timezone.now()
+    recipe_ids = None
+    if stale_only:
+        stale = Recipe.objects.filter(similar_stale=True).values('pk')
+        recipe_ids = set(stale.values_list('pk', flat=True))
+        recipe_ids.update(
+            RecipeNeighbor.objects.filter(neighbor__in=stale).values_list(
+                'recipe_id',
+                flat=True,
+            ),
+        )
+        if not recipe_ids:
+            return 0
+    processed = 0
+    for results in compute_neighbors(recipe_ids, k, workers, chunk_size):
+        store_neighbors(results, loaded_at)
+        processed += len(results)
+    if recipe_ids is None:
+        # Рецепты без ингредиентов и тегов не имеют векторов.
+        Recipe.objects.filter(
+            similar_stale=True,
+            modified__lte=loaded_at,
+        ).update(similar_stale=False)
+    return processed
@@ -0,0 +1,115 @@
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Q, QuerySet
+from django.utils import timezone
+
+from recipes.models import Change, ChangeSequence, Recipe
+from users.models import User
+
+TOUCH_BATCH_SIZE = 1000
+
+
+def record_changes(
+    kind: str,
+    recipe_ids: Iterable[int],
+    user_id: int | None = None,
+    deleted: bool = False,
+) -> None:
+    """Записывает изменения в журнал, заменяя прежние записи объектов."""
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic():
+        Change.objects.filter(
+            kind=kind,
+            recipe_id__in=recipe_ids,
+            user_id=user_id,
+        ).delete()
+        Change.objects.bulk_create(
+            Change(
+                kind=kind,
+                recipe_id=recipe_id,
+                user_id=user_id,
+                deleted=deleted,
+            )
+            for recipe_id in recipe_ids
+        )
+        if recipe_ids:
+            transaction.on_commit(publish_changes)
+
+
+def publish_changes() -> None:
+    """
+    Нумерует зафиксированные записи журнала (`Change.seq`).
+
+    Id выдается при вставке, и транзакция с меньшим id может
+    зафиксироваться позже, чем клиент прочитал журнал дальше нее.
+    Номер же присваивается только видимым (зафиксированным) записям
+    под блокировкой `ChangeSequence`, поэтому номера растут в порядке
+    фиксации. Записи, не получившие номер из-за сбоя процесса,
+    нумеруются следующей публикацией.
+    """
+    pending = Change.objects.filter(seq__isnull=True)
+    # Транзакция регистрирует публикацию на каждый вызов record_changes.
+    if not pending.exists():
+        return
+    with transaction.atomic():
+        # Первым запросом блокируется строка счетчика (в SQLite - вся БД).
+        if not ChangeSequence.objects.filter(pk=1).update(value=F('value')):
+            ChangeSequence.objects.get_or_create(pk=1)
+        last_seq = ChangeSequence.objects.values_list('value', flat=True).get(
+            pk=1,
+        )
+        bounds = pending.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return
+        # Номера без пропусков не нужны, только порядок.
+        offset = last_seq - bounds['first'] + 1
+        pending.filter(id__lte=bounds['last']).update(seq=F('id') + offset)
+        ChangeSequence.objects.filter(pk=1).update(
+            value=bounds['last'] + offset,
+        )
+
+
+def touch_recipes(queryset: QuerySet) -> None:
+    """
+    Отмечает изменение рецептов, в ответах которых есть измененный тег,
+    ингредиент или автор: обновляет `modified`, по которому строятся
+    валидаторы условных запросов, и журнал изменений.
+
+    Рецептов может быть много, поэтому они обновляются после фиксации
+    транзакции пачками по `TOUCH_BATCH_SIZE`.
+    """
+    recipe_ids = list(queryset.values_list('pk', flat=True).distinct())
+    if recipe_ids:
+        transaction.on_commit(lambda: _touch(recipe_ids))
+
+
+def _touch(recipe_ids: list[int]) -> None:
+    now = timezone.now()
+    for start in range(0, len(recipe_ids), TOUCH_BATCH_SIZE):
+        batch = recipe_ids[start:start + TOUCH_BATCH_SIZE]
+        with transaction.atomic():
+            Recipe.objects.filter(pk__in=batch).update(modified=now)
+            record_changes(Change.Kind.RECIPE, batch)
+
+
+def changes_since(
+    user: User,
+    since: int,
+    limit: int,
+) -> tuple[list[Change], bool]:
+    """
+    Страница изменений после токена `since` для пользователя.
+
+    Возвращает опубликованные изменения рецептов и избранного/корзины
+    пользователя в порядке номеров и признак наличия следующей страницы.
+    """
+    visible = Q(user_id__isnull=True)
+    if user.is_authenticated:
+        visible |= Q(user_id=user.pk)
+    changes = list(
+        Change.objects.filter(visible, seq__gt=since).order_by('seq')[
+            : limit + 1
+        ],
+    )
+    return changes[:limit], len(changes) > limit
@@ -1,13 +1,77 @@
-from django.db import IntegrityError
-from django.urls import reverse
+import asyncio
+import base64
+import gzip
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import JsonResponse, QueryDict
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from mixer.backend.django import mixer
+from PIL import Image
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from foodgram_backend.cache import ResponseCache
+from foodgram_backend.fields import Base64ImageField
+from foodgram_backend.parsers import FastJSONParser
+from foodgram_backend.renderers import FastJSONRenderer
+from foodgram_backend.routers import (
+    PRIMARY_COOKIE,
+    PRIMARY_USER_KEY,
+    ReplicaMiddleware,
+    ReplicaRouter,
+)
+from recipes.filters import RecipeFilter, TagSlugCache
+from recipes.images import VARIANTS, generate_variants, render_variants
+from recipes.index import ingredient_index
+from recipes.models import (
+    Change,
+    Favorite,
+    Ingredient,
+    IngredientAmount,
+    Recipe,
+    RecipeNeighbor,
+    RecipeScore,
+    ShoppingCart,
+    Tag,
+)
+from recipes.popularity import HALF_LIFE_DAYS
+from recipes.similarity import load_vectors, refresh_neighbors
+from recipes.sync import record_changes
+from recipes.views import page_cache
 from users.models import User
 
 
+def authenticate(client: APIClient, user: User) -> None:
+    """
+    Аутентификация токеном: асинхронные представления проверяют его.
+
+    Запрос к справочнику тегов заносит токен в кэш аутентификации,
+    чтобы запрос токена не попадал в подсчет запросов тестов.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    client.get(reverse('recipes:tags-list'))
+
+
 class IngredientsTests(APITestCase):
     def test_ingredient_empty_field(self) -> None:
         try:
@@ -159,6 +223,64 @@ class RecipeTests(APITestCase):
             1,
         )
 
+    def test_recipe_list_many_tags_no_duplicates(self) -> None:
+        tags = mixer.cycle(3).blend(Tag)
+        mixer.cycle(2).blend(Recipe, tags=tags)
+        url = reverse('recipes:recipes-list')
+        response = self.client.get(
+            url,
+            {'tags': [tag.slug for tag in tags]},
+        )
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_recipe_list_unknown_tag(self) -> None:
+        mixer.blend(Recipe)
+        url = reverse('recipes:recipes-list')
+        response = self.client.get(url, {'tags': 'unknown'})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_tag_slug_cache_limits_reloads_on_miss(self) -> None:
+        tag_slugs = TagSlugCache()
+        with self.assertNumQueries(1):
+            tag_slugs.get(['unknown'])
+            tag_slugs.get(['unknown'])
+        tag = mixer.blend(Tag)
+        with self.assertNumQueries(0):
+            self.assertNotIn(tag.slug, tag_slugs.get([tag.slug]))
+        tag_slugs.clear()
+        self.assertIn(tag.slug, tag_slugs.get([tag.slug]))
+
+    def test_recipe_search(self) -> None:
+        mixer.blend(Recipe, name='Salad', text='Goes well with borscht')
+        mixer.blend(Recipe, name='Borscht', text='Soup')
+        mixer.blend(Recipe, name='Pancakes', text='Dough')
+        url = reverse('recipes:recipes-list')
+        response = self.client.get(url, {'search': 'borscht', 'highlight': 1})
+        results = response.json()['results']
+        self.assertEqual(
+            [recipe['name'] for recipe in results],
+            ['Borscht', 'Salad'],
+        )
+        self.assertIn('search_headline', results[0])
+
+    def test_recipe_search_headline_is_escaped(self) -> None:
+        mixer.blend(Recipe, name='Salad', text='<i>Borscht</i> & bread')
+        url = reverse('recipes:recipes-list')
+        response = self.client.get(url, {'search': 'borscht', 'highlight': 1})
+        headline = response.json()['results'][0]['search_headline']
+        if connection.vendor == 'postgresql':
+            self.assertIn('<b>Borscht</b>', headline)
+            self.assertNotIn('<i>', headline)
+        else:
+            self.assertEqual(
+                headline,
+                '&lt;i&gt;<b>Borscht</b>&lt;/i&gt; &amp; bread',
+            )
+
     def test_recipe_detail(self) -> None:
         mixer.blend(Recipe)
         url = reverse('recipes:recipes-detail', args=(1,))
@@ -300,3 +422,1611 @@ class RecipeTests(APITestCase):
             status.HTTP_204_NO_CONTENT,
         )
         self.assertEqual(ShoppingCart.objects.count(), 0)
+
+
+class RecipeImportTests(APITestCase):
+    def setUp(self) -> None:
+        self.admin = mixer.blend(User, is_staff=True)
+        Ingredient.objects.create(name='курица', measurement_unit='г')
+        Ingredient.objects.create(name='рис', measurement_unit='г')
+        Tag.objects.create(name='супы', color='#FF0000', slug='soup')
+        self.url = reverse('recipes:recipes-import-recipes')
+        self.rows = [
+            {
+                'name': 'Куриный суп',
+                'cooking_time': 60,
+                'text': 'Суп',
+                'tags': ['soup'],
+                'ingredients': [
+                    {'name': 'Курица', 'measurement_unit': 'г', 'amount': 5},
+                    {'name': 'рис', 'measurement_unit': 'г', 'amount': 1},
+                ],
+            },
+            {
+                'name': 'Суп без риса',
+                'cooking_time': 30,
+                'text': 'Суп',
+                'tags': ['soup'],
+                'ingredients': [
+                    {'name': 'гречка', 'measurement_unit': 'г', 'amount': 1},
+                ],
+            },
+        ]
+
+    def test_import_json(self) -> None:
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(self.url, self.rows, format='json')
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED,
+            response.json(),
+        )
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(len(response.json()['errors']), 1)
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.author, self.admin)
+        self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertEqual(recipe.tags.get().slug, 'soup')
+
+    def test_import_skips_existing(self) -> None:
+        self.client.force_authenticate(self.admin)
+        self.client.post(self.url, self.rows[:1], format='json')
+        response = self.client.post(self.url, self.rows[:1], format='json')
+        self.assertEqual(response.json()['skipped'], 1)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_import_csv_file(self) -> None:
+        self.client.force_authenticate(self.admin)
+        file = SimpleUploadedFile(
+            'recipes.csv',
+            (
+                'name,author,cooking_time,text,tags,ingredients\n'
+                f'Плов,{self.admin.username},90,Плов,soup,'
+                'курица:г:500;рис:г:300\n'
+            ).encode(),
+        )
+        response = self.client.post(self.url, {'file': file})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED,
+            response.json(),
+        )
+        self.assertEqual(
+            Recipe.objects.get().ingredient_amounts.get(
+                ingredient__name='рис',
+            ).amount,
+            300,
+        )
+
+    def test_import_csv_malformed_row(self) -> None:
+        self.client.force_authenticate(self.admin)
+        file = SimpleUploadedFile(
+            'recipes.csv',
+            (
+                'name,author,cooking_time,text,tags,ingredients\n'
+                f'Каша,{self.admin.username},20,Каша,soup,рис\n'
+                f'Плов,{self.admin.username},90,Плов,soup,рис:г:300\n'
+            ).encode(),
+        )
+        response = self.client.post(self.url, {'file': file})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED,
+            response.json(),
+        )
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(
+            response.json()['errors'],
+            ['1: Некорректный ингредиент: рис'],
+        )
+
+    def test_import_forbidden(self) -> None:
+        self.client.force_authenticate(mixer.blend(User))
+        response = self.client.post(self.url, self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportTests(APITestCase):
+    def setUp(self) -> None:
+        self.admin = mixer.blend(User, is_staff=True)
+        self.tag = mixer.blend(Tag, slug='soup')
+        self.recipe = mixer.blend(Recipe, tags=[self.tag])
+        ingredient = mixer.blend(Ingredient)
+        self.recipe.ingredient_amounts.create(ingredient=ingredient, amount=3)
+
+    def test_export_recipes_ndjson(self) -> None:
+        self.client.force_authenticate(self.admin)
+        url = reverse('recipes:export', args=('recipes',))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['tags'], ['soup'])
+        self.assertEqual(row['ingredients'][0]['amount'], 3)
+
+    async def test_export_streams_async_under_asgi(self) -> None:
+        token = await Token.objects.acreate(user=self.admin)
+        response = await self.async_client.get(
+            reverse('recipes:export', args=('recipes',)),
+            headers={'Authorization': f'Token {token.key}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        content = b''.join(
+            [chunk async for chunk in response.streaming_content],
+        )
+        self.assertEqual(json.loads(content)['tags'], ['soup'])
+
+    def test_export_favorites_csv_gzip(self) -> None:
+        Favorite.objects.create(user=self.admin, recipe=self.recipe)
+        self.client.force_authenticate(self.admin)
+        url = reverse('recipes:export', args=('favorites',))
+        response = self.client.get(url, {'output': 'csv', 'gzip': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = gzip.decompress(
+            b''.join(response.streaming_content),
+        ).decode().splitlines()
+        self.assertEqual(rows[0], 'id,user_id,user__username,recipe_id')
+        self.assertEqual(len(rows), 2)
+
+    def test_export_unknown_table(self) -> None:
+        self.client.force_authenticate(self.admin)
+        url = reverse('recipes:export', args=('passwords',))
+        response = self.client.get(url)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_export_forbidden(self) -> None:
+        self.client.force_authenticate(mixer.blend(User))
+        url = reverse('recipes:export', args=('recipes',))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RecipeQueryPlanTests(APITestCase):
+    """Каждая комбинация фильтров списка рецептов должна идти по индексам."""
+
+    LARGE_TABLES = (
+        'recipes_recipe',
+        'recipes_favorite',
+        'recipes_shoppingcart',
+        'recipes_recipe_tags',
+        'recipes_ingredientamount',
+        'recipes_recipescore',
+    )
+    ROWS = 10000
+    AUTHORS = 100
+
+    def sequential_scans(self, plan: str) -> list[str]:
+        if connection.vendor == 'postgresql':
+            pattern = r'Seq Scan on (\w+)'
+        else:
+            pattern = r'SCAN (\w+)(?! USING (?:COVERING )?INDEX)'
+        return [
+            table
+            for table in re.findall(pattern, plan)
+            if table in self.LARGE_TABLES
+        ]
+
+    def fill_tables(self) -> None:
+        """
+        Заполняет таблицы и собирает статистику: на почти пустых
+        таблицах PostgreSQL предпочитает последовательное чтение.
+        """
+        authors = User.objects.bulk_create(
+            User(username=f'author_{i}', email=f'author_{i}@fake.com')
+            for i in range(self.AUTHORS)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'tag {i}', color=f'#{i:06X}', slug=f'tag_{i}')
+            for i in range(self.AUTHORS)
+        )
+        ingredient = mixer.blend(Ingredient)
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=f'recipe {i}',
+                    author=authors[i % self.AUTHORS],
+                    text='text',
+                    cooking_time=1,
+                )
+                for i in range(self.ROWS)
+            ),
+            batch_size=1000,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[i % self.AUTHORS])
+            for i, recipe in enumerate(recipes)
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes
+        )
+        RecipeScore.objects.bulk_create(
+            RecipeScore(recipe=recipe) for recipe in recipes
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=authors[i % self.AUTHORS], recipe=recipe)
+                for i, recipe in enumerate(recipes)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_recipe_filters_use_indexes(self) -> None:
+        user = mixer.blend(User)
+        tag = mixer.blend(Tag)
+        recipe = mixer.blend(Recipe, tags=[tag])
+        request = APIRequestFactory().get('/')
+        request.user = user
+        params = {
+            'tags': tag.slug,
+            'author': recipe.author_id,
+            'is_favorited': 1,
+            'is_in_shopping_cart': 1,
+            'ordering': 'trending',
+        }
+        if connection.vendor == 'postgresql':
+            self.fill_tables()
+        for size in range(len(params) + 1):
+            for combination in itertools.combinations(params, size):
+                query = '&'.join(f'{key}={params[key]}' for key in combination)
+                queryset = RecipeFilter(QueryDict(query), request=request).qs
+                plan = queryset[:6].explain()
+                with self.subTest(filters=combination):
+                    self.assertEqual(self.sequential_scans(plan), [], plan)
+
+
+class IngredientFilterTests(APITestCase):
+    def setUp(self) -> None:
+        ingredient_index.invalidate()
+        self.chicken, self.nuts, self.rice = mixer.cycle(3).blend(Ingredient)
+        self.url = reverse('recipes:recipes-list')
+
+    def create_recipe(self, *ingredients: Ingredient) -> Recipe:
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = mixer.blend(Recipe)
+            for ingredient in ingredients:
+                recipe.ingredient_amounts.create(ingredient=ingredient)
+        return recipe
+
+    def filtered_ids(self, params: dict) -> set[int]:
+        response = self.client.get(self.url, params)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            response.json(),
+        )
+        return {recipe['id'] for recipe in response.json()['results']}
+
+    def test_contains_all_and_none_of(self) -> None:
+        chicken_nuts = self.create_recipe(self.chicken, self.nuts)
+        chicken_rice = self.create_recipe(self.chicken, self.rice)
+        self.create_recipe(self.rice)
+        self.assertEqual(
+            self.filtered_ids({'ingredients': [self.chicken.pk]}),
+            {chicken_nuts.pk, chicken_rice.pk},
+        )
+        self.assertEqual(
+            self.filtered_ids(
+                {
+                    'ingredients': [self.chicken.pk],
+                    'exclude_ingredients': [self.nuts.pk],
+                },
+            ),
+            {chicken_rice.pk},
+        )
+        self.assertEqual(
+            self.filtered_ids(
+                {'ingredients': [self.chicken.pk, self.rice.pk]},
+            ),
+            {chicken_rice.pk},
+        )
+
+    def test_index_follows_changes(self) -> None:
+        recipe = self.create_recipe(self.rice)
+        params = {'ingredients': [self.chicken.pk]}
+        self.assertEqual(self.filtered_ids(params), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            amount = recipe.ingredient_amounts.create(ingredient=self.chicken)
+        self.assertEqual(self.filtered_ids(params), {recipe.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            amount.delete()
+        self.assertEqual(self.filtered_ids(params), set())
+
+    def test_index_ignores_rolled_back_changes(self) -> None:
+        recipe = self.create_recipe(self.rice)
+        params = {'ingredients': [self.chicken.pk]}
+        self.assertEqual(self.filtered_ids(params), set())
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                recipe.ingredient_amounts.create(ingredient=self.chicken)
+                recipe.ingredient_amounts.create(ingredient=self.rice)
+        self.assertEqual(self.filtered_ids(params), set())
+
+    def test_index_follows_change_log(self) -> None:
+        recipe = self.create_recipe(self.rice)
+        params = {'ingredients': [self.chicken.pk]}
+        self.assertEqual(self.filtered_ids(params), set())
+        # Изменение из другого процесса: без сигналов, только журнал.
+        IngredientAmount.objects.bulk_create(
+            [IngredientAmount(recipe=recipe, ingredient=self.chicken)],
+        )
+        self.assertEqual(self.filtered_ids(params), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            record_changes(Change.Kind.RECIPE, (recipe.pk,))
+        self.assertEqual(self.filtered_ids(params), {recipe.pk})
+
+    def test_large_result_uses_subquery(self) -> None:
+        recipes = [self.create_recipe(self.chicken) for _ in range(3)]
+        with mock.patch.object(RecipeFilter, 'max_ids_in_query', 1):
+            self.assertEqual(
+                self.filtered_ids({'ingredients': [self.chicken.pk]}),
+                {recipe.pk for recipe in recipes},
+            )
+            self.assertEqual(
+                self.filtered_ids({'exclude_ingredients': [self.chicken.pk]}),
+                set(),
+            )
+
+    def test_comma_separated_ids(self) -> None:
+        recipe = self.create_recipe(self.chicken, self.rice)
+        self.create_recipe(self.chicken, self.nuts)
+        ids = f'{self.chicken.pk},{self.rice.pk}'
+        self.assertEqual(
+            self.filtered_ids({'ingredients': ids}),
+            {recipe.pk},
+        )
+        response = self.client.get(
+            reverse('recipes:recipes-pantry'),
+            {'ingredients': ids, 'max_missing': 0},
+        )
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [recipe.pk],
+        )
+
+    def test_invalid_ids(self) -> None:
+        response = self.client.get(self.url, {'ingredients': 'chicken'})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_pantry_ranked_by_missing(self) -> None:
+        complete = self.create_recipe(self.chicken, self.rice)
+        missing_one = self.create_recipe(self.chicken, self.nuts)
+        newer_complete = self.create_recipe(self.rice)
+        self.create_recipe(self.nuts)
+        url = reverse('recipes:recipes-pantry')
+        response = self.client.get(
+            url,
+            {'ingredients': [self.chicken.pk, self.rice.pk]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual(
+            [(item['id'], item['missing_ingredients']) for item in results],
+            [(newer_complete.pk, 0), (complete.pk, 0), (missing_one.pk, 1)],
+        )
+        response = self.client.get(
+            url,
+            {'ingredients': [self.chicken.pk], 'max_missing': 0},
+        )
+        self.assertEqual(response.json()['count'], 0)
+        recipe = self.create_recipe(self.chicken)
+        response = self.client.get(
+            url,
+            {'ingredients': [self.chicken.pk], 'max_missing': 0},
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [recipe.pk],
+        )
+
+    def test_pantry_invalid_params(self) -> None:
+        url = reverse('recipes:recipes-pantry')
+        for params in (
+            {},
+            {'ingredients': 'chicken'},
+            {'ingredients': self.chicken.pk, 'max_missing': 100},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+
+class SimilarRecipesTests(APITestCase):
+    def setUp(self) -> None:
+        self.beef, self.onion, self.rice, self.milk = mixer.cycle(4).blend(
+            Ingredient,
+        )
+        self.dinner, self.breakfast = mixer.cycle(2).blend(Tag)
+        self.plov = self.create_recipe(
+            (self.beef, self.onion, self.rice),
+            self.dinner,
+        )
+        self.stew = self.create_recipe((self.beef, self.onion), self.dinner)
+        self.porridge = self.create_recipe(
+            (self.rice, self.milk),
+            self.breakfast,
+        )
+        self.milkshake = self.create_recipe((self.milk,), self.breakfast)
+
+    def create_recipe(self, ingredients: tuple, tag: Tag) -> Recipe:
+        recipe = mixer.blend(Recipe)
+        recipe.tags.set((tag,))
+        for ingredient in ingredients:
+            recipe.ingredient_amounts.create(ingredient=ingredient)
+        return recipe
+
+    def similar_ids(self, recipe: Recipe) -> list[int]:
+        response = self.client.get(
+            reverse('recipes:recipes-similar', args=(recipe.pk,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.json()]
+
+    def test_missing_recipe(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('recipes:recipes-similar', args=(0,)),
+            )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(queries), 1)
+
+    def test_ranked_by_similarity(self) -> None:
+        self.assertEqual(self.similar_ids(self.plov), [])
+        call_command('similarrecipes', stdout=io.StringIO())
+        self.assertEqual(
+            self.similar_ids(self.plov),
+            [self.stew.pk, self.porridge.pk],
+        )
+        self.assertEqual(self.similar_ids(self.milkshake), [self.porridge.pk])
+        self.assertFalse(Recipe.objects.filter(similar_stale=True).exists())
+
+    def test_refresh_stale(self) -> None:
+        refresh_neighbors()
+        self.porridge.ingredient_amounts.filter(ingredient=self.milk).delete()
+        self.porridge.ingredient_amounts.create(ingredient=self.beef)
+        self.porridge.ingredient_amounts.create(ingredient=self.onion)
+        self.porridge.tags.set((self.dinner,))
+        self.assertEqual(
+            list(Recipe.objects.filter(similar_stale=True)),
+            [self.porridge],
+        )
+        self.assertEqual(refresh_neighbors(stale_only=True), 3)
+        self.assertEqual(self.similar_ids(self.plov)[0], self.porridge.pk)
+        self.assertEqual(refresh_neighbors(stale_only=True), 0)
+
+    def test_edit_during_refresh_stays_stale(self) -> None:
+        def load_and_edit():
+            vectors = load_vectors()
+            self.stew.tags.set((self.breakfast,))
+            return vectors
+
+        with mock.patch('recipes.similarity.load_vectors', load_and_edit):
+            refresh_neighbors()
+        self.assertEqual(
+            list(Recipe.objects.filter(similar_stale=True)),
+            [self.stew],
+        )
+        refresh_neighbors(stale_only=True)
+        self.assertFalse(Recipe.objects.filter(similar_stale=True).exists())
+
+    def test_deleted_neighbor(self) -> None:
+        refresh_neighbors()
+        self.stew.delete()
+        self.assertEqual(self.similar_ids(self.plov), [self.porridge.pk])
+        self.assertFalse(
+            RecipeNeighbor.objects.filter(neighbor=self.stew.pk).exists(),
+        )
+
+    def test_frequent_features_rerank(self) -> None:
+        with mock.patch('recipes.similarity.MIN_CANDIDATE_POSTING', 1):
+            refresh_neighbors()
+        self.assertEqual(self.similar_ids(self.plov)[0], self.stew.pk)
+
+
+class PopularityTests(APITestCase):
+    def setUp(self) -> None:
+        self.users = mixer.cycle(3).blend(User)
+        self.old, self.new, self.unpopular = mixer.cycle(3).blend(Recipe)
+        self.url = reverse('recipes:recipes-list')
+
+    def add(self, model, recipe: Recipe, user: User, days_ago: int = 0):
+        obj = model.objects.create(user=user, recipe=recipe)
+        if days_ago:
+            model.objects.filter(pk=obj.pk).update(
+                created=timezone.now() - timedelta(days=days_ago),
+            )
+        return obj
+
+    def ordered_ids(self, ordering: str) -> list[int]:
+        response = self.client.get(self.url, {'ordering': ordering})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_popular_and_trending(self) -> None:
+        for user in self.users:
+            self.add(Favorite, self.old, user, days_ago=HALF_LIFE_DAYS * 4)
+        self.add(Favorite, self.new, self.users[0])
+        self.add(ShoppingCart, self.new, self.users[0])
+        call_command('refreshscores', stdout=io.StringIO())
+        self.assertEqual(
+            self.ordered_ids('popular'),
+            [self.old.pk, self.new.pk, self.unpopular.pk],
+        )
+        self.assertEqual(
+            self.ordered_ids('trending'),
+            [self.new.pk, self.old.pk, self.unpopular.pk],
+        )
+        score = RecipeScore.objects.get(recipe=self.old)
+        self.assertEqual((score.favorites, score.popularity), (3, 3))
+        self.assertAlmostEqual(score.trending, 3 / 2**4, places=2)
+
+    def test_incremental_updates(self) -> None:
+        favorite = self.add(Favorite, self.unpopular, self.users[0])
+        self.add(ShoppingCart, self.unpopular, self.users[1])
+        score = RecipeScore.objects.get(recipe=self.unpopular)
+        self.assertEqual(
+            (score.favorites, score.carts, score.popularity),
+            (1, 1, 2),
+        )
+        self.assertAlmostEqual(score.trending, 2, places=3)
+        self.assertEqual(self.ordered_ids('popular')[0], self.unpopular.pk)
+        favorite.delete()
+        score.refresh_from_db()
+        self.assertEqual((score.favorites, score.popularity), (0, 1))
+        self.assertAlmostEqual(score.trending, 1, places=3)
+        call_command('refreshscores', stdout=io.StringIO())
+        refreshed = RecipeScore.objects.get(recipe=self.unpopular)
+        self.assertEqual(refreshed.popularity, score.popularity)
+        self.assertAlmostEqual(refreshed.trending, score.trending, places=2)
+
+    def test_invalid_ordering(self) -> None:
+        response = self.client.get(self.url, {'ordering': 'random'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = mixer.blend(User)
+        self.tag = mixer.blend(Tag)
+        self.ingredient = mixer.blend(Ingredient)
+        for recipe in mixer.cycle(4).blend(Recipe, tags=[self.tag]):
+            recipe.ingredient_amounts.create(
+                ingredient=self.ingredient,
+                amount=5,
+            )
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        self.url = reverse('recipes:recipes-list')
+        authenticate(self.client, self.user)
+
+    def get(self, params: dict) -> tuple[list[dict], int]:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['results'], len(queries)
+
+    def test_full_payload_queries_constant(self) -> None:
+        results, queries = self.get({})
+        self.assertTrue(results[0]['is_favorited'])
+        self.assertFalse(results[0]['is_in_shopping_cart'])
+        self.assertEqual(results[0]['ingredients'][0]['amount'], 5)
+        mixer.cycle(2).blend(Recipe, tags=[self.tag])
+        more_results, more_queries = self.get({})
+        self.assertEqual(len(more_results), len(results) + 2)
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(queries, 5)
+
+    def test_fields(self) -> None:
+        _, full_queries = self.get({})
+        fields = ('id', 'name', 'image', 'cooking_time')
+        results, queries = self.get({'fields': ','.join(fields)})
+        self.assertEqual(tuple(results[0]), fields)
+        self.assertEqual(queries, 2)
+        self.assertLess(queries, full_queries)
+
+    def test_expand(self) -> None:
+        results, _ = self.get(
+            {'fields': 'author,tags,ingredients', 'expand': 'tags'},
+        )
+        self.assertEqual(set(results[0]), {'author', 'tags', 'ingredients'})
+        self.assertIsInstance(results[0]['author'], int)
+        self.assertEqual(results[0]['tags'][0]['slug'], self.tag.slug)
+        self.assertEqual(
+            results[0]['ingredients'],
+            [{'id': self.ingredient.pk, 'amount': 5}],
+        )
+
+    def test_batch_by_ids(self) -> None:
+        first, second, third, _ = Recipe.objects.order_by('pk')
+        ids = [third.pk, first.pk, 0, second.pk, third.pk]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url,
+                {'ids': ','.join(map(str, ids))},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()],
+            [third.pk, first.pk, second.pk],
+        )
+        self.assertTrue(response.json()[0]['is_favorited'])
+        # Рецепты, связанные объекты и запрос ETag.
+        self.assertEqual(len(queries), 5)
+        response = self.client.get(
+            self.url,
+            {'ids': f'{first.pk},{second.pk}', 'fields': 'id'},
+        )
+        self.assertEqual(
+            response.json(),
+            [{'id': first.pk}, {'id': second.pk}],
+        )
+
+    def test_batch_limits(self) -> None:
+        for ids in ('', 'a,b', ','.join(map(str, range(1, 102)))):
+            with self.subTest(ids=ids[:10]):
+                response = self.client.get(self.url, {'ids': ids})
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+    def test_detail(self) -> None:
+        recipe = Recipe.objects.first()
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,)),
+            {'fields': 'id,is_favorited'},
+        )
+        self.assertEqual(
+            response.json(),
+            {'id': recipe.pk, 'is_favorited': True},
+        )
+
+
+class SyncTests(APITestCase):
+    def setUp(self) -> None:
+        self.user, self.other = mixer.cycle(2).blend(User)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first, self.second = mixer.cycle(2).blend(Recipe)
+        self.url = reverse('recipes:sync')
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since: str = '', **params) -> dict:
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_initial_and_delta(self) -> None:
+        data = self.sync()
+        self.assertEqual(
+            {recipe['id'] for recipe in data['recipes']},
+            {self.first.pk, self.second.pk},
+        )
+        token = data['token']
+        self.assertEqual(self.sync(token)['recipes'], [])
+        deleted_pk = self.second.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.name = 'new name'
+            self.first.save()
+            self.second.delete()
+            Favorite.objects.create(user=self.user, recipe=self.first)
+            Favorite.objects.create(user=self.other, recipe=self.first)
+            cart = ShoppingCart.objects.create(
+                user=self.user,
+                recipe=self.first,
+            )
+            cart.delete()
+        data = self.sync(token)
+        self.assertEqual(
+            [recipe['name'] for recipe in data['recipes']],
+            ['new name'],
+        )
+        self.assertEqual(data['deleted_recipes'], [deleted_pk])
+        self.assertEqual(
+            data['favorites'],
+            {'added': [self.first.pk], 'removed': []},
+        )
+        self.assertEqual(
+            data['shopping_cart'],
+            {'added': [], 'removed': [self.first.pk]},
+        )
+        self.assertEqual(
+            Change.objects.filter(kind=Change.Kind.SHOPPING_CART).count(),
+            1,
+        )
+
+    def test_keyset_paging(self) -> None:
+        data = self.sync(limit=1)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['recipes']), 1)
+        data = self.sync(data['token'], limit=1)
+        self.assertEqual(len(data['recipes']), 1)
+        data = self.sync(data['token'], limit=1)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['token'])['token'], data['token'])
+
+    def test_delta_queries_independent_of_dataset(self) -> None:
+        token = self.sync()['token']
+        with self.captureOnCommitCallbacks(execute=True):
+            mixer.cycle(5).blend(Recipe)
+        token = self.sync(token)['token']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        with CaptureQueriesContext(connection) as queries:
+            data = self.sync(token)
+        self.assertEqual(len(data['recipes']), 1)
+        self.assertLessEqual(len(queries), 5)
+
+    def test_changes_visible_after_publication(self) -> None:
+        token = self.sync()['token']
+        # Запись транзакции, которая еще не опубликована: ее id меньше
+        # номеров, которые клиент получит позже.
+        Change.objects.create(kind=Change.Kind.RECIPE, recipe_id=self.first.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.save()
+        data = self.sync(token)
+        self.assertEqual(
+            {recipe['id'] for recipe in data['recipes']},
+            {self.first.pk, self.second.pk},
+        )
+        self.assertEqual(
+            Change.objects.filter(seq__isnull=True).count(),
+            0,
+        )
+
+    def test_invalid_params(self) -> None:
+        for params in ({'since': 'abc'}, {'since': -1}, {'limit': 0}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+
+def image_file(size: tuple[int, int], orientation: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ImageVariantsTests(APITestCase):
+    def setUp(self) -> None:
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = mixer.blend(User)
+        self.client.force_authenticate(self.user)
+        mixer.blend(Ingredient)
+        mixer.blend(Tag)
+
+    def create_recipe(
+        self,
+        content: bytes,
+        execute: bool = True,
+        name: str = 'Fried Chicken',
+    ) -> dict:
+        data = {
+            'ingredients': [{'id': 1, 'amount': 2}],
+            'tags': [1],
+            'image': 'data:image/jpeg;base64,'
+            + base64.b64encode(content).decode(),
+            'name': name,
+            'text': 'Must be tasty',
+            'cooking_time': 2,
+        }
+        with self.captureOnCommitCallbacks(execute=execute):
+            response = self.client.post(
+                reverse('recipes:recipes-list'),
+                data,
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()
+
+    def test_fallback_before_processing(self) -> None:
+        data = self.create_recipe(image_file((50, 40)), execute=False)
+        self.assertEqual(
+            data['images'],
+            dict.fromkeys((*VARIANTS, 'original'), data['image']),
+        )
+
+    def test_variants_resized_without_metadata(self) -> None:
+        self.create_recipe(image_file((2000, 1000), orientation=6))
+        recipe = Recipe.objects.get()
+        self.assertEqual(set(recipe.image_variants), set(VARIANTS))
+        for name, (width, height) in VARIANTS.items():
+            with self.subTest(name=name):
+                path = recipe.image_variants[name]
+                self.assertTrue(path.endswith('.webp'))
+                with recipe.image.storage.open(path) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.format, 'WEBP')
+                    self.assertLessEqual(image.width, width)
+                    self.assertLessEqual(image.height, height)
+                    self.assertGreater(image.height, image.width)
+                    self.assertNotIn('exif', image.info)
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(recipe.pk,)),
+        )
+        self.assertTrue(response.json()['images']['thumb'].endswith('.webp'))
+
+    def test_new_image_replaces_variants(self) -> None:
+        data = self.create_recipe(image_file((300, 300)))
+        recipe = Recipe.objects.get()
+        old = set(recipe.image_variants.values())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('recipes:recipes-detail', args=(data['id'],)),
+                {
+                    'image': 'data:image/jpeg;base64,'
+                    + base64.b64encode(image_file((400, 200))).decode(),
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.image_variants)
+        self.assertFalse(old & set(recipe.image_variants.values()))
+        call_command('cleanmedia', '--grace', '0', stdout=io.StringIO())
+        for path in old:
+            self.assertFalse(recipe.image.storage.exists(path))
+        for path in (recipe.image.name, *recipe.image_variants.values()):
+            self.assertTrue(recipe.image.storage.exists(path))
+
+    def test_same_content_stored_once(self) -> None:
+        content = image_file((300, 300))
+        first = self.create_recipe(content)
+        second = self.create_recipe(content, name='Boiled Chicken')
+        self.assertRegex(
+            first['image'],
+            r'^/media/recipes/[0-9a-f]{2}/[0-9a-f]{64}\.jpe?g$',
+        )
+        self.assertEqual(first['image'], second['image'])
+        recipe = Recipe.objects.get(pk=first['id'])
+        _, files = recipe.image.storage.listdir(
+            recipe.image.name.rsplit('/', 1)[0],
+        )
+        self.assertEqual(len(files), 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=second['id']).image_variants,
+            recipe.image_variants,
+        )
+        recipe.delete()
+        out = io.StringIO()
+        call_command('cleanmedia', '--grace', '0', stdout=out)
+        self.assertIn('Files removed: 0', out.getvalue())
+        self.assertTrue(recipe.image.storage.exists(recipe.image.name))
+
+    def test_cleanmedia_grace(self) -> None:
+        data = self.create_recipe(image_file((2000, 1000)))
+        Recipe.objects.filter(pk=data['id']).delete()
+        out = io.StringIO()
+        call_command('cleanmedia', stdout=out)
+        self.assertIn('Files removed: 0', out.getvalue())
+        call_command('cleanmedia', '--grace', '0', stdout=out)
+        self.assertIn('Files removed: 4', out.getvalue())
+
+    def test_stale_result_discarded(self) -> None:
+        self.create_recipe(image_file((300, 300)), execute=False)
+        recipe = Recipe.objects.get()
+
+        def replace_image(image: Image.Image) -> dict[str, bytes]:
+            Recipe.objects.update(image='recipes/other.jpg')
+            return render_variants(image)
+
+        with mock.patch(
+            'recipes.images.render_variants',
+            side_effect=replace_image,
+        ):
+            self.assertEqual(generate_variants(recipe.pk), {})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, {})
+        self.assertEqual(recipe.image_placeholder, '')
+
+    def test_placeholder(self) -> None:
+        data = self.create_recipe(image_file((50, 40)), execute=False)
+        self.assertEqual(data['image_placeholder'], '')
+        data = self.create_recipe(image_file((800, 600)), name='Soup')
+        url = reverse('recipes:recipes-detail', args=(data['id'],))
+        placeholder = self.client.get(url).json()['image_placeholder']
+        self.assertTrue(placeholder.startswith('data:image/webp;base64,'))
+        self.assertLess(len(placeholder), 500)
+        content = base64.b64decode(placeholder.split(',', 1)[1])
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual(image.size, (16, 12))
+        response = self.client.post(
+            reverse('recipes:recipes-favorite', args=(data['id'],)),
+        )
+        self.assertEqual(response.json()['image_placeholder'], placeholder)
+
+    def test_placeholder_backfill(self) -> None:
+        data = self.create_recipe(image_file((800, 600)), execute=False)
+        mixer.blend(Recipe)
+        out = io.StringIO()
+        call_command('imageplaceholders', '-w', '0', stdout=out)
+        self.assertIn('Recipes processed: 1', out.getvalue())
+        recipe = Recipe.objects.get(pk=data['id'])
+        self.assertTrue(
+            recipe.image_placeholder.startswith('data:image/webp;base64,'),
+        )
+        self.assertTrue(
+            Change.objects.filter(
+                kind=Change.Kind.RECIPE,
+                recipe_id=recipe.pk,
+            ).exists(),
+        )
+
+    def test_command_processes_missing(self) -> None:
+        self.create_recipe(image_file((300, 300)), execute=False)
+        mixer.blend(Recipe)
+        out = io.StringIO()
+        call_command('imagevariants', '-w', '0', stdout=out)
+        self.assertIn('Recipes processed: 1.', out.getvalue())
+        self.assertEqual(
+            Recipe.objects.exclude(image_variants={}).count(),
+            1,
+        )
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ImageUploadLimitsTests(APITestCase):
+    def setUp(self) -> None:
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_authenticate(mixer.blend(User))
+        mixer.blend(Ingredient)
+        mixer.blend(Tag)
+
+    def post(self, image: str) -> dict:
+        response = self.client.post(
+            reverse('recipes:recipes-list'),
+            {
+                'ingredients': [{'id': 1, 'amount': 2}],
+                'tags': [1],
+                'image': image,
+                'name': 'Fried Chicken',
+                'text': 'Must be tasty',
+                'cooking_time': 2,
+            },
+            format='json',
+        )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertFalse(Recipe.objects.exists())
+        return response.json()
+
+    def test_invalid_uploads(self) -> None:
+        content = base64.b64encode(image_file((20, 20))).decode()
+        cases = {
+            'not a data uri': 'Ожидается изображение',
+            f'data:image/svg+xml;base64,{content}': 'Неподдерживаемый тип',
+            f'data:image/png;base64,{content[:-1]}': 'base64',
+            'data:image/png;base64,'
+            + base64.b64encode(b'not an image').decode(): 'изображение',
+        }
+        for image, message in cases.items():
+            with self.subTest(image=image[:30]):
+                self.assertIn(message, self.post(image)['image'][0])
+
+    @override_settings(IMAGE_MAX_SIZE=1000)
+    def test_size_checked_before_decoding(self) -> None:
+        image = 'data:image/png;base64,' + 'A' * 2000
+        with mock.patch('binascii.a2b_base64') as decode:
+            errors = self.post(image)
+        decode.assert_not_called()
+        self.assertIn('1000', errors['image'][0])
+
+    def test_line_wrapped_base64(self) -> None:
+        content = image_file((20, 20))
+        image = 'data:image/jpeg;base64,{}'.format(
+            base64.encodebytes(content).decode(),
+        )
+        field = Base64ImageField()
+        for chunk_size in (10, 4096):
+            with self.subTest(chunk_size=chunk_size), mock.patch(
+                'foodgram_backend.fields.DECODE_CHUNK_SIZE',
+                chunk_size,
+            ):
+                file = field.to_internal_value(image)
+                self.assertEqual(file.read(), content)
+                file.close()
+
+    def test_stored_upload_closed(self) -> None:
+        content = image_file((20, 20))
+        image = 'data:image/jpeg;base64,' + base64.b64encode(content).decode()
+        storage = Recipe._meta.get_field('image').storage
+        for _ in range(2):
+            # Второй раз файл уже есть в хранилище и не перемещается.
+            upload = Base64ImageField().to_internal_value(image)
+            path = upload.temporary_file_path()
+            storage.save('recipes/image.jpg', upload)
+            self.assertTrue(upload.file.closed)
+            self.assertFalse(os.path.exists(path))
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit(self) -> None:
+        content = base64.b64encode(image_file((20, 20))).decode()
+        errors = self.post(f'data:image/jpeg;base64,{content}')
+        self.assertIn('пикселей', errors['image'][0])
+
+    @override_settings(JSON_MAX_BODY_SIZE=100)
+    def test_body_limit(self) -> None:
+        response = self.client.post(
+            reverse('recipes:recipes-list'),
+            {'name': 'x' * 200},
+            format='json',
+        )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+
+class AsyncViewsTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = mixer.blend(User)
+        self.token = Token.objects.create(user=self.user)
+        self.tags = mixer.cycle(2).blend(Tag)
+        self.ingredient = mixer.blend(Ingredient, name='соль')
+        self.recipes = mixer.cycle(3).blend(Recipe, tags=self.tags)
+        for recipe in self.recipes:
+            IngredientAmount.objects.create(
+                recipe=recipe,
+                ingredient=self.ingredient,
+                amount=2,
+            )
+
+    def test_read_routes_are_async(self) -> None:
+        for url in (
+            reverse('recipes:ingredients-list'),
+            reverse('recipes:tags-detail', args=(self.tags[0].pk,)),
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-detail', args=(self.recipes[0].pk,)),
+            reverse('recipes:recipes-download-shopping-cart'),
+        ):
+            with self.subTest(url=url):
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    def test_token_authentication(self) -> None:
+        Favorite.objects.create(user=self.user, recipe=self.recipes[1])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.get(
+            reverse('recipes:recipes-list'),
+            {'is_favorited': 1},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([recipe['id'] for recipe in results], [2])
+        self.assertTrue(results[0]['is_favorited'])
+        self.client.credentials(HTTP_AUTHORIZATION='Token wrong')
+        response = self.client.get(reverse('recipes:recipes-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_not_found(self) -> None:
+        for url in (
+            reverse('recipes:recipes-detail', args=(100,)),
+            reverse('recipes:tags-detail', args=(100,)),
+            reverse('recipes:ingredients-detail', args=(100,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_404_NOT_FOUND,
+                )
+                self.assertIn('detail', response.json())
+        response = self.client.get(
+            reverse('recipes:recipes-list'),
+            {'page': 10},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_methods_use_sync_views(self) -> None:
+        url = reverse('recipes:tags-list')
+        response = self.client.post(url, {'name': 'tag'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        authenticate(self.client, self.user)
+        response = self.client.post(url, {'name': 'tag'})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+        response = self.client.delete(
+            reverse('recipes:recipes-detail', args=(self.recipes[0].pk,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_download_shopping_cart(self) -> None:
+        url = reverse('recipes:recipes-download-shopping-cart')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        for recipe in self.recipes[:2]:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        authenticate(self.client, self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['Content-Type'],
+            'application/pdf; charset=utf-8',
+        )
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    async def test_concurrent_requests(self) -> None:
+        urls = (
+            reverse('recipes:ingredients-list') + '?name=со',
+            reverse('recipes:tags-list'),
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-detail', args=(self.recipes[0].pk,)),
+        )
+        responses = await asyncio.gather(
+            *(self.async_client.get(url) for url in urls * 5),
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(responses[0].json()[0]['name'], 'соль')
+        self.assertEqual(responses[2].json()['count'], 3)
+
+
+@override_settings(DATABASE_REPLICAS=['testing_replica'])
+class ReplicaRouterTests(APITestCase):
+    databases = {'default', 'testing_replica'}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = mixer.blend(User)
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = mixer.blend(Recipe)
+        mixer.blend(Tag, slug='primary')
+        # Реплика отстает: в ней есть только этот тег.
+        Tag.objects.using('testing_replica').create(
+            name='replica',
+            color='#000000',
+            slug='replica',
+        )
+        self.tags_url = reverse('recipes:tags-list')
+
+    def tag_slugs(self) -> list[str]:
+        response = self.client.get(self.tags_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [tag['slug'] for tag in response.json()]
+
+    def test_reads_from_replica(self) -> None:
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_reads_from_primary_after_write(self) -> None:
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.post(
+            reverse('recipes:recipes-favorite', args=(self.recipe.pk,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(self.tag_slugs(), ['primary'])
+        self.client.cookies.pop(PRIMARY_COOKIE)
+        self.client.credentials()
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_token_read_from_primary(self) -> None:
+        # Токена в реплике нет: он выдан только что.
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_write_pins_user_without_cookie(self) -> None:
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.post(
+            reverse('recipes:recipes-favorite', args=(self.recipe.pk,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.cookies.pop(PRIMARY_COOKIE)
+        self.assertEqual(self.tag_slugs(), ['primary'])
+        cache.delete(PRIMARY_USER_KEY.format(self.user.pk))
+        self.assertEqual(self.tag_slugs(), ['replica'])
+
+    def test_write_pins_rest_of_request(self) -> None:
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+
+        def view(request):
+            reads = [router.db_for_read(Tag)]
+            self.assertEqual(router.db_for_write(Tag), 'default')
+            reads.append(router.db_for_read(Tag))
+            return JsonResponse(reads, safe=False)
+
+        request = APIRequestFactory().get('/')
+        response = ReplicaMiddleware(view)(request)
+        self.assertEqual(
+            json.loads(response.content),
+            ['testing_replica', 'default'],
+        )
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+
+class FastJSONTests(APITestCase):
+    def setUp(self) -> None:
+        self.renderer = FastJSONRenderer()
+        tags = mixer.cycle(2).blend(Tag)
+        ingredients = mixer.cycle(3).blend(Ingredient, name='ингредиент')
+        for recipe in mixer.cycle(3).blend(Recipe, tags=tags):
+            for ingredient in ingredients:
+                IngredientAmount.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=2,
+                )
+
+    def test_same_output_as_json_renderer(self) -> None:
+        # Анонимные страницы списка отдаются из кэша без response.data.
+        authenticate(self.client, mixer.blend(User))
+        for url in (
+            reverse('recipes:ingredients-list'),
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-detail', args=(1,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    response.content,
+                    JSONRenderer().render(response.data),
+                )
+
+    def test_special_values(self) -> None:
+        data = {
+            'created': timezone.now(),
+            'amount': Decimal('1.5'),
+            'text': 'строка\u2028\u2029',
+            1: [None, True, 0.1],
+            'big': 2**70,
+        }
+        self.assertEqual(
+            self.renderer.render(data),
+            JSONRenderer().render(data),
+        )
+        self.assertEqual(
+            self.renderer.render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+        self.assertEqual(self.renderer.render(None), b'')
+
+    def test_parser(self) -> None:
+        parser = FastJSONParser()
+        body = json.dumps({'name': 'рецепт', 'tags': [1, 2]}).encode()
+        self.assertEqual(
+            parser.parse(io.BytesIO(body)),
+            {'name': 'рецепт', 'tags': [1, 2]},
+        )
+        for body in (b'{"amount": NaN}', b'{'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    parser.parse(io.BytesIO(body))
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = mixer.blend(User)
+        self.tag = mixer.blend(Tag)
+        self.recipes = mixer.cycle(3).blend(Recipe, tags=[self.tag])
+        self.list_url = reverse('recipes:recipes-list')
+        self.detail_url = reverse(
+            'recipes:recipes-detail',
+            args=(self.recipes[0].pk,),
+        )
+
+    def assert_not_modified(self, url: str, etag: str, **params) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+
+    def test_detail(self) -> None:
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Authorization', response['Vary'])
+        self.assert_not_modified(self.detail_url, etag)
+        response = self.client.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.recipes[0].save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(0,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_flags(self) -> None:
+        anonymous_etag = self.client.get(self.detail_url)['ETag']
+        authenticate(self.client, self.user)
+        response = self.client.get(self.detail_url)
+        self.assertNotEqual(response['ETag'], anonymous_etag)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assert_not_modified(self.detail_url, etag)
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['is_favorited'])
+
+    def test_list(self) -> None:
+        # Анонимные страницы проверяет PageCacheTests.
+        authenticate(self.client, self.user)
+        params = {'limit': 2}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, params)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertFalse(
+            any('COUNT' in query['sql'].upper() for query in queries[1:]),
+        )
+        etag = response['ETag']
+        self.assert_not_modified(self.list_url, etag, **params)
+        response = self.client.get(
+            self.list_url,
+            {'limit': 2, 'page': 2},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mixer.blend(Recipe)
+        response = self.client.get(
+            self.list_url,
+            params,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 4)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'новое название'
+            self.tag.save()
+        response = self.client.get(
+            self.list_url,
+            params,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_related_changes(self) -> None:
+        ingredient = mixer.blend(Ingredient)
+        IngredientAmount.objects.create(
+            recipe=self.recipes[0],
+            ingredient=ingredient,
+            amount=1,
+        )
+        author = self.recipes[0].author
+
+        def rename_author() -> None:
+            author.first_name = 'новое имя'
+            author.save()
+
+        changes = (
+            ('author', rename_author),
+            ('ingredient', ingredient.delete),
+            ('tag', self.tag.delete),
+        )
+        for name, change in changes:
+            with self.subTest(change=name):
+                etag = self.client.get(self.detail_url)['ETag']
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                response = self.client.get(
+                    self.detail_url,
+                    HTTP_IF_NONE_MATCH=etag,
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            author.save(update_fields=('last_login',))
+            author.set_password('new-password')
+            author.is_active = False
+            author.save()
+            author.save(update_fields=('first_name',))
+        self.assertFalse(callbacks)
+        self.assert_not_modified(self.detail_url, etag)
+
+    @mock.patch('recipes.sync.TOUCH_BATCH_SIZE', 2)
+    def test_related_changes_batched(self) -> None:
+        last_change = Change.objects.latest('id').pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'новое название'
+            self.tag.save()
+        self.assertEqual(
+            sorted(
+                Change.objects.filter(id__gt=last_change).values_list(
+                    'recipe_id',
+                    flat=True,
+                ),
+            ),
+            sorted(recipe.pk for recipe in self.recipes),
+        )
+        self.assertEqual(
+            len({recipe.modified for recipe in Recipe.objects.all()}),
+            1,
+        )
+
+    def test_batch(self) -> None:
+        params = {'ids': f'{self.recipes[1].pk},{self.recipes[0].pk}'}
+        etag = self.client.get(self.list_url, params)['ETag']
+        self.assert_not_modified(self.list_url, etag, **params)
+        self.recipes[1].delete()
+        response = self.client.get(
+            self.list_url,
+            params,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(len(response.json()), 1)
+
+
+class ResponseCacheTests(APITestCase):
+    def test_lru_eviction(self) -> None:
+        page_cache = ResponseCache(max_entries=2, timeout=60)
+        page_cache.set('a', 1)
+        page_cache.set('b', 2)
+        self.assertEqual(page_cache.get('a'), 1)
+        page_cache.set('c', 3)
+        self.assertIsNone(page_cache.get('b'))
+        self.assertEqual(page_cache.get('a'), 1)
+        self.assertEqual(page_cache.get('c'), 3)
+
+    def test_timeout(self) -> None:
+        page_cache = ResponseCache(max_entries=2, timeout=60)
+        with mock.patch('time.monotonic', return_value=1000):
+            page_cache.set('a', 1)
+        with mock.patch('time.monotonic', return_value=1059):
+            self.assertEqual(page_cache.get('a'), 1)
+        with mock.patch('time.monotonic', return_value=1060):
+            self.assertIsNone(page_cache.get('a'))
+        page_cache = ResponseCache(max_entries=2, timeout=0)
+        page_cache.set('a', 1)
+        self.assertIsNone(page_cache.get('a'))
+
+    def test_concurrent_misses_computed_once(self) -> None:
+        page_cache = ResponseCache(max_entries=2, timeout=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def requests():
+            return await asyncio.gather(
+                *(page_cache.aget_or_set('a', compute) for _ in range(5)),
+            )
+
+        self.assertEqual(asyncio.run(requests()), [1] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((page_cache.hits, page_cache.misses), (4, 1))
+
+    def test_uncacheable_result_recomputed(self) -> None:
+        page_cache = ResponseCache(max_entries=2, timeout=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return None
+
+        async def requests():
+            return await asyncio.gather(
+                *(
+                    page_cache.aget_or_set(
+                        'a',
+                        compute,
+                        cacheable=lambda value: value is not None,
+                    )
+                    for _ in range(3)
+                ),
+            )
+
+        asyncio.run(requests())
+        self.assertEqual(len(calls), 3)
+        self.assertIsNone(page_cache.get('a'))
+
+
+class PageCacheTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        page_cache.clear()
+        self.tags = mixer.cycle(2).blend(Tag)
+        mixer.cycle(3).blend(Recipe, tags=self.tags)
+        self.url = reverse('recipes:recipes-list')
+
+    def get(self, params: dict, queries: int | None = None, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params, **headers)
+        if queries is not None:
+            self.assertEqual(len(context), queries)
+        return response
+
+    def test_page_cached_by_normalized_params(self) -> None:
+        slugs = [tag.slug for tag in self.tags]
+        response = self.get({'tags': slugs, 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 3)
+        # Поколение рецептов проверяется одним запросом к журналу.
+        cached = self.get(
+            {'limit': '2', 'page': 1, 'tags': slugs[::-1]},
+            queries=1,
+        )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        response = self.get(
+            {'tags': slugs, 'limit': 2},
+            queries=1,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_page_cached_per_host(self) -> None:
+        params = {'limit': 1}
+        self.get(params)
+        response = self.get(params, HTTP_HOST='localhost')
+        self.assertTrue(
+            response.json()['next'].startswith('http://localhost/'),
+        )
+        response = self.get(params, queries=1)
+        self.assertTrue(
+            response.json()['next'].startswith('http://testserver/'),
+        )
+
+    def test_invalidated_by_writes(self) -> None:
+        self.get({})
+        with self.captureOnCommitCallbacks(execute=True):
+            mixer.blend(Recipe, tags=self.tags)
+        response = self.get({})
+        self.assertEqual(response.json()['count'], 4)
+        self.get({}, queries=1)
+        tag = self.tags[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'новое название'
+            tag.save()
+        response = self.get({'limit': 10})
+        self.assertIn(
+            'новое название',
+            [tag['name'] for tag in response.json()['results'][0]['tags']],
+        )
+
+    def test_not_cached(self) -> None:
+        for params in ({'ordering': 'popular'}, {'page': 'last'}):
+            with self.subTest(params=params):
+                self.get(params)
+                with CaptureQueriesContext(connection) as context:
+                    self.get(params)
+                self.assertTrue(context)
+        self.get({})
+        for page in (5, 0, -1):
+            for _ in range(2):
+                response = self.get({'page': page})
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_404_NOT_FOUND,
+                )
+        authenticate(self.client, mixer.blend(User))
+        self.get({})
+        with CaptureQueriesContext(connection) as context:
+            self.get({})
+        self.assertTrue(context)
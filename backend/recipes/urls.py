@@ -1,7 +1,17 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from recipes.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from recipes.views import (
+    ExportView,
+    IngredientAsyncView,
+    IngredientViewSet,
+    RecipeAsyncView,
+    RecipeViewSet,
+    ShoppingCartAsyncView,
+    SyncView,
+    TagAsyncView,
+    TagViewSet,
+)
 
 app_name = '%(app_label)s'
 
@@ -10,6 +20,58 @@ router.register('ingredients', IngredientViewSet, 'ingredients')
 router.register('tags', TagViewSet, 'tags')
 router.register('recipes', RecipeViewSet, 'recipes')
 
+# Чтение данных обрабатывают асинхронные представления, остальные
+# методы - представления DRF из router.
+async_urls = (
+    path(
+        'ingredients/',
+        IngredientAsyncView.as_view(
+            sync_view=IngredientViewSet.as_view({'get': 'list'}),
+        ),
+    ),
+    path(
+        'ingredients/<int:pk>/',
+        IngredientAsyncView.as_view(
+            sync_view=IngredientViewSet.as_view({'get': 'retrieve'}),
+        ),
+    ),
+    path(
+        'tags/',
+        TagAsyncView.as_view(sync_view=TagViewSet.as_view({'get': 'list'})),
+    ),
+    path(
+        'tags/<int:pk>/',
+        TagAsyncView.as_view(
+            sync_view=TagViewSet.as_view({'get': 'retrieve'}),
+        ),
+    ),
+    path(
+        'recipes/',
+        RecipeAsyncView.as_view(
+            sync_view=RecipeViewSet.as_view({'post': 'create'}),
+        ),
+    ),
+    path(
+        'recipes/<int:pk>/',
+        RecipeAsyncView.as_view(
+            sync_view=RecipeViewSet.as_view(
+                {
+                    'put': 'update',
+                    'patch': 'partial_update',
+                    'delete': 'destroy',
+                },
+            ),
+        ),
+    ),
+    path(
+        'recipes/download_shopping_cart/',
+        ShoppingCartAsyncView.as_view(),
+    ),
+)
+
 urlpatterns = (
+    *async_urls,
     path('', include(router.urls)),
+    path('export/<str:table>/', ExportView.as_view(), name='export'),
+    path('sync/', SyncView.as_view(), name='sync'),
 )
@@ -1,20 +1,59 @@
+import io
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Model, Sum
-from django.http import HttpRequest, HttpResponse
+from django.db.models.query import QuerySet
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from fpdf import FPDF
-from rest_framework import permissions, status, viewsets
+from rest_framework import (
+    exceptions,
+    mixins,
+    permissions,
+    status,
+    viewsets,
+)
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from foodgram_backend.cache import ResponseCache
+from foodgram_backend.pagination import LimitPagination
 from foodgram_backend.permissions import AuthorStuffReadOnly
-from recipes.filters import RecipeFilter
+from foodgram_backend.views import AsyncAPIView
+from recipes.conditional import (
+    arecipes_generation,
+    batch_etag,
+    not_modified,
+    page_validators,
+    recipe_validators,
+    set_validators,
+)
+from recipes.exporters import aiterate, export
+from recipes.filters import RecipeFilter, split_ids
+from recipes.importers import IMPORT_FORMATS, RecipeImporter, read_rows
+from recipes.index import ingredient_index
 from recipes.models import (
+    Change,
     Favorite,
     Ingredient,
     IngredientAmount,
     Recipe,
+    RecipeNeighbor,
     ShoppingCart,
     Tag,
 )
@@ -25,8 +64,127 @@ from recipes.serializers import (
     ShortRecipeSerializer,
     TagSerializer,
 )
+from recipes.sync import changes_since
 from users.models import User
 
+PAGE_CACHE_PARAMS = frozenset(('tags', 'author', 'page', 'limit'))
+
+
+class CachedPage(NamedTuple):
+    content: bytes
+    etag: str | None
+
+
+page_cache = ResponseCache(
+    settings.RECIPE_PAGE_CACHE_MAX_ENTRIES,
+    settings.RECIPE_PAGE_CACHE_TIMEOUT,
+)
+
+
+def search_ingredients(
+    queryset: QuerySet,
+    name: str,
+) -> tuple[QuerySet, QuerySet]:
+    """Ингредиенты, название которых начинается с `name`, и остальные."""
+    start_queryset = queryset.filter(name__istartswith=name)
+    contain_queryset = queryset.filter(name__icontains=name).exclude(
+        name__in=start_queryset.values_list('name'),
+    )
+    return start_queryset, contain_queryset
+
+
+def parse_ids(value: str, limit: int) -> list[int]:
+    """Список id через запятую без повторов, не длиннее `limit`."""
+    try:
+        ids = list(
+            dict.fromkeys(int(pk) for pk in value.split(',') if pk.strip()),
+        )
+    except ValueError:
+        ids = []
+    if not 0 < len(ids) <= limit:
+        raise ValueError(
+            f'Ожидается от 1 до {limit} id рецептов через запятую',
+        )
+    return ids
+
+
+def page_cache_key(request: Request) -> tuple | None:
+    """
+    Ключ кэша страницы рецептов: схема и хост (ссылки `next`
+    и `previous` абсолютные), отсортированные теги, автор, страница
+    и размер страницы. Для других параметров страница не кэшируется.
+    """
+    query_params = request.query_params
+    if not query_params.keys() <= PAGE_CACHE_PARAMS:
+        return None
+    values = {}
+    for name in ('author', 'page', 'limit'):
+        value = query_params.getlist(name)
+        if len(value) > 1:
+            return None
+        try:
+            values[name] = int(value[0]) if value else None
+        except ValueError:
+            return None
+    if values['page'] is None:
+        values['page'] = 1
+    elif values['page'] < 1:
+        # Ответ 404 строит пагинация без кэша.
+        return None
+    return (
+        request.scheme,
+        request.get_host(),
+        tuple(sorted(set(query_params.getlist('tags')))),
+        values['author'],
+        values['page'],
+        values['limit'],
+    )
+
+
+def shopping_list(user: User) -> QuerySet:
+    """Суммарное количество ингредиентов рецептов из корзины."""
+    return (
+        IngredientAmount.objects.filter(recipe__cart_recipe__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(Sum('amount', distinct=True))
+    )
+
+
+def render_shopping_list(ingredients: Iterable[dict]) -> HttpResponse:
+    """Список покупок в PDF."""
+    pdf = FPDF()
+    pdf.add_page()
+    font_regular = (
+        settings.DATA_DIR / 'font' / 'NotoSans-Regular.ttf'
+    ).resolve()
+    font_bold = (
+        settings.DATA_DIR / 'font' / 'NotoSans-Bold.ttf'
+    ).resolve()
+    pdf.add_font('Sans', style='', fname=font_regular, uni=True)
+    pdf.add_font('Sans', style='B', fname=font_bold, uni=True)
+    pdf.set_font('Sans', 'B', size=14)
+    pdf.cell(txt='Список покупок', center=True)
+    pdf.ln(8)
+    pdf.set_font('Sans', '', size=14)
+    for i, ingredient in enumerate(ingredients):
+        pdf.cell(
+            40,
+            10,
+            f'{i + 1}) {ingredient["ingredient__name"]}'
+            f' - {ingredient["amount__sum"]} '
+            f'{ingredient["ingredient__measurement_unit"]}',
+        )
+        pdf.ln()
+    response = HttpResponse(
+        content_type='application/pdf; charset=utf-8',
+        status=status.HTTP_200_OK,
+    )
+    response[
+        'Content-Disposition'
+    ] = 'attachment; filename="shopping_cart.pdf"'
+    response.write(bytes(pdf.output(dest='S')))
+    return response
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с ингредиентами блюда."""
@@ -38,12 +196,11 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         name: str = self.request.query_params.get('name')
         if not name:
             return self.queryset
-        start_queryset = self.queryset.filter(name__istartswith=name)
-        start_names = start_queryset.values_list('name')
-        contain_queryset = self.queryset.filter(name__icontains=name).exclude(
-            name__in=start_names,
-        )
-        return list(start_queryset) + list(contain_queryset)
+        return [
+            ingredient
+            for queryset in search_ingredients(self.queryset, name)
+            for ingredient in queryset
+        ]
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -52,12 +209,31 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    """ViewSet для работы с рецептами."""
-    queryset = Recipe.objects.all()
+class RecipeViewSet(
+    mixins.CreateModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    ViewSet для работы с рецептами.
+
+    Список и чтение рецептов обрабатывает RecipeAsyncView.
+    """
+    queryset = Recipe.objects.defer('search_vector')
     permission_classes = (AuthorStuffReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pantry_max_missing = 10
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS:
+            return RecipeSerializerRetrieve.setup_queryset(
+                queryset,
+                self.request,
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -112,44 +288,435 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.manage_relation(ShoppingCart, request.user, 'del')
         return self.manage_relation(ShoppingCart, request.user, 'add')
 
+    @action(
+        ('post',),
+        detail=False,
+        url_path='import',
+        permission_classes=(permissions.IsAdminUser,),
+        parser_classes=(JSONParser, FormParser, MultiPartParser),
+    )
+    def import_recipes(self, request: HttpRequest, **kwargs) -> Response:
+        """
+        Массовый импорт рецептов из JSON или файла CSV/JSON/NDJSON.
+
+        Размер тела JSON здесь не ограничивается `JSON_MAX_BODY_SIZE`.
+        """
+        file = request.FILES.get('file')
+        if file:
+            fmt = request.data.get('format') or Path(file.name).suffix[1:]
+            if fmt not in IMPORT_FORMATS:
+                return Response(
+                    {'error': f'Неизвестный формат: {fmt}'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            text = io.TextIOWrapper(file.file, encoding='utf-8')
+            rows = read_rows(text, fmt)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response(
+                {'error': 'Ожидается список рецептов или файл'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        importer = RecipeImporter(default_author=request.user)
+        try:
+            importer.run(rows)
+        except ValueError as err:
+            importer.errors.append(str(err))
+            return Response(
+                importer.report(),
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(importer.report(), status=status.HTTP_201_CREATED)
+
+    @action(detail=True)
+    def similar(self, request: HttpRequest, pk: str) -> Response:
+        """Похожие рецепты, рассчитанные командой `similarrecipes`."""
+        neighbors = (
+            RecipeNeighbor.objects.filter(
+                recipe=get_object_or_404(Recipe.objects.only('pk'), pk=pk),
+            )
+            .select_related('neighbor')
+            .only(
+                'neighbor__name',
+                'neighbor__image',
+                'neighbor__image_variants',
+                'neighbor__image_placeholder',
+                'neighbor__cooking_time',
+            )
+            .order_by('-score')
+        )
+        serializer = ShortRecipeSerializer(
+            [neighbor.neighbor for neighbor in neighbors],
+            many=True,
+        )
+        return Response(serializer.data)
+
     @action(detail=False)
-    def download_shopping_cart(self, request: HttpRequest) -> Response:
+    def pantry(self, request: HttpRequest, **kwargs) -> Response:
+        """
+        Рецепты из имеющихся продуктов.
+
+        `?ingredients=1,2&max_missing=2` (или `?ingredients=1&ingredients=2`)
+        - сначала рецепты, для которых есть все ингредиенты, затем с одним
+        недостающим и т.д.
+        """
+        try:
+            ids = split_ids(request.query_params.getlist('ingredients'))
+            max_missing = int(request.query_params.get('max_missing', 2))
+        except ValueError:
+            ids, max_missing = [], -1
+        if not ids or not 0 <= max_missing <= self.pantry_max_missing:
+            return Response(
+                {
+                    'error': 'Укажите id ингредиентов и max_missing '
+                    f'от 0 до {self.pantry_max_missing}',
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ranked = ingredient_index.rank_by_coverage(ids, max_missing)
+        page = self.paginate_queryset(ranked)
+        if page is None:
+            page = ranked
+        recipes = self.get_queryset().in_bulk([pk for pk, _ in page])
+        result = []
+        for pk, missing in page:
+            if pk in recipes:
+                recipes[pk].missing_ingredients = missing
+                result.append(recipes[pk])
+        serializer = self.get_serializer(result, many=True)
+        if self.paginator is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, permission_classes=(permissions.IsAuthenticated,))
+    def download_shopping_cart(self, request: HttpRequest) -> HttpResponse:
         """Составление и скачивание списка покупок."""
-        user = request.user
-        ingredients = (
-            IngredientAmount.objects.filter(recipe__cart_recipe__user=user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(Sum('amount', distinct=True))
-        )
-        pdf = FPDF()
-        pdf.add_page()
-        font_regular = (
-            settings.DATA_DIR / 'font' / 'NotoSans-Regular.ttf'
-        ).resolve()
-        font_bold = (
-            settings.DATA_DIR / 'font' / 'NotoSans-Bold.ttf'
-        ).resolve()
-        pdf.add_font('Sans', style='', fname=font_regular, uni=True)
-        pdf.add_font('Sans', style='B', fname=font_bold, uni=True)
-        pdf.set_font('Sans', 'B', size=14)
-        pdf.cell(txt='Список покупок', center=True)
-        pdf.ln(8)
-        pdf.set_font('Sans', '', size=14)
-        for i, ingredient in enumerate(ingredients):
-            pdf.cell(
-                40,
-                10,
-                f'{i + 1}) {ingredient["ingredient__name"]}'
-                f' - {ingredient["amount__sum"]} '
-                f'{ingredient["ingredient__measurement_unit"]}',
+        return render_shopping_list(shopping_list(request.user))
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка рецептов и связей в NDJSON или CSV.
+
+    Под ASGI ответ получает асинхронный поток: синхронный Django
+    собрал бы в памяти целиком.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def get(self, request: HttpRequest, table: str) -> HttpResponse:
+        fmt = request.query_params.get('output', 'ndjson')
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        try:
+            stream = export(table, fmt, compress)
+        except ValueError as err:
+            return Response(
+                {'error': str(err)},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            pdf.ln()
-        response = HttpResponse(
-            content_type='application/pdf; charset=utf-8',
-            status=status.HTTP_200_OK,
+        if isinstance(request._request, ASGIRequest):
+            stream = aiterate(stream)
+        filename = f'{table}.{fmt}.gz' if compress else f'{table}.{fmt}'
+        response = StreamingHttpResponse(
+            stream,
+            content_type=(
+                'application/gzip' if compress else self.content_types[fmt]
+            ),
         )
         response[
             'Content-Disposition'
-        ] = 'attachment; filename="shopping_cart.pdf"'
-        response.write(bytes(pdf.output(dest='S')))
+        ] = f'attachment; filename="{filename}"'
         return response
+
+
+class SyncView(APIView):
+    """
+    Изменения рецептов, избранного и корзины с момента прошлой синхронизации.
+
+    `?since=<token>` - токен из прошлого ответа (0 или без параметра -
+    все данные), `?limit=` - размер страницы. Пока `has_more`, клиент
+    запрашивает следующую страницу с новым токеном.
+    """
+    permission_classes = (permissions.AllowAny,)
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request: HttpRequest) -> Response:
+        try:
+            since = int(request.query_params.get('since') or 0)
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            since = limit = -1
+        if since < 0 or not 0 < limit <= self.max_limit:
+            return Response(
+                {'error': 'Некорректный токен или размер страницы'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        changes, has_more = changes_since(request.user, since, limit)
+        relations: dict[str, dict[str, list[int]]] = {
+            Change.Kind.FAVORITE: {'added': [], 'removed': []},
+            Change.Kind.SHOPPING_CART: {'added': [], 'removed': []},
+        }
+        changed_recipes, deleted_recipes = [], []
+        for change in changes:
+            if change.kind == Change.Kind.RECIPE:
+                target = deleted_recipes if change.deleted else changed_recipes
+            else:
+                target = relations[change.kind][
+                    'removed' if change.deleted else 'added'
+                ]
+            target.append(change.recipe_id)
+        recipes = RecipeSerializerRetrieve.setup_queryset(
+            Recipe.objects.defer('search_vector'),
+            request,
+        ).in_bulk(changed_recipes)
+        deleted_recipes.extend(
+            pk for pk in changed_recipes if pk not in recipes
+        )
+        serializer = RecipeSerializerRetrieve(
+            [recipes[pk] for pk in changed_recipes if pk in recipes],
+            many=True,
+            context={'request': request},
+        )
+        return Response(
+            {
+                'token': str(changes[-1].seq if changes else since),
+                'has_more': has_more,
+                'recipes': serializer.data,
+                'deleted_recipes': deleted_recipes,
+                'favorites': relations[Change.Kind.FAVORITE],
+                'shopping_cart': relations[Change.Kind.SHOPPING_CART],
+            },
+        )
+
+
+class IngredientAsyncView(AsyncAPIView):
+    """Асинхронные список (с поиском по названию) и чтение ингредиентов."""
+
+    async def get(self, request: Request, pk: int | None = None) -> Response:
+        queryset = Ingredient.objects.all()
+        if pk is not None:
+            ingredient = await queryset.aget(pk=pk)
+            return Response(IngredientSerializer(ingredient).data)
+        name = request.query_params.get('name')
+        querysets = search_ingredients(queryset, name) if name else (queryset,)
+        ingredients = [
+            ingredient
+            for queryset in querysets
+            async for ingredient in queryset
+        ]
+        return Response(IngredientSerializer(ingredients, many=True).data)
+
+
+class TagAsyncView(AsyncAPIView):
+    """Асинхронные список и чтение тегов."""
+
+    async def get(self, request: Request, pk: int | None = None) -> Response:
+        if pk is not None:
+            tag = await Tag.objects.aget(pk=pk)
+            return Response(TagSerializer(tag).data)
+        tags = [tag async for tag in Tag.objects.all()]
+        return Response(TagSerializer(tags, many=True).data)
+
+
+class RecipeAsyncView(AsyncAPIView):
+    """
+    Асинхронные список и чтение рецептов.
+
+    Поддерживает фильтры RecipeFilter, `?fields=` и `?expand=`.
+    `?ids=3,1,2` - рецепты с перечисленными id в указанном порядке
+    одним ответом без пагинации (не более `max_batch_ids`). Связанные
+    объекты загружаются `prefetch_related` при асинхронной итерации
+    одним переходом в поток.
+
+    Ответы содержат ETag (рецепт - и Last-Modified для анонимных
+    пользователей), на условный запрос с тем же ETag ответ 304
+    отдается после одного легкого запроса, без сериализации. Страницы
+    списка для анонимных пользователей кэшируются в `page_cache`.
+    """
+
+    filterset_class = RecipeFilter
+    max_batch_ids = 100
+
+    async def get(
+        self,
+        request: Request,
+        pk: int | None = None,
+    ) -> HttpResponseBase:
+        if pk is None and request.user.is_anonymous:
+            key = page_cache_key(request)
+            if key is not None:
+                return await self.cached_list(request, key)
+        queryset = await self.get_queryset(request)
+        # Валидаторы вычисляются до чтения данных: ответ не может
+        # оказаться старее своего ETag.
+        if pk is not None:
+            return await self.retrieve(request, queryset, pk)
+        if 'ids' in request.query_params:
+            return await self.batch(request, queryset)
+        return await self.list(request, queryset)
+
+    async def get_queryset(self, request: Request) -> QuerySet:
+        return await sync_to_async(DjangoFilterBackend().filter_queryset)(
+            request,
+            RecipeSerializerRetrieve.setup_queryset(
+                Recipe.objects.defer('search_vector'),
+                request,
+            ),
+            self,
+        )
+
+    async def cached_list(
+        self,
+        request: Request,
+        key: tuple,
+    ) -> HttpResponseBase:
+        """
+        Страница списка для анонимных пользователей из `page_cache`.
+
+        Ключ включает поколение рецептов из БД (`arecipes_generation`),
+        поэтому после изменений в любом процессе страницы строятся
+        заново. Проверка поколения - один запрос по индексу журнала.
+        """
+
+        async def render() -> CachedPage | HttpResponseBase:
+            response = self.finalize(
+                await self.list(request, await self.get_queryset(request)),
+            )
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            response.render()
+            return CachedPage(response.content, response.get('ETag'))
+
+        page = await page_cache.aget_or_set(
+            (key, await arecipes_generation()),
+            render,
+            cacheable=lambda value: isinstance(value, CachedPage),
+        )
+        if not isinstance(page, CachedPage):
+            return page
+        if page.etag is None:
+            return HttpResponse(page.content, content_type='application/json')
+        response = not_modified(request, page.etag)
+        if response is not None:
+            return response
+        return set_validators(
+            HttpResponse(page.content, content_type='application/json'),
+            page.etag,
+        )
+
+    def serialize(self, request: Request, instance, **kwargs) -> dict:
+        return RecipeSerializerRetrieve(
+            instance,
+            context={'request': request, 'view': self},
+            **kwargs,
+        ).data
+
+    async def retrieve(
+        self,
+        request: Request,
+        queryset: QuerySet,
+        pk: int,
+    ) -> HttpResponseBase:
+        validators = await recipe_validators(request, queryset, pk)
+        if validators is None:
+            raise Http404()
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        recipe = await queryset.aget(pk=pk)
+        return set_validators(
+            Response(self.serialize(request, recipe)),
+            *validators,
+        )
+
+    async def batch(
+        self,
+        request: Request,
+        queryset: QuerySet,
+    ) -> HttpResponseBase:
+        try:
+            ids = parse_ids(request.query_params['ids'], self.max_batch_ids)
+        except ValueError as err:
+            return Response(
+                {'error': str(err)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        etag = await batch_etag(request, queryset, ids)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        recipes = await queryset.ain_bulk(ids)
+        return set_validators(
+            Response(
+                self.serialize(
+                    request,
+                    [recipes[pk] for pk in ids if pk in recipes],
+                    many=True,
+                ),
+            ),
+            etag,
+        )
+
+    async def list(
+        self,
+        request: Request,
+        queryset: QuerySet,
+    ) -> HttpResponseBase:
+        paginator = LimitPagination()
+        validators = await self.page_validators(request, queryset, paginator)
+        if validators is None:
+            page = await paginator.apaginate_queryset(queryset, request)
+        else:
+            etag, count = validators
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            page = await paginator.apaginate_queryset(
+                queryset,
+                request,
+                count,
+            )
+        response = paginator.get_paginated_response(
+            self.serialize(request, page, many=True),
+        )
+        if validators is None:
+            return response
+        return set_validators(response, validators[0])
+
+    async def page_validators(
+        self,
+        request: Request,
+        queryset: QuerySet,
+        paginator: LimitPagination,
+    ) -> tuple[str, int] | None:
+        """ETag и число рецептов для страницы из `?page=` и `?limit=`."""
+        limit = paginator.get_page_size(request)
+        try:
+            page = int(request.query_params.get('page', 1))
+        except ValueError:
+            return None
+        if not limit or page < 1:
+            return None
+        return await page_validators(
+            request,
+            queryset,
+            (page - 1) * limit,
+            limit,
+        )
+
+
+class ShoppingCartAsyncView(AsyncAPIView):
+    """Асинхронное скачивание списка покупок."""
+
+    async def get(self, request: Request) -> HttpResponse:
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        ingredients = [row async for row in shopping_list(request.user)]
+        # Формирование PDF занимает процессор: выполняется в пуле потоков,
+        # не задерживая другие запросы этого процесса.
+        return await sync_to_async(
+            render_shopping_list,
+            thread_sensitive=False,
+        )(ingredients)
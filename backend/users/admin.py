@@ -1,7 +1,11 @@
 from django.contrib import admin
+from django.db.models import Count, Model, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpRequest
 from django.utils.html import format_html
 from django.utils.safestring import SafeString, mark_safe
 
+from recipes.images import image_urls, reset_variants, schedule_variants
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -13,8 +17,23 @@ from recipes.models import (
 from users.models import Subsription, User
 
 
+def count_related(model: type[Model], field: str) -> Coalesce:
+    """Подзапрос количества связанных строк без JOIN к списку объектов."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+        ),
+        0,
+    )
+
+
 class BaseAdmin(admin.ModelAdmin):
     empty_value_display = '-empty-'
+    show_full_result_count = False
 
 
 @admin.register(User)
@@ -27,17 +46,27 @@ class UserAdmin(BaseAdmin):
         'is_staff',
         'get_subscribers',
     )
-    list_filter = ('username', 'email')
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('^username', '^email')
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(subscribers_count=count_related(Subsription, 'author'))
+        )
 
-    @admin.display(description='подписчиков')
+    @admin.display(description='подписчиков', ordering='subscribers_count')
     def get_subscribers(self, user: User) -> int:
-        return user.authors.count()
+        return user.subscribers_count
 
 
 @admin.register(Subsription)
 class SubsriptionAdmin(BaseAdmin):
     list_display = ('__str__', 'author', 'subscriber')
-    list_filter = ('author', 'subscriber')
+    list_select_related = ('author', 'subscriber')
+    search_fields = ('^author__username', '^subscriber__username')
+    autocomplete_fields = ('author', 'subscriber')
 
 
 @admin.register(Ingredient)
@@ -46,8 +75,7 @@ class IngredientAdmin(BaseAdmin):
         'name',
         'measurement_unit',
     )
-    list_filter = ('name',)
-    search_fields = ('name',)
+    search_fields = ('^name',)
 
 
 @admin.register(Tag)
@@ -69,24 +97,31 @@ class TagAdmin(BaseAdmin):
 @admin.register(Favorite)
 class FavoriteAdmin(BaseAdmin):
     list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('^user__username', '^recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
 class CardAdmin(BaseAdmin):
     list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('^user__username', '^recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(IngredientAmount)
 class IngredientAmountAdmin(BaseAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe__name', 'ingredient__name')
+    list_select_related = ('recipe', 'ingredient')
+    search_fields = ('^recipe__name', '^ingredient__name')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 class IngredientInline(admin.TabularInline):
     model = IngredientAmount
     extra = 0
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
@@ -111,28 +146,55 @@ class RecipeAdmin(BaseAdmin):
         ('text',),
         ('image',),
     )
-    raw_id_fields = ('author',)
+    autocomplete_fields = ('author',)
     search_fields = (
-        'name',
-        'author__username',
-        'tags__name',
+        '^name',
+        '^author__username',
     )
-    list_filter = ('name', 'author__username', 'tags__name')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
 
     inlines = (IngredientInline,)
 
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                ingredients_count=count_related(IngredientAmount, 'recipe'),
+                tags_count=count_related(Recipe.tags.through, 'recipe'),
+                favorites_count=count_related(Favorite, 'recipe'),
+            )
+        )
+
+    def save_model(
+        self,
+        request: HttpRequest,
+        obj: Recipe,
+        form,
+        change: bool,
+    ) -> None:
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            reset_variants(obj)
+        super().save_model(request, obj, form, change)
+        if image_changed:
+            schedule_variants(obj.pk)
+
     @admin.display(description='изображение')
     def get_image(self, obj: Recipe) -> SafeString:
-        return mark_safe(f'<img src={obj.image.url} width="160" hieght="90"')
+        return mark_safe(
+            f'<img src={image_urls(obj)["thumb"]} width="160" hieght="90"',
+        )
 
-    @admin.display(description='ингредиенты')
+    @admin.display(description='ингредиенты', ordering='ingredients_count')
     def get_ingredients(self, obj: Recipe) -> int:
-        return obj.ingredients.count()
+        return obj.ingredients_count
 
-    @admin.display(description='теги')
+    @admin.display(description='теги', ordering='tags_count')
     def get_tags(self, obj: Recipe) -> int:
-        return obj.tags.count()
+        return obj.tags_count
 
-    @admin.display(description='в избранном')
+    @admin.display(description='в избранном', ordering='favorites_count')
     def get_favorites(self, obj: Recipe) -> int:
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
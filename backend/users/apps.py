@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     name = 'users'
     verbose_name = 'Пользователи и подписки'
+
+    def ready(self) -> None:
+        from users import signals  # noqa: F401
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-19 08:00
+
+from django.db import migrations
+
+# Поиск в админке по префиксу (`^username`) в PostgreSQL выполняется как
+# `UPPER(username) LIKE 'X%'`, для которого нужен индекс с text_pattern_ops.
+INDEXES = (
+    ('users_user_username_prefix', 'users_user', 'username'),
+    ('users_user_email_prefix', 'users_user', 'email'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)',
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,10 +1,14 @@
+from django.db.models import Exists, OuterRef
+from django.db.models.query import QuerySet
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
+from rest_framework.request import Request
 
-from users.models import User
+from foodgram_backend.serializers import DynamicFieldsMixin
+from users.models import Subsription, User
 
 
-class UsersSerializer(UserSerializer):
+class UsersSerializer(DynamicFieldsMixin, UserSerializer):
     """Сериализатор для списка пользователей."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -21,8 +25,30 @@ class UsersSerializer(UserSerializer):
         )
         extra_kwargs = {'password': {'write_only': True}}
 
+    @staticmethod
+    def annotate_subscribed(queryset: QuerySet, subscriber: User) -> QuerySet:
+        if subscriber.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subsription.objects.filter(
+                    subscriber=subscriber,
+                    author=OuterRef('pk'),
+                ),
+            ),
+        )
+
+    @classmethod
+    def setup_queryset(cls, queryset: QuerySet, request: Request) -> QuerySet:
+        """Флаг подписки одним запросом, если поле выбрано."""
+        if cls.wants(request, 'is_subscribed'):
+            return cls.annotate_subscribed(queryset, request.user)
+        return queryset
+
     def get_is_subscribed(self, author: User) -> bool:
         subscriber = self.context.get('request').user
+        if hasattr(author, 'is_subscribed'):
+            return subscriber.is_authenticated and author.is_subscribed
         return (
             subscriber.is_authenticated
             and subscriber.subscribers.filter(author=author).exists()
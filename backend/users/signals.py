@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram_backend.authentication import invalidate_tokens
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance: Token, **kwargs) -> None:
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance: User, created: bool, **kwargs) -> None:
+    """Смена пароля, деактивация и правки профиля сбрасывают кэш токена."""
+    if not created:
+        invalidate_tokens(
+            *Token.objects.filter(user=instance).values_list('key', flat=True),
+        )
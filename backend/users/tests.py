@@ -1,9 +1,14 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from mixer.backend.django import mixer
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from foodgram_backend.authentication import TOKEN_CACHE_KEY
+from recipes.models import Favorite, Ingredient, Recipe, Tag
 from users.models import Subsription, User
 
 
@@ -64,6 +69,23 @@ class UsersTests(APITestCase):
             user.last_name,
         )
 
+    def test_user_list_sparse_fields(self) -> None:
+        mixer.cycle(3).blend(User)
+        self.client.force_authenticate(mixer.blend(User))
+        url = reverse('users:user-list')
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.get(url)
+        self.assertIn('is_subscribed', response.json()['results'][0])
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(url, {'fields': 'id,username'})
+        self.assertEqual(
+            set(response.json()['results'][0]),
+            {'id', 'username'},
+        )
+        self.assertLessEqual(len(full), 2)
+        self.assertLessEqual(len(sparse), 2)
+        self.assertNotIn('subscription', sparse[-1]['sql'])
+
     def test_user_list_pagination_limit(self) -> None:
         mixer.cycle(4).blend(User)
         url = reverse('users:user-list')
@@ -185,6 +207,30 @@ class SubscriptionTests(APITestCase):
             1,
         )
 
+    def test_subscriptions_queries(self) -> None:
+        subscriber = mixer.blend(User)
+        for author in mixer.cycle(3).blend(User):
+            Subsription.objects.create(author=author, subscriber=subscriber)
+            mixer.cycle(2).blend(Recipe, author=author)
+        self.client.force_authenticate(subscriber)
+        url = reverse('users:user-subscriptions')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), 3)
+        result = response.json()['results'][0]
+        self.assertEqual(
+            (result['is_subscribed'], result['recipes_count']),
+            (True, 2),
+        )
+        self.assertEqual(len(result['recipes']), 2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,recipes_count'})
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': result['id'], 'recipes_count': 2},
+        )
+
     def test_subscribe(self) -> None:
         author = mixer.blend(User)
         subscriber = mixer.blend(User)
@@ -214,3 +260,123 @@ class SubscriptionTests(APITestCase):
             status.HTTP_204_NO_CONTENT,
         )
         self.assertEqual(Subsription.objects.count(), 0)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='user', email='email@example.com', password='pass',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.cache_key = TOKEN_CACHE_KEY.format(self.token.key)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('users:user-me')
+
+    def test_token_cached(self) -> None:
+        self.client.get(self.url)
+        self.assertEqual(cache.get(self.cache_key)[0], self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any('authtoken_token' in query['sql'] for query in context),
+        )
+
+    def test_logout_invalidates_cache(self) -> None:
+        self.client.get(self.url)
+        response = self.client.post(reverse('users:logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(cache.get(self.cache_key))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_delete_invalidates_cache(self) -> None:
+        self.client.get(self.url)
+        self.token.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_invalidates_cache(self) -> None:
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self) -> None:
+        self.client.get(self.url)
+        response = self.client.post(
+            reverse('users:user-set-password'),
+            {'new_password': 'fake_pswd_1', 'current_password': 'pass'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(cache.get(self.cache_key))
+
+
+class AdminChangelistTests(APITestCase):
+    MAX_QUERIES = 10
+
+    def setUp(self) -> None:
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        self.client.force_login(self.admin)
+
+    def create_recipes(self, count: int) -> None:
+        tags = mixer.cycle(2).blend(Tag)
+        ingredient = mixer.blend(Ingredient)
+        for recipe in mixer.cycle(count).blend(Recipe, tags=tags):
+            recipe.ingredient_amounts.create(ingredient=ingredient)
+            Favorite.objects.create(user=self.admin, recipe=recipe)
+            Subsription.objects.create(
+                subscriber=self.admin, author=recipe.author,
+            )
+
+    def changelist_queries(self, url_name: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context)
+
+    def test_changelist_queries_capped(self) -> None:
+        self.create_recipes(2)
+        few = {
+            name: self.changelist_queries(name)
+            for name in (
+                'admin:recipes_recipe_changelist',
+                'admin:users_user_changelist',
+                'admin:users_subsription_changelist',
+                'admin:recipes_favorite_changelist',
+            )
+        }
+        self.create_recipes(10)
+        for name, queries in few.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.changelist_queries(name), queries)
+                self.assertLessEqual(queries, self.MAX_QUERIES)
+
+    def test_recipe_change_form_uses_autocomplete(self) -> None:
+        self.create_recipes(1)
+        recipe = Recipe.objects.get()
+        unused = mixer.blend(Ingredient, name='unused-ingredient')
+        response = self.client.get(
+            reverse('admin:recipes_recipe_change', args=(recipe.pk,)),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, unused.name)
+        response = self.client.get(
+            reverse('admin:autocomplete'),
+            {
+                'term': 'unused',
+                'app_label': 'recipes',
+                'model_name': 'ingredientamount',
+                'field_name': 'ingredient',
+            },
+        )
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': str(unused.pk), 'text': unused.name}],
+        )
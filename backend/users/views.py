@@ -1,3 +1,4 @@
+from django.db.models.query import QuerySet
 from django.http import HttpRequest
 from djoser.conf import settings
 from djoser.views import UserViewSet
@@ -7,6 +8,7 @@ from rest_framework.response import Response
 
 from recipes.serializers import UserSubscribeSerializer
 from users.models import Subsription, User
+from users.serializers import UsersSerializer
 
 
 class UsersViewSet(UserViewSet):
@@ -16,12 +18,21 @@ class UsersViewSet(UserViewSet):
             self.permission_classes = settings.PERMISSIONS.user_subscribe
         return super().get_permissions()
 
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return UsersSerializer.setup_queryset(queryset, self.request)
+        return queryset
+
     @action(
         detail=False,
         serializer_class=UserSubscribeSerializer,
     )
     def subscriptions(self, request: HttpRequest, *args, **kwargs) -> Response:
-        subscribers = User.objects.filter(authors__subscriber=request.user)
+        subscribers = UserSubscribeSerializer.setup_queryset(
+            User.objects.filter(authors__subscriber=request.user),
+            request,
+        ).order_by('id')
         pages = self.paginate_queryset(subscribers)
         serializer = self.get_serializer(pages, many=True)
         return self.get_paginated_response(serializer.data)